@@ -0,0 +1,64 @@
+# Backup payload size and round-trip time against the reference backup server:
+# one-off requests.post vs the pooled client, single POST vs chunked upload, and
+# several clients uploading at once.
+# Run from the repository root: python -m benchmarks.bench_backup [events] [rounds] [clients]
+import gzip
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from event_planner.backup_client import BackupClient
+from event_planner.backup_server import BackupServer
+from event_planner.database import EventDatabase
+from benchmarks.bench_export import seed
+
+
+def timed(rounds, fn):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    clients = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    server = BackupServer(('127.0.0.1', 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with tempfile.TemporaryDirectory() as tmp:
+        db = EventDatabase(os.path.join(tmp, "bench.db"))
+        data = db.get_backup_data(seed(db, events))
+        db.conn.close()
+    raw = json.dumps(data).encode()
+    print(f"payload        raw {len(raw) / 1024:>8.1f} KiB  gzip {len(gzip.compress(raw, 6)) / 1024:>8.1f} KiB")
+
+    ms = timed(rounds, lambda: requests.post(f"{server.url}/backup", json=data, timeout=10).raise_for_status())
+    print(f"{'requests.post':<15}{ms:>8.1f} ms/backup")
+    for compress in (False, True):
+        client = BackupClient(server.url, compress=compress)
+        label = "gzip" if compress else "plain"
+        print(f"{'pooled ' + label:<15}{timed(rounds, lambda: client.post_backup(data)):>8.1f} ms/backup")
+        # Unchanged data: every chunk is already on the server after the first round
+        print(f"{'chunked ' + label:<15}{timed(rounds, lambda: client.upload_backup(data)):>8.1f} ms/backup")
+        client.close()
+
+    # Distinct users so each upload has to send all of its chunks
+    payloads = [{**data, 'user_id': i, 'events': [{**e, 'user_id': i} for e in data['events']]}
+                for i in range(clients)]
+    client = BackupClient(server.url, pool_size=clients * 4)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client.upload_backup, payloads))
+    elapsed = time.perf_counter() - start
+    print(f"{clients} concurrent  {elapsed * 1000:>8.1f} ms  {clients * len(raw) / elapsed / 1024 / 1024:.1f} MiB/s")
+    client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# Per-row add_guest (one commit each) vs. add_guests_bulk (one commit in total).
+# Run from the repository root: python -m benchmarks.bench_bulk [guests]
+import os
+import sys
+import tempfile
+import time
+from event_planner.database import EventDatabase
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    print(f"{'profile':<12}{'per-row s':>11}{'bulk s':>9}{'speedup':>9}")
+    for profile in ("durable", "balanced"):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = EventDatabase(os.path.join(tmp, "bench.db"), profile=profile)
+            user_id = db.create_user("bench", "password")
+            event_id = db.add_event(user_id, "Conference", "2025-06-01", "09:00", "Hall", "")
+            guests = [(f"Guest {i}", f"guest{i}@example.com") for i in range(count)]
+            start = time.perf_counter()
+            for name, email in guests:
+                db.add_guest(event_id, name, email)
+            per_row = time.perf_counter() - start
+            start = time.perf_counter()
+            db.add_guests_bulk(event_id, guests)
+            bulk = time.perf_counter() - start
+            db.conn.close()
+        print(f"{profile:<12}{per_row:>11.3f}{bulk:>9.3f}{per_row / bulk:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# UI-style lookups with and without the query cache: each interaction re-reads the
+# event list, the selected event and its tasks and guests, and one in five toggles
+# a task first (which invalidates that event's entries).
+# Run from the repository root: python -m benchmarks.bench_cache [events] [rounds]
+import os
+import random
+import sys
+import tempfile
+import time
+from event_planner.cache import QUERY_CACHE_SIZE
+from event_planner.database import EventDatabase
+
+
+def seed(db, events):
+    user_id = db.create_user("bench", "password")
+    event_ids = db.add_events_bulk(user_id, ((f"Event {i}", "2025-06-01", "19:00", "Venue", "Description")
+                                             for i in range(events)))
+    for event_id in event_ids:
+        db.add_guests_bulk(event_id, ((f"Guest {i}", f"guest{i}@example.com") for i in range(30)))
+        db.add_tasks_bulk(event_id, (f"Task {i}" for i in range(10)))
+    return user_id, event_ids
+
+
+def interact(db, user_id, event_ids, rounds):
+    rng = random.Random(1)
+    # Most interactions revisit a handful of events
+    hot = event_ids[:10]
+    start = time.perf_counter()
+    for i in range(rounds):
+        event_id = rng.choice(hot)
+        if i % 5 == 0:
+            task_id = db.get_tasks_for_event(event_id)[0][0]
+            db.update_task_status(task_id, i % 2)
+        db.get_all_events(user_id)
+        db.get_event_by_id(event_id)
+        db.get_tasks_for_event(event_id)
+        db.get_guests_for_event(event_id)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        db = EventDatabase(path)
+        user_id, event_ids = seed(db, events)
+        db.conn.close()
+        for cache_size in (0, QUERY_CACHE_SIZE):
+            db = EventDatabase(path, cache_size=cache_size)
+            ms = interact(db, user_id, event_ids, rounds)
+            stats = f"  {db.cache.stats()}" if db.cache else ""
+            print(f"{'cached' if cache_size else 'uncached':<9}{ms:>8.3f} ms/interaction{stats}")
+            db.conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Calendar highlighting input: every distinct event date in the account (one
+# setDateTextFormat call each) vs per-date counts for the month on screen.
+# Run from the repository root: python -m benchmarks.bench_calendar [rounds]
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from event_planner.database import EventDatabase
+
+
+def median_ms(rounds, fn):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def all_event_dates(db, user_id):
+    # What the calendar used to load before it only asked for the visible month
+    return [row[0] for row in db.conn.execute('''
+        SELECT DISTINCT date FROM events
+        WHERE user_id = ? AND is_archived = 0
+    ''', (user_id,))]
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = EventDatabase(os.path.join(tmp, "bench.db"))
+        user_id = db.create_user("bench", "password")
+        added = 0
+        for years in (1, 5, 20):
+            # About five events a week over the whole history
+            target = years * 260
+            start = date(2025, 12, 31) - timedelta(days=365 * years)
+            days = [(start + timedelta(days=rng.randrange(365 * years))).isoformat() for _ in range(target - added)]
+            db.add_events_bulk(user_id, ((f"Event {i}", day, "12:00", "Venue", "Description")
+                                         for i, day in enumerate(days)))
+            added = target
+            dates = all_event_dates(db, user_id)
+            month = db.get_event_counts_by_date(user_id, "2025-06-01", "2025-06-30")
+            before = median_ms(rounds, lambda: all_event_dates(db, user_id))
+            after = median_ms(rounds, lambda: db.get_event_counts_by_date(user_id, "2025-06-01", "2025-06-30"))
+            print(f"{years:>2} years  all dates {len(dates):>5} days {before:>7.3f} ms"
+                  f"  visible month {len(month):>3} days {after:>7.3f} ms")
+        db.conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Event selection latency: the old per-call lookups vs get_event_detail, and a
+# detail already prefetched into the query cache, for events with increasingly
+# large guest lists.
+# Run from the repository root: python -m benchmarks.bench_detail [rounds]
+import os
+import statistics
+import sys
+import tempfile
+import time
+from event_planner.cache import QUERY_CACHE_SIZE
+from event_planner.database import EventDatabase
+
+
+def seed(db, user_id, guests):
+    event_id = db.add_events_bulk(user_id, [("Event", "2025-06-01", "19:00", "Venue", "Description")])[0]
+    db.add_guests_bulk(event_id, ((f"Guest {i}", f"guest{i}@example.com") for i in range(guests)))
+    db.add_tasks_bulk(event_id, (f"Task {i}" for i in range(50)))
+    return event_id
+
+
+def separate_calls(db, user_id, event_id):
+    event = db.get_event_by_id(event_id)
+    if event[1] != user_id:
+        return None
+    return event, db.get_guests_for_event(event_id), db.get_tasks_for_event(event_id), \
+        db.get_tasks_for_event(event_id)
+
+
+def median_ms(rounds, fn):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        db = EventDatabase(path)
+        cached = EventDatabase(path, cache_size=QUERY_CACHE_SIZE)
+        user_id = db.create_user("bench", "password")
+        for guests in (100, 1000, 10000, 50000):
+            event_id = seed(db, user_id, guests)
+            before = median_ms(rounds, lambda: separate_calls(db, user_id, event_id))
+            after = median_ms(rounds, lambda: db.get_event_detail(event_id, user_id))
+            # What the prefetcher leaves behind: the detail read elsewhere, then handed over
+            cached.cache_event_detail(event_id, user_id, db.get_event_detail(event_id, user_id),
+                                      cached.cache.version)
+            hit = median_ms(rounds, lambda: cached.get_event_detail(event_id, user_id))
+            print(f"{guests:>6} guests  separate calls {before:>8.2f} ms  get_event_detail {after:>8.2f} ms"
+                  f"  prefetched {hit:>8.3f} ms")
+        cached.conn.close()
+        db.conn.close()
+
+
+if __name__ == "__main__":
+    main()
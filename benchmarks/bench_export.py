@@ -0,0 +1,54 @@
+# CSV export throughput and peak Python memory on a multi-million-row account.
+# Run from the repository root: python -m benchmarks.bench_export [events]
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from event_planner.database import EventDatabase
+from event_planner.export import export_csv_snapshot
+
+
+def seed(db, events):
+    user_id = db.create_user("bench", "password")
+    with db.conn:
+        db.conn.executemany('''
+            INSERT INTO events (id, user_id, name, date, time, venue, description)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', ((i, user_id, f"Event {i}", "2025-06-01", "19:00", "Venue", "Description " * 4)
+              for i in range(1, events + 1)))
+        db.conn.executemany('INSERT INTO tasks (event_id, description) VALUES (?, ?)',
+                            ((i % events + 1, f"Task {i}") for i in range(events * 5)))
+        db.conn.executemany('INSERT INTO guests (event_id, name, email) VALUES (?, ?, ?)',
+                            ((i % events + 1, f"Guest {i}", f"guest{i}@example.com") for i in range(events * 5)))
+    return user_id
+
+
+def run(db, user_id, out, compress):
+    start = time.perf_counter()
+    rows = db.export_to_csv(user_id, out, compress=compress)
+    elapsed = time.perf_counter() - start
+    # Separate pass: tracemalloc slows the export down considerably
+    tracemalloc.start()
+    db.export_to_csv(user_id, out, compress=compress)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, elapsed, peak
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = EventDatabase(os.path.join(tmp, "bench.db"))
+        user_id = seed(db, events)
+        for compress in (False, True):
+            rows, elapsed, peak = run(db, user_id, os.path.join(tmp, "export"), compress)
+            label = "csv.gz" if compress else "csv"
+            print(f"{label:<16}{rows:>10} rows  {rows / elapsed:>10.0f} rows/s  peak {peak / 1024 / 1024:.1f} MiB")
+            stats = export_csv_snapshot(db.db_name, user_id, os.path.join(tmp, "parallel"), compress=compress)
+            print(f"{label + ' parallel':<16}{stats['rows']:>10} rows  {stats['rows_per_second']:>10.0f} rows/s")
+        db.conn.close()
+
+
+if __name__ == "__main__":
+    main()
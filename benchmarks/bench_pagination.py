@@ -0,0 +1,43 @@
+# Time to first page vs. a full fetchall as one user's event count grows.
+# Run from the repository root: python -m benchmarks.bench_pagination
+import os
+import tempfile
+import time
+from event_planner.database import EventDatabase
+
+
+def seed(db, user_id, count):
+    with db.conn:
+        db.conn.executemany('''
+            INSERT INTO events (user_id, name, date, time, venue, description)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', ((user_id, f"Event {i}", f"20{20 + i % 10}-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+               f"{i % 24:02d}:00", "Venue", "Description") for i in range(count)))
+
+
+def main():
+    print(f"{'events':>8}{'fetchall ms':>14}{'first page ms':>15}{'deep page ms':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = EventDatabase(os.path.join(tmp, "bench.db"))
+        user_id = db.create_user("bench", "password")
+        total = 0
+        for count in (1000, 10000, 100000):
+            seed(db, user_id, count - total)
+            total = count
+            start = time.perf_counter()
+            db.get_all_events(user_id)
+            full = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            rows, cursor = db.get_all_events_page(user_id, page_size=200)
+            first = (time.perf_counter() - start) * 1000
+            for _ in range(20):
+                rows, cursor = db.get_all_events_page(user_id, page_size=200, cursor=cursor)
+            start = time.perf_counter()
+            db.get_all_events_page(user_id, page_size=200, cursor=cursor)
+            deep = (time.perf_counter() - start) * 1000
+            print(f"{count:>8}{full:>14.2f}{first:>15.2f}{deep:>14.2f}")
+        db.conn.close()
+
+
+if __name__ == "__main__":
+    main()
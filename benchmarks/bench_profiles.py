@@ -0,0 +1,38 @@
+# Write/read throughput of each SQLite connection profile.
+# Run from the repository root: python -m benchmarks.bench_profiles [events]
+import os
+import sys
+import tempfile
+import time
+from event_planner.database import EventDatabase, CONNECTION_PROFILES
+
+
+def bench_profile(profile, count):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = EventDatabase(os.path.join(tmp, "bench.db"), profile=profile)
+        user_id = db.create_user("bench", "password")
+        start = time.perf_counter()
+        # One transaction per call, the way the UI writes
+        for i in range(count):
+            db.add_event(user_id, f"Event {i}", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                         "19:00", "Venue", "Description")
+        write_rate = count / (time.perf_counter() - start)
+        start = time.perf_counter()
+        reads = 0
+        for _ in range(20):
+            reads += len(db.get_all_events(user_id))
+        read_rate = reads / (time.perf_counter() - start)
+        db.conn.close()
+    return write_rate, read_rate
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"{'profile':<12}{'writes/s':>12}{'rows read/s':>14}")
+    for profile in CONNECTION_PROFILES:
+        write_rate, read_rate = bench_profile(profile, count)
+        print(f"{profile:<12}{write_rate:>12.0f}{read_rate:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
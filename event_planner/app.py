@@ -1,28 +1,53 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit,
-    QCalendarWidget, QTableWidget, QTableWidgetItem, QHeaderView,
+    QCalendarWidget, QTableWidget, QTableWidgetItem, QTableView, QHeaderView,
     QTextBrowser, QStatusBar, QScrollArea, QStackedWidget, QFileDialog,
     QDialog, QMessageBox
 )
-from PyQt5.QtCore import Qt, QDate
+from PyQt5.QtCore import Qt, QDate, QThreadPool
 from PyQt5.QtGui import QTextCharFormat, QFont, QColor
+from .cache import QUERY_CACHE_SIZE
 from .database import EventDatabase
 from .delegates import CheckBoxDelegate
+from .models import EventTableModel
+from .search import EventSearch, fetch_search_page
+from .prefetch import DetailPrefetcher, prefetch_rows
+from .export import export_csv_snapshot, export_snapshot_file, restore_snapshot_file
+from .importers import import_guests_csv_file, import_export_file
+from .backup import UP_TO_DATE, backup_user, recover_user
+from .backup_client import normalize_api_url
+from .workers import Job
 from .dialogs import (
     EventDialog, LoginDialog, SignupDialog, SettingsDialog,
     GuestDialog, TaskDialog
 )
 import sqlite3
+import threading
+from functools import partial
+
+CALENDAR_HIGHLIGHT = "#FF6584"
+# Highlight alpha for days with 1, 2, 3 and 4+ events
+CALENDAR_HIGHLIGHT_ALPHAS = (90, 150, 210, 255)
 
 class EventPlannerApp(QWidget):
     def __init__(self):
         super().__init__()
-        self.db = EventDatabase()
+        self.db = EventDatabase(cache_size=QUERY_CACHE_SIZE)
+        self.event_search = EventSearch(self.db, self)
+        self.event_search.results_ready.connect(self.show_search_results)
+        self.event_search.search_failed.connect(self.show_search_error)
+        self.detail_prefetcher = DetailPrefetcher(self.db, self)
         self.current_user_id = None
         self.current_username = None
+        # Background jobs in flight; each disables its own button until it ends
+        self.import_job = None
+        self.export_job = None
+        self.data_import_job = None
+        self.snapshot_job = None
+        self.backup_job = None
+        self.calendar_highlights = {}  # "yyyy-MM-dd" -> highlight level shown
         self.is_fullscreen = False
         self.is_dark_theme = True
-        self.event_id_map = {}  # Map row to event ID
         self.task_id_map = {}   # Map row to task ID
         self.guest_id_map = {}  # Map row to guest ID
         self.stacked_widget = QStackedWidget()
@@ -297,6 +322,7 @@ class EventPlannerApp(QWidget):
         self.sidebar.addWidget(self.search_input)
         self.calendar = QCalendarWidget()
         self.calendar.selectionChanged.connect(self.calendar_date_selected)
+        self.calendar.currentPageChanged.connect(self.highlight_calendar)
         self.sidebar.addWidget(self.calendar)
         nav_layout = QHBoxLayout()
         self.today_btn = QPushButton("Today")
@@ -324,6 +350,15 @@ class EventPlannerApp(QWidget):
         self.export_json_btn = QPushButton("Export to JSON")
         self.export_json_btn.setProperty("class", "accent")
         self.export_json_btn.clicked.connect(self.export_to_json)
+        self.import_data_btn = QPushButton("Import Data")
+        self.import_data_btn.setProperty("class", "accent")
+        self.import_data_btn.clicked.connect(self.import_data)
+        self.export_snapshot_btn = QPushButton("Export Database Snapshot")
+        self.export_snapshot_btn.setProperty("class", "accent")
+        self.export_snapshot_btn.clicked.connect(self.export_snapshot)
+        self.restore_snapshot_btn = QPushButton("Restore from Snapshot")
+        self.restore_snapshot_btn.setProperty("class", "accent")
+        self.restore_snapshot_btn.clicked.connect(self.restore_snapshot)
         self.settings_btn = QPushButton("Settings")
         self.settings_btn.setProperty("class", "accent")
         self.settings_btn.clicked.connect(self.show_settings_dialog)
@@ -337,6 +372,8 @@ class EventPlannerApp(QWidget):
         self.guest_buttons_layout.addWidget(self.add_guest_btn)
         self.guest_buttons_layout.addWidget(self.edit_guest_btn)
         self.guest_buttons_layout.addWidget(self.delete_guest_btn)
+        self.import_guests_btn = QPushButton("Import Guests from CSV")
+        self.import_guests_btn.clicked.connect(self.import_guests)
         self.task_buttons_layout = QHBoxLayout()
         self.add_task_btn = QPushButton("Add Task")
         self.add_task_btn.clicked.connect(self.add_task)
@@ -367,10 +404,14 @@ class EventPlannerApp(QWidget):
         button_layout.addWidget(self.edit_event_btn)
         button_layout.addWidget(self.delete_event_btn)
         button_layout.addLayout(self.guest_buttons_layout)
+        button_layout.addWidget(self.import_guests_btn)
         button_layout.addLayout(self.task_buttons_layout)
         button_layout.addWidget(self.archive_btn)
         button_layout.addWidget(self.export_csv_btn)
         button_layout.addWidget(self.export_json_btn)
+        button_layout.addWidget(self.import_data_btn)
+        button_layout.addWidget(self.export_snapshot_btn)
+        button_layout.addWidget(self.restore_snapshot_btn)
         button_layout.addWidget(self.settings_btn)
         button_layout.addWidget(self.fullscreen_btn)
         button_layout.addWidget(self.theme_toggle_btn)
@@ -386,12 +427,16 @@ class EventPlannerApp(QWidget):
         right_panel.setContentsMargins(10, 10, 10, 10)
         self.events_label = QLabel("Events")
         self.events_label.setFont(QFont("Arial", 12, QFont.Bold))
-        self.events_table = QTableWidget()
-        self.events_table.setColumnCount(5)
-        self.events_table.setHorizontalHeaderLabels(["Name", "Date", "Time", "Venue", "Description"])
+        self.events_model = EventTableModel(self)
+        self.events_table = QTableView()
+        self.events_table.setModel(self.events_model)
+        # A reset drops the selection without emitting selectionChanged
+        self.events_model.modelReset.connect(self.clear_selection)
         self.events_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
-        self.events_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.events_table.itemSelectionChanged.connect(self.on_event_selection_changed)
+        self.events_table.setSelectionBehavior(QTableView.SelectRows)
+        self.events_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.events_table.selectionModel().selectionChanged.connect(self.on_event_selection_changed)
+        self.events_table.verticalScrollBar().valueChanged.connect(self.on_events_scrolled)
         right_panel.addWidget(self.events_label)
         right_panel.addWidget(self.events_table)
         self.details_label = QLabel("Details")
@@ -431,6 +476,10 @@ class EventPlannerApp(QWidget):
         right_panel.addWidget(tasks_scroll)
         self.status_bar = QStatusBar()
         self.status_bar.setFont(QFont("Arial", 9))
+        self.cancel_backup_btn = QPushButton("Cancel")
+        self.cancel_backup_btn.clicked.connect(self.cancel_backup_job)
+        self.cancel_backup_btn.hide()
+        self.status_bar.addPermanentWidget(self.cancel_backup_btn)
         right_panel.addWidget(self.status_bar)
         layout.addWidget(sidebar_scroll, 1)
         layout.addLayout(right_panel, 2)
@@ -439,6 +488,7 @@ class EventPlannerApp(QWidget):
         self.edit_event_btn.setEnabled(enabled)
         self.delete_event_btn.setEnabled(enabled)
         self.add_guest_btn.setEnabled(enabled)
+        self.import_guests_btn.setEnabled(enabled and self.import_job is None)
         self.add_task_btn.setEnabled(enabled)
 
     def toggle_guest_buttons(self, enabled):
@@ -450,11 +500,36 @@ class EventPlannerApp(QWidget):
         self.delete_task_btn.setEnabled(enabled)
 
     def on_event_selection_changed(self):
-        has_selection = bool(self.events_table.currentItem())
+        has_selection = self.selected_event_id() is not None
         self.toggle_event_buttons(has_selection)
         if has_selection:
+            # Refreshes the archive button as part of loading the event's tasks
             self.display_event_details()
-        self.check_archive_status()
+            self.prefetch_event_details()
+        else:
+            self.check_archive_status()
+
+    def on_events_scrolled(self):
+        self.prefetch_event_details(debounce=True)
+
+    def prefetch_event_details(self, debounce=False):
+        # Archived rows come from archived_events, which get_event_detail does not read
+        if not self.current_user_id or self.view_toggle.isChecked():
+            return
+        rows = prefetch_rows(
+            self.events_table.currentIndex().row(),
+            self.events_table.rowAt(0),
+            self.events_table.rowAt(self.events_table.viewport().height() - 1),
+            self.events_model.rowCount(),
+        )
+        self.detail_prefetcher.submit(self.current_user_id, [self.events_model.event_id(row) for row in rows],
+                                      debounce)
+
+    def selected_event_id(self):
+        index = self.events_table.currentIndex()
+        if not index.isValid():
+            return None
+        return self.events_model.event_id(index.row())
 
     def on_guest_selection_changed(self):
         self.toggle_guest_buttons(bool(self.guests_table.currentItem()))
@@ -521,10 +596,14 @@ class EventPlannerApp(QWidget):
                 QMessageBox.critical(self, "Database Error", str(e))
 
     def logout(self):
+        self.event_search.invalidate()
+        self.detail_prefetcher.cancel()
         self.current_user_id = None
         self.current_username = None
         self.stacked_widget.setCurrentIndex(0)
         self.setWindowTitle("Event Planner - Login")
+        self.events_model.clear()
+        self.set_calendar_highlights({})
         self.clear_selection()
 
     def add_event(self):
@@ -548,11 +627,8 @@ class EventPlannerApp(QWidget):
                 QMessageBox.critical(self, "Database Error", str(e))
 
     def edit_event(self):
-        if not self.events_table.currentItem() or not self.current_user_id:
-            return
-        current_row = self.events_table.currentRow()
-        event_id = self.event_id_map.get(current_row)
-        if event_id is None:
+        event_id = self.selected_event_id()
+        if event_id is None or not self.current_user_id:
             return
         event = self.db.get_event_by_id(event_id)
         if not event or event[1] != self.current_user_id:
@@ -578,17 +654,14 @@ class EventPlannerApp(QWidget):
                 QMessageBox.critical(self, "Database Error", str(e))
 
     def delete_event(self):
-        if not self.events_table.currentItem() or not self.current_user_id:
-            return
-        current_row = self.events_table.currentRow()
-        event_id = self.event_id_map.get(current_row)
-        if event_id is None:
+        event_id = self.selected_event_id()
+        if event_id is None or not self.current_user_id:
             return
-        event_name = self.events_table.item(current_row, 0).text()
         event = self.db.get_event_by_id(event_id)
         if not event or event[1] != self.current_user_id:
             QMessageBox.critical(self, "Error", "You can only delete your own events")
             return
+        event_name = event[2]
         reply = QMessageBox.question(
             self, 'Delete Event', 
             f"Are you sure you want to delete '{event_name}' and all its tasks/guests?",
@@ -604,18 +677,15 @@ class EventPlannerApp(QWidget):
                 QMessageBox.critical(self, "Database Error", str(e))
 
     def archive_event(self):
-        if not self.current_user_id or not self.events_table.currentItem():
-            return
-        current_row = self.events_table.currentRow()
-        event_id = self.event_id_map.get(current_row)
-        if event_id is None:
+        event_id = self.selected_event_id()
+        if not self.current_user_id or event_id is None:
             return
         event = self.db.get_event_by_id(event_id)
         if not event or event[1] != self.current_user_id:
             QMessageBox.critical(self, "Error", "You can only archive your own events")
             return
-        tasks = self.db.get_tasks_for_event(event_id)
-        if tasks and not all(task[3] for task in tasks):
+        total, done = self.db.get_task_counts(event_id)
+        if done < total:
             QMessageBox.critical(self, "Cannot Archive", 
                               "All tasks must be completed before archiving")
             return
@@ -643,39 +713,52 @@ class EventPlannerApp(QWidget):
     def load_events(self, show_archived=False):
         if not self.current_user_id:
             return
-        self.events_table.setRowCount(0)
-        self.event_id_map.clear()
-        self.calendar.setDateTextFormat(QDate(), QTextCharFormat())
+        self.event_search.invalidate()
         if show_archived:
-            events = self.db.get_archived_events(self.current_user_id)
-            highlight_format = QTextCharFormat()
-            highlight_format.setBackground(QColor("#3E4351" if self.is_dark_theme else "#E0E0E0"))
-        else:
-            events = self.db.get_all_events(self.current_user_id)
+            self.events_model.load(partial(self.db.get_archived_events_page, self.current_user_id))
+            self.set_calendar_highlights({})
+            return
+        self.events_model.load(partial(self.db.get_all_events_page, self.current_user_id))
+        self.highlight_calendar()
+
+    def highlight_calendar(self, year=None, month=None):
+        # Only the month on screen is queried; currentPageChanged brings in the next one
+        if not self.current_user_id or self.view_toggle.isChecked():
+            self.set_calendar_highlights({})
+            return
+        if year is None:
+            year, month = self.calendar.yearShown(), self.calendar.monthShown()
+        first = QDate(year, month, 1)
+        last = first.addMonths(1).addDays(-1)
+        counts = self.db.get_event_counts_by_date(
+            self.current_user_id, first.toString("yyyy-MM-dd"), last.toString("yyyy-MM-dd")
+        )
+        self.set_calendar_highlights(counts)
+
+    def set_calendar_highlights(self, counts):
+        # Touches only the days whose level changed, instead of resetting every
+        # format with a null QDate, which repaints the whole calendar
+        levels = {date: min(count, len(CALENDAR_HIGHLIGHT_ALPHAS)) for date, count in counts.items() if count}
+        for date in self.calendar_highlights.keys() - levels.keys():
+            self.calendar.setDateTextFormat(QDate.fromString(date, "yyyy-MM-dd"), QTextCharFormat())
+        for date, level in levels.items():
+            if self.calendar_highlights.get(date) == level:
+                continue
+            color = QColor(CALENDAR_HIGHLIGHT)
+            color.setAlpha(CALENDAR_HIGHLIGHT_ALPHAS[level - 1])
             highlight_format = QTextCharFormat()
-            highlight_format.setBackground(QColor("#FF6584"))
-        self.events_table.setRowCount(len(events))
-        for row, event in enumerate(events):
-            date = QDate.fromString(event[3], "yyyy-MM-dd")
-            if not show_archived:
-                self.calendar.setDateTextFormat(date, highlight_format)
-            self.event_id_map[row] = event[0]
-            self.events_table.setItem(row, 0, QTableWidgetItem(event[2]))
-            self.events_table.setItem(row, 1, QTableWidgetItem(event[3]))
-            self.events_table.setItem(row, 2, QTableWidgetItem(event[4] if event[4] else ""))
-            self.events_table.setItem(row, 3, QTableWidgetItem(event[5]))
-            self.events_table.setItem(row, 4, QTableWidgetItem(event[6]))
+            highlight_format.setBackground(color)
+            self.calendar.setDateTextFormat(QDate.fromString(date, "yyyy-MM-dd"), highlight_format)
+        self.calendar_highlights = levels
 
     def display_event_details(self):
-        if not self.events_table.currentItem() or not self.current_user_id:
-            return
-        current_row = self.events_table.currentRow()
-        event_id = self.event_id_map.get(current_row)
-        if event_id is None:
+        event_id = self.selected_event_id()
+        if event_id is None or not self.current_user_id:
             return
-        event = self.db.get_event_by_id(event_id)
-        if not event or event[1] != self.current_user_id:
+        detail = self.db.get_event_detail(event_id, self.current_user_id)
+        if not detail:
             return
+        event = detail['event']
         self.current_event_id = event_id
         time_str = f"<b>Time:</b> {event[4]}<br>" if event[4] else ""
         archived_str = "<b>Status:</b> Archived<br>" if len(event) > 7 and event[7] else ""
@@ -688,15 +771,16 @@ class EventPlannerApp(QWidget):
             f"<p>{event[6].replace('\n', '<br>')}</p>"
         )
         self.details_panel.setHtml(details)
-        self.load_guests()
-        self.load_tasks()
+        self.load_guests(detail['guests'])
+        self.load_tasks(detail['tasks'], detail['task_counts'])
 
-    def load_guests(self):
+    def load_guests(self, guests=None):
         self.guests_table.setRowCount(0)
         self.guest_id_map.clear()
         if not self.current_event_id:
             return
-        guests = self.db.get_guests_for_event(self.current_event_id)
+        if guests is None:
+            guests = self.db.get_guests_for_event(self.current_event_id)
         self.guests_table.setRowCount(len(guests))
         for row, guest in enumerate(guests):
             self.guest_id_map[row] = guest[0]
@@ -704,30 +788,39 @@ class EventPlannerApp(QWidget):
             self.guests_table.setItem(row, 1, QTableWidgetItem(guest[3] or ""))
         self.guests_label.setText(f"Guests ({len(guests)})")
 
-    def load_tasks(self):
+    def load_tasks(self, tasks=None, task_counts=None):
         self.tasks_table.setRowCount(0)
         self.task_id_map.clear()
         if not self.current_event_id:
             return
-        tasks = self.db.get_tasks_for_event(self.current_event_id)
-        self.tasks_table.setRowCount(len(tasks))
-        for row, task in enumerate(tasks):
-            self.task_id_map[row] = task[0]
-            self.tasks_table.setItem(row, 0, QTableWidgetItem(task[2]))
-            item = QTableWidgetItem()
-            item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
-            item.setCheckState(Qt.Checked if task[3] else Qt.Unchecked)
-            self.tasks_table.setItem(row, 1, item)
-        self.tasks_label.setText(f"Tasks ({len(tasks)})")
-        self.check_archive_status()
-
-    def check_archive_status(self):
+        if tasks is None:
+            tasks = self.db.get_tasks_for_event(self.current_event_id)
+        # Filling the table must not reach on_task_status_changed, which would write
+        # every task's status back to the database
+        self.tasks_table.blockSignals(True)
+        try:
+            self.tasks_table.setRowCount(len(tasks))
+            for row, task in enumerate(tasks):
+                self.task_id_map[row] = task[0]
+                self.tasks_table.setItem(row, 0, QTableWidgetItem(task[2]))
+                item = QTableWidgetItem()
+                item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
+                item.setCheckState(Qt.Checked if task[3] else Qt.Unchecked)
+                self.tasks_table.setItem(row, 1, item)
+        finally:
+            self.tasks_table.blockSignals(False)
+        self.check_archive_status(task_counts)
+
+    def check_archive_status(self, task_counts=None):
         if not self.current_event_id:
             self.archive_btn.setEnabled(False)
             return
-        tasks = self.db.get_tasks_for_event(self.current_event_id)
-        can_archive = not tasks or all(task[3] for task in tasks)
-        self.archive_btn.setEnabled(can_archive and not self.view_toggle.isChecked())
+        if task_counts is None:
+            # Archived events are no longer in events and have no tasks left
+            task_counts = self.db.get_task_counts(self.current_event_id) or (0, 0)
+        total, done = task_counts
+        self.tasks_label.setText(f"Tasks ({total})")
+        self.archive_btn.setEnabled(done == total and not self.view_toggle.isChecked())
 
     def add_guest(self):
         if not self.current_event_id:
@@ -742,6 +835,42 @@ class EventPlannerApp(QWidget):
             except sqlite3.Error as e:
                 QMessageBox.critical(self, "Database Error", str(e))
 
+    def import_guests(self):
+        if not self.current_event_id:
+            return
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "Import Guests from CSV", "", "CSV Files (*.csv)"
+        )
+        if not filename:
+            return
+        job = Job(import_guests_csv_file, self.db.db_name, self.current_event_id, filename,
+                  profile=self.db.profile)
+        job.signals.progress.connect(self.on_guest_import_progress)
+        job.signals.finished.connect(self.on_guest_import_finished)
+        job.signals.failed.connect(self.on_guest_import_failed)
+        self.import_job = job
+        self.import_guests_btn.setEnabled(False)
+        self.status_bar.showMessage("Importing guests...")
+        QThreadPool.globalInstance().start(job)
+
+    def on_guest_import_progress(self, table, rows):
+        self.status_bar.showMessage(f"Importing guests: {rows} rows read")
+
+    def on_guest_import_finished(self, stats):
+        self.import_job = None
+        self.import_guests_btn.setEnabled(self.current_event_id is not None)
+        self.status_bar.showMessage(
+            f"Imported {stats['imported']} guests "
+            f"({stats['duplicates']} duplicates, {stats['invalid']} invalid rows skipped)", 5000
+        )
+        self.load_guests()
+
+    def on_guest_import_failed(self, message):
+        self.import_job = None
+        self.import_guests_btn.setEnabled(self.current_event_id is not None)
+        self.status_bar.clearMessage()
+        QMessageBox.critical(self, "Import Error", message)
+
     def edit_guest(self):
         if not self.guests_table.currentItem() or not self.current_event_id:
             return
@@ -856,63 +985,274 @@ class EventPlannerApp(QWidget):
     def export_to_csv(self):
         if not self.current_user_id:
             return
-        filename, _ = QFileDialog.getSaveFileName(
-            self, "Export to CSV", "", "CSV Files (*.csv)"
+        filename, selected_filter = QFileDialog.getSaveFileName(
+            self, "Export to CSV", "", "CSV Files (*.csv);;Compressed CSV Files (*.csv.gz)"
         )
         if filename:
+            compress = filename.endswith('.csv.gz') or selected_filter.startswith("Compressed")
+            if filename.endswith('.gz'):
+                filename = filename[:-3]
             if not filename.endswith('.csv'):
                 filename += '.csv'
-            try:
-                self.db.export_to_csv(self.current_user_id, filename[:-4])
-                self.status_bar.showMessage("Data exported to CSV successfully", 3000)
-            except Exception as e:
-                QMessageBox.critical(self, "Export Error", str(e))
+            # Runs on its own connections so the UI can keep editing meanwhile
+            job = Job(export_csv_snapshot, self.db.db_name, self.current_user_id, filename[:-4],
+                      compress=compress)
+            job.signals.progress.connect(self.on_csv_export_progress)
+            job.signals.finished.connect(self.on_csv_export_finished)
+            job.signals.failed.connect(self.on_csv_export_failed)
+            self.export_job = job
+            self.export_csv_btn.setEnabled(False)
+            self.status_bar.showMessage("Exporting to CSV...")
+            QThreadPool.globalInstance().start(job)
+
+    def on_csv_export_progress(self, table, rows):
+        self.status_bar.showMessage(f"Exporting {table}: {rows} rows")
+
+    def on_csv_export_finished(self, stats):
+        self.export_job = None
+        self.export_csv_btn.setEnabled(True)
+        self.status_bar.showMessage(
+            f"Exported {stats['rows']} rows to CSV in {stats['seconds']:.1f}s "
+            f"({stats['rows_per_second']:.0f} rows/s)", 5000
+        )
+
+    def on_csv_export_failed(self, message):
+        self.export_job = None
+        self.export_csv_btn.setEnabled(True)
+        self.status_bar.clearMessage()
+        QMessageBox.critical(self, "Export Error", message)
 
     def export_to_json(self):
         if not self.current_user_id:
             return
-        filename, _ = QFileDialog.getSaveFileName(
-            self, "Export to JSON", "", "JSON Files (*.json)"
+        filename, selected_filter = QFileDialog.getSaveFileName(
+            self, "Export to JSON", "", "JSON Files (*.json);;NDJSON Files (*.ndjson)"
         )
         if filename:
-            if not filename.endswith('.json'):
-                filename += '.json'
             try:
-                self.db.export_to_json(self.current_user_id, filename[:-5])
+                if filename.endswith('.ndjson') or selected_filter.startswith("NDJSON"):
+                    if not filename.endswith('.ndjson'):
+                        filename += '.ndjson'
+                    self.db.export_to_ndjson(self.current_user_id, filename[:-7])
+                else:
+                    if not filename.endswith('.json'):
+                        filename += '.json'
+                    self.db.export_to_json(self.current_user_id, filename[:-5])
                 self.status_bar.showMessage("Data exported to JSON successfully", 3000)
             except Exception as e:
                 QMessageBox.critical(self, "Export Error", str(e))
 
+    def import_data(self):
+        if not self.current_user_id:
+            return
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "Import Data", "",
+            "Event Planner Exports (*.json *.ndjson *_events.csv *_events.csv.gz);;All Files (*)"
+        )
+        if not filename:
+            return
+        job = Job(import_export_file, self.db.db_name, self.current_user_id, filename,
+                  profile=self.db.profile)
+        job.signals.progress.connect(self.on_data_import_progress)
+        job.signals.finished.connect(self.on_data_import_finished)
+        job.signals.failed.connect(self.on_data_import_failed)
+        self.data_import_job = job
+        self.import_data_btn.setEnabled(False)
+        self.status_bar.showMessage("Importing data...")
+        QThreadPool.globalInstance().start(job)
+
+    def on_data_import_progress(self, table, rows):
+        self.status_bar.showMessage(f"Importing {table}: {rows} rows")
+
+    def on_data_import_finished(self, counts):
+        self.data_import_job = None
+        self.import_data_btn.setEnabled(True)
+        self.status_bar.showMessage(
+            f"Imported {counts['events']} events, {counts['archived_events']} archived events, "
+            f"{counts['tasks']} tasks and {counts['guests']} guests", 5000
+        )
+        self.load_events(self.view_toggle.isChecked())
+
+    def on_data_import_failed(self, message):
+        self.data_import_job = None
+        self.import_data_btn.setEnabled(True)
+        self.status_bar.clearMessage()
+        QMessageBox.critical(self, "Import Error", message)
+
+    def snapshot_allowed(self, title):
+        # A snapshot is the whole database file: every account's events and password
+        # hashes. Only offer it while this planner holds the current account alone.
+        if self.db.count_users() > 1:
+            QMessageBox.warning(self, title,
+                                "Snapshots copy every account in this planner, including their "
+                                "passwords, so they are only available when it has a single account. "
+                                "Use Export to JSON to save your own events.")
+            return False
+        return True
+
+    def export_snapshot(self):
+        if not self.current_user_id or not self.snapshot_allowed("Export Database Snapshot"):
+            return
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "Export Database Snapshot", "", "Event Planner Snapshots (*.db)"
+        )
+        if not filename:
+            return
+        if not filename.endswith('.db'):
+            filename += '.db'
+        job = Job(export_snapshot_file, self.db.db_name, filename, profile=self.db.profile)
+        self.start_snapshot_job(job, "Exporting snapshot...", self.on_snapshot_exported)
+
+    def restore_snapshot(self):
+        if not self.current_user_id or not self.snapshot_allowed("Restore from Snapshot"):
+            return
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "Restore from Snapshot", "", "Event Planner Snapshots (*.db);;All Files (*)"
+        )
+        if not filename:
+            return
+        reply = QMessageBox.question(
+            self, 'Restore from Snapshot',
+            "This will replace all data in this planner with the snapshot. "
+            "Are you sure you want to proceed?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        job = Job(restore_snapshot_file, self.db.db_name, filename, profile=self.db.profile)
+        self.start_snapshot_job(job, "Restoring snapshot...", self.on_snapshot_restored)
+
+    def start_snapshot_job(self, job, message, on_finished):
+        job.signals.progress.connect(self.on_snapshot_progress)
+        job.signals.finished.connect(on_finished)
+        job.signals.failed.connect(self.on_snapshot_failed)
+        self.snapshot_job = job
+        self.export_snapshot_btn.setEnabled(False)
+        self.restore_snapshot_btn.setEnabled(False)
+        self.status_bar.showMessage(message)
+        QThreadPool.globalInstance().start(job)
+
+    def finish_snapshot_job(self):
+        self.snapshot_job = None
+        self.export_snapshot_btn.setEnabled(True)
+        self.restore_snapshot_btn.setEnabled(True)
+
+    def on_snapshot_progress(self, label, pages):
+        self.status_bar.showMessage(f"Copied {pages} {label}")
+
+    def on_snapshot_exported(self, path):
+        self.finish_snapshot_job()
+        self.status_bar.showMessage(f"Snapshot saved to {path}", 5000)
+
+    def on_snapshot_restored(self, path):
+        self.finish_snapshot_job()
+        if not self.db.get_user_by_id(self.current_user_id):
+            QMessageBox.information(self, "Snapshot Restored",
+                                    "Your account is not in this snapshot. Please log in again.")
+            self.logout()
+            return
+        self.clear_selection()
+        self.load_events(self.view_toggle.isChecked())
+        self.status_bar.showMessage("Snapshot restored successfully", 5000)
+
+    def on_snapshot_failed(self, message):
+        self.finish_snapshot_job()
+        self.status_bar.clearMessage()
+        QMessageBox.critical(self, "Snapshot Error", message)
+
+    def start_backup(self, api_url):
+        if self.db.is_backup_current(self.current_user_id, normalize_api_url(api_url)):
+            self.on_backup_up_to_date()
+            return
+        job = Job(backup_user, self.db.db_name, self.current_user_id, api_url, profile=self.db.profile)
+        self.start_backup_job(job, "Backing up data...", self.on_backup_finished)
+
+    def start_recovery(self, api_url):
+        job = Job(recover_user, self.db.db_name, self.current_user_id, api_url, profile=self.db.profile)
+        self.start_backup_job(job, "Recovering data...", self.on_recovery_finished)
+
+    def start_backup_job(self, job, message, on_finished):
+        if self.backup_job:
+            QMessageBox.warning(self, "Busy", "A backup or recovery is already running")
+            return
+        job.kwargs['cancel'] = threading.Event()
+        job.signals.progress.connect(self.on_backup_progress)
+        job.signals.finished.connect(on_finished)
+        job.signals.failed.connect(self.on_backup_failed)
+        self.backup_job = job
+        self.cancel_backup_btn.show()
+        self.status_bar.showMessage(message)
+        QThreadPool.globalInstance().start(job)
+
+    def cancel_backup_job(self):
+        if self.backup_job:
+            self.backup_job.kwargs['cancel'].set()
+            self.cancel_backup_btn.setEnabled(False)
+            self.status_bar.showMessage("Cancelling...")
+
+    def finish_backup_job(self):
+        cancelled = self.backup_job.kwargs['cancel'].is_set()
+        self.backup_job = None
+        self.cancel_backup_btn.hide()
+        self.cancel_backup_btn.setEnabled(True)
+        return cancelled
+
+    def on_backup_progress(self, label, count):
+        self.status_bar.showMessage(f"Transferred {count} {label}")
+
+    def on_backup_up_to_date(self):
+        self.status_bar.showMessage("Backup already up to date", 5000)
+        QMessageBox.information(self, "Backup Data", "Your backup is already up to date.")
+
+    def on_backup_finished(self, message):
+        self.finish_backup_job()
+        if message == UP_TO_DATE:
+            self.on_backup_up_to_date()
+            return
+        self.status_bar.showMessage(f"Backup completed: {message}", 5000)
+        QMessageBox.information(self, "Backup Data", f"Backup completed: {message}")
+
+    def on_recovery_finished(self, user_id):
+        self.finish_backup_job()
+        if user_id != self.current_user_id:
+            return
+        self.clear_selection()
+        self.load_events(self.view_toggle.isChecked())
+        self.status_bar.showMessage("Data recovered successfully", 5000)
+        QMessageBox.information(self, "Recover Data", "Data recovered successfully")
+
+    def on_backup_failed(self, message):
+        if self.finish_backup_job():
+            self.status_bar.showMessage("Cancelled", 5000)
+            return
+        self.status_bar.clearMessage()
+        QMessageBox.critical(self, "Backup Error", message)
+
     def search_events(self, text):
         if not self.current_user_id:
             return
-        self.events_table.setRowCount(0)
-        self.event_id_map.clear()
-        events = self.db.search_events(self.current_user_id, text) if text else self.db.get_all_events(self.current_user_id)
-        self.events_table.setRowCount(len(events))
-        for row, event in enumerate(events):
-            self.event_id_map[row] = event[0]
-            self.events_table.setItem(row, 0, QTableWidgetItem(event[2]))
-            self.events_table.setItem(row, 1, QTableWidgetItem(event[3]))
-            self.events_table.setItem(row, 2, QTableWidgetItem(event[4] if event[4] else ""))
-            self.events_table.setItem(row, 3, QTableWidgetItem(event[5]))
-            self.events_table.setItem(row, 4, QTableWidgetItem(event[6]))
+        if not text:
+            # Back to the full, lazily paged list; load_events also cancels any pending search
+            self.load_events()
+            return
+        self.event_search.submit(self.current_user_id, text)
+
+    def show_search_results(self, query, events, cursor):
+        if not self.current_user_id or query != self.search_input.text():
+            return
+        fetch_page = partial(fetch_search_page, self.db, self.current_user_id, query)
+        self.events_model.set_page(fetch_page, events, cursor)
+
+    def show_search_error(self, query, message):
+        if query != self.search_input.text():
+            return
+        self.status_bar.showMessage(f"Search failed: {message}", 5000)
 
     def calendar_date_selected(self):
         if not self.current_user_id:
             return
         date_str = self.calendar.selectedDate().toString("yyyy-MM-dd")
-        self.events_table.setRowCount(0)
-        self.event_id_map.clear()
-        events = self.db.get_events_by_date(self.current_user_id, date_str)
-        self.events_table.setRowCount(len(events))
-        for row, event in enumerate(events):
-            self.event_id_map[row] = event[0]
-            self.events_table.setItem(row, 0, QTableWidgetItem(event[2]))
-            self.events_table.setItem(row, 1, QTableWidgetItem(event[3]))
-            self.events_table.setItem(row, 2, QTableWidgetItem(event[4] if event[4] else ""))
-            self.events_table.setItem(row, 3, QTableWidgetItem(event[5]))
-            self.events_table.setItem(row, 4, QTableWidgetItem(event[6]))
+        self.events_model.load(partial(self.db.get_events_by_date_page, self.current_user_id, date_str))
 
     def go_to_today(self):
         self.calendar.setSelectedDate(QDate.currentDate())
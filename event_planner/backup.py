@@ -0,0 +1,103 @@
+import hashlib
+import json
+import requests
+from .backup_client import BackupError, check_cancelled, get_client
+from .database import EventDatabase
+
+FULL_BACKUP_INTERVAL = 10
+UP_TO_DATE = "Already up to date"
+
+def backup_digest(data):
+    # Stable across runs: ignores when the backup was taken and its change sequence
+    content = {key: value for key, value in data.items() if key not in ('timestamp', 'seq')}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+def backup_user(db_name, user_id, api_url, progress=None, cancel=None, profile=None):
+    # Background-job entry points: each opens its own connection and checks the
+    # cancel event between steps; nothing is sent once cancel is set.
+    db = EventDatabase(db_name, profile)
+    try:
+        return upload_changes(db, get_client(api_url), user_id, progress, cancel)
+    except (KeyError, TypeError, ValueError) as e:
+        # Checked first: requests' JSONDecodeError is also a RequestException
+        raise BackupError(f"Invalid API response: {str(e)}")
+    except requests.exceptions.RequestException as e:
+        raise BackupError(f"Failed to connect to API: {str(e)}")
+    finally:
+        db.conn.close()
+
+def upload_changes(db, client, user_id, progress=None, cancel=None):
+    # Sends only the rows changed since the last acknowledged backup, with a full
+    # checkpoint every FULL_BACKUP_INTERVAL deltas, and whenever the server has no
+    # delta support or its latest backup is not the one the delta builds on.
+    # Nothing is sent when the account has not changed since the last backup.
+    if db.is_backup_current(user_id, client.api_url):
+        return UP_TO_DATE
+    acked_seq, deltas, digest = db.track_backups(user_id, client.api_url)
+    if acked_seq is not None and deltas < FULL_BACKUP_INTERVAL and client.deltas is not False:
+        delta = db.get_backup_delta(user_id, acked_seq)
+        if progress:
+            progress('changes', sum(len(rows) for part in ('upserts', 'deletes') for rows in delta[part].values()))
+        check_cancelled(cancel)
+        try:
+            message = client.post_delta(delta)['message']
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code in (404, 405):
+                client.deltas = False
+            elif e.response.status_code != 409:
+                raise
+        else:
+            client.deltas = True
+            db.acknowledge_backup(user_id, client.api_url, delta['seq'], full=False)
+            return message
+    data = db.get_backup_data(user_id, include_seq=True)
+    seq = data['seq']
+    content_digest = backup_digest(data)
+    if content_digest == digest:
+        # Rows changed and changed back since the last full backup
+        db.acknowledge_backup(user_id, client.api_url, seq, full=True, digest=digest)
+        return UP_TO_DATE
+    if progress:
+        progress('records', sum(len(data[table]) for table in ('events', 'archived_events', 'tasks', 'guests')))
+    check_cancelled(cancel)
+    message = client.upload_backup(data, progress=progress, cancel=cancel)['message']
+    db.acknowledge_backup(user_id, client.api_url, seq, full=True, digest=content_digest)
+    return message
+
+def recover_user(db_name, user_id, api_url, progress=None, cancel=None, profile=None):
+    # The download is streamed so cancel is honoured between chunks; the restore
+    # itself is a single transaction and is the last point where cancel is checked.
+    try:
+        chunks = []
+        received = 0
+        client = get_client(api_url)
+        download = client.iter_backup(user_id)
+        try:
+            for chunk in download:
+                check_cancelled(cancel)
+                chunks.append(chunk)
+                received += len(chunk)
+                if progress:
+                    progress('bytes', received)
+        finally:
+            download.close()
+        backup_data = json.loads(b''.join(chunks))
+        deltas = client.get_deltas(user_id)
+    except requests.exceptions.HTTPError as e:
+        if e.response.status_code == 404:
+            raise BackupError("No backup found for this user")
+        raise BackupError(f"API error: {str(e)}")
+    except requests.exceptions.RequestException as e:
+        raise BackupError(f"Failed to connect to API: {str(e)}")
+    except ValueError as e:
+        raise BackupError(f"Invalid API response: {str(e)}")
+    check_cancelled(cancel)
+    db = EventDatabase(db_name, profile)
+    try:
+        db.restore_backup_data(backup_data, deltas)
+        db.reset_backup_state(user_id)
+    except (KeyError, TypeError, ValueError) as e:
+        raise BackupError(f"Invalid backup data: {str(e)}")
+    finally:
+        db.conn.close()
+    return user_id
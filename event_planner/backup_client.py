@@ -0,0 +1,189 @@
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+
+BACKUP_TIMEOUT = 10
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+POOL_SIZE = 4
+RETRIES = 3
+BACKOFF = 0.5
+MAX_BACKOFF = 8
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+GZIP_LEVEL = 6
+CHUNK_SIZE = 256 * 1024
+UPLOAD_WORKERS = 4
+
+class BackupError(Exception):
+    pass
+
+class BackupCancelled(BackupError):
+    pass
+
+def check_cancelled(cancel):
+    if cancel is not None and cancel.is_set():
+        raise BackupCancelled("Cancelled")
+
+def normalize_api_url(api_url):
+    return api_url.strip().rstrip('/')
+
+def split_chunks(body, chunk_size=CHUNK_SIZE):
+    return [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+
+def backup_manifest(user_id, body, chunks):
+    return {
+        'user_id': user_id,
+        'size': len(body),
+        'sha256': hashlib.sha256(body).hexdigest(),
+        'chunks': [hashlib.sha256(chunk).hexdigest() for chunk in chunks],
+    }
+
+class BackupClient:
+    # One persistent Session per API host so repeated backups reuse the pooled
+    # TCP/TLS connection. Requests are retried on connection errors and transient
+    # statuses with capped exponential backoff and full jitter.
+    # compress=None negotiates gzip request bodies: they are sent plain until a
+    # response advertises "Accept-Encoding: gzip" (RFC 7694). True/False force it.
+    def __init__(self, api_url, timeout=BACKUP_TIMEOUT, retries=RETRIES, backoff=BACKOFF,
+                 max_backoff=MAX_BACKOFF, pool_size=POOL_SIZE, compress=None, session=None):
+        self.api_url = normalize_api_url(api_url)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.compress = compress
+        # None until the server has been asked whether it supports chunked uploads
+        self.chunked = None
+        # Likewise for delta uploads
+        self.deltas = None
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Accept-Encoding'] = 'gzip'
+
+    def close(self):
+        self.session.close()
+
+    def retry_delay(self, attempt, response=None):
+        if response is not None and response.headers.get('Retry-After', '').isdigit():
+            return min(int(response.headers['Retry-After']), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.request(method, f"{self.api_url}{path}", **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.retry_delay(attempt))
+                continue
+            if self.compress is None and 'gzip' in response.headers.get('Accept-Encoding', ''):
+                self.compress = True
+            if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                response.raise_for_status()
+                return response
+            response.close()
+            time.sleep(self.retry_delay(attempt, response))
+
+    def send(self, method, path, body, content_type='application/json'):
+        headers = {'Content-Type': content_type}
+        if self.compress:
+            try:
+                return self.request(method, path, data=gzip.compress(body, GZIP_LEVEL),
+                                    headers={**headers, 'Content-Encoding': 'gzip'})
+            except requests.exceptions.HTTPError as e:
+                # 415 is the standard refusal, but plain JSON endpoints tend to answer 400
+                # when they try to parse the compressed bytes
+                if e.response.status_code not in (400, 415):
+                    raise
+                # Stop trying for this client
+                self.compress = False
+        return self.request(method, path, data=body, headers=headers)
+
+    def post_backup(self, data):
+        body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        return self.send('POST', '/backup', body).json()
+
+    def upload_backup(self, data, progress=None, cancel=None, chunk_size=CHUNK_SIZE, workers=UPLOAD_WORKERS):
+        # Chunked upload: the body is split into sha256-addressed chunks, the server
+        # reports which it is missing, and only those are sent, workers at a time.
+        # Chunks the server acknowledged before a failure are not sent again, so a
+        # retried backup resumes where the last one stopped. Falls back to a single
+        # POST when the server has no chunk endpoints.
+        if self.chunked is False:
+            return self.post_backup(data)
+        body = json.dumps(data, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        chunks = split_chunks(body, chunk_size)
+        manifest = backup_manifest(data['user_id'], body, chunks)
+        by_digest = dict(zip(manifest['chunks'], chunks))
+        try:
+            missing = self.send('POST', '/backup/chunks/missing',
+                                json.dumps({'chunks': list(by_digest)}).encode()).json()['missing']
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code not in (404, 405):
+                raise
+            self.chunked = False
+            return self.post_backup(data)
+        self.chunked = True
+        done = len(by_digest) - len(missing)
+        if progress:
+            progress('chunks', done)
+        stop = threading.Event()
+        def put(digest):
+            if stop.is_set() or (cancel is not None and cancel.is_set()):
+                return
+            self.send('PUT', f"/backup/chunks/{digest}", by_digest[digest], 'application/octet-stream')
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(put, digest) for digest in missing]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+                    done += 1
+                    if progress:
+                        progress('chunks', done)
+            except BaseException:
+                stop.set()
+                raise
+        check_cancelled(cancel)
+        return self.send('POST', f"/backup/{data['user_id']}/manifest", json.dumps(manifest).encode()).json()
+
+    def post_delta(self, delta):
+        # Raises HTTPError 409 when the server's latest backup is not delta['base_seq']
+        body = json.dumps(delta, separators=(',', ':')).encode('utf-8')
+        return self.send('POST', f"/backup/{delta['user_id']}/delta", body).json()
+
+    def get_deltas(self, user_id):
+        # Deltas stored on top of the latest full backup; none if the server keeps no deltas
+        try:
+            return self.request('GET', f"/recover/{user_id}/deltas").json()
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code in (404, 405):
+                return []
+            raise
+
+    def iter_backup(self, user_id, chunk_size=DOWNLOAD_CHUNK_SIZE):
+        # Yields the decoded response body; closing the generator releases the
+        # connection back to the pool
+        response = self.request('GET', f"/recover/{user_id}", stream=True)
+        try:
+            yield from response.iter_content(chunk_size)
+        finally:
+            response.close()
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(api_url):
+    api_url = normalize_api_url(api_url)
+    with _clients_lock:
+        if api_url not in _clients:
+            _clients[api_url] = BackupClient(api_url)
+        return _clients[api_url]
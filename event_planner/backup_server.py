@@ -0,0 +1,262 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MAX_BODY_SIZE = 64 * 1024 * 1024
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+class BackupStore:
+    # Content-addressed chunk store plus the latest full backup per user and the
+    # deltas uploaded on top of it. Kept in memory, or under directory when given.
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.chunks = {}
+        self.backups = {}
+        self.deltas = {}
+        self.heads = {}
+        self.lock = threading.Lock()
+        if directory:
+            os.makedirs(os.path.join(directory, 'chunks'), exist_ok=True)
+            os.makedirs(os.path.join(directory, 'backups'), exist_ok=True)
+
+    def path(self, kind, name):
+        return os.path.join(self.directory, kind, name)
+
+    def write(self, kind, name, data):
+        path = self.path(kind, name)
+        with open(path + '.partial', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.partial', path)
+
+    def has_chunk(self, digest):
+        if self.directory:
+            return os.path.exists(self.path('chunks', digest))
+        return digest in self.chunks
+
+    def put_chunk(self, digest, data):
+        if self.directory:
+            self.write('chunks', digest, data)
+        else:
+            with self.lock:
+                self.chunks[digest] = data
+
+    def get_chunk(self, digest):
+        if self.directory:
+            with open(self.path('chunks', digest), 'rb') as f:
+                return f.read()
+        return self.chunks[digest]
+
+    def put_backup(self, user_id, body, seq=None):
+        # A full backup starts a new delta chain at seq (None: deltas not accepted)
+        with self.lock:
+            if self.directory:
+                self.write('backups', f"{user_id}.json", body)
+                self.write('backups', f"{user_id}.deltas", b'')
+            else:
+                self.backups[user_id] = body
+                self.deltas[user_id] = []
+            self.heads[user_id] = seq
+
+    def append_delta(self, user_id, base_seq, seq, body):
+        with self.lock:
+            if base_seq is None or self.get_head(user_id) != base_seq:
+                return False
+            if self.directory:
+                with open(self.path('backups', f"{user_id}.deltas"), 'ab') as f:
+                    f.write(body.replace(b'\n', b'') + b'\n')
+            else:
+                self.deltas[user_id].append(body)
+            self.heads[user_id] = seq
+            return True
+
+    def get_head(self, user_id):
+        if user_id not in self.heads and self.directory:
+            # Rebuild after a restart from the last delta, or the backup itself
+            deltas = self.get_deltas(user_id)
+            backup = self.get_backup(user_id)
+            if deltas:
+                self.heads[user_id] = json.loads(deltas[-1])['seq']
+            elif backup is not None:
+                self.heads[user_id] = json.loads(backup).get('seq')
+        return self.heads.get(user_id)
+
+    def get_deltas(self, user_id):
+        if self.directory:
+            try:
+                with open(self.path('backups', f"{user_id}.deltas"), 'rb') as f:
+                    return f.read().splitlines()
+            except FileNotFoundError:
+                return []
+        return list(self.deltas.get(user_id, []))
+
+    def get_backup(self, user_id):
+        if self.directory:
+            try:
+                with open(self.path('backups', f"{user_id}.json"), 'rb') as f:
+                    return f.read()
+            except FileNotFoundError:
+                return None
+        return self.backups.get(user_id)
+
+class BackupRequestHandler(BaseHTTPRequestHandler):
+    # Reference implementation of the backup API:
+    #   POST /backup                        whole backup as one JSON body
+    #   POST /backup/chunks/missing         {"chunks": [sha256, ...]} -> {"missing": [...]}
+    #   PUT  /backup/chunks/<sha256>        one chunk; rejected unless its digest matches
+    #   POST /backup/<user_id>/manifest     assemble the listed chunks into the user's backup
+    #   POST /backup/<user_id>/delta        changes since the latest backup; 409 unless
+    #                                       its base_seq is the seq last stored
+    #   GET  /recover/<user_id>             latest full backup as JSON
+    #   GET  /recover/<user_id>/deltas      JSON list of deltas stored since that backup
+    # Request bodies may be gzip-encoded; responses are gzipped when the client accepts it.
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        if self.server.verbose:
+            super().log_message(*args)
+
+    def reply(self, status, body=b'', content_type='application/json'):
+        # Advertises that request bodies may be gzip-encoded (RFC 7694)
+        headers = {'Content-Type': content_type, 'Accept-Encoding': 'gzip'}
+        if len(body) > 1024 and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, 6)
+            headers['Content-Encoding'] = 'gzip'
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def reply_json(self, status, data):
+        self.reply(status, json.dumps(data).encode())
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        if length > MAX_BODY_SIZE:
+            # The unread body would otherwise be parsed as the next request
+            self.close_connection = True
+            raise ValueError("Request body too large")
+        body = self.rfile.read(length)
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return body
+
+    def read_json(self):
+        return json.loads(self.read_body())
+
+    def store_backup(self, user_id, body):
+        data = json.loads(body)
+        if not isinstance(user_id, int) or data.get('user_id') != user_id:
+            raise ValueError("Backup user_id does not match")
+        self.server.store.put_backup(user_id, body, data.get('seq'))
+        self.reply_json(200, {'message': f"Backup stored for user {user_id}"})
+
+    def store_delta(self, user_id, body):
+        delta = json.loads(body)
+        if delta.get('user_id') != user_id or delta.get('kind') != 'delta':
+            raise ValueError("Not a backup delta for this user")
+        if not self.server.store.append_delta(user_id, delta['base_seq'], delta['seq'], body):
+            self.reply_json(409, {'error': 'Delta does not follow the latest backup'})
+            return
+        self.reply_json(200, {'message': f"Changes stored for user {user_id}"})
+
+    def do_POST(self):
+        parts = self.path.strip('/').split('/')
+        try:
+            if parts == ['backup']:
+                body = self.read_body()
+                self.store_backup(json.loads(body).get('user_id'), body)
+            elif parts == ['backup', 'chunks', 'missing']:
+                digests = self.read_json()['chunks']
+                missing = [digest for digest in digests if not self.server.store.has_chunk(digest)]
+                self.reply_json(200, {'missing': missing})
+            elif len(parts) == 3 and parts[0] == 'backup' and parts[1].isdigit() and parts[2] == 'manifest':
+                self.commit_manifest(int(parts[1]), self.read_json())
+            elif len(parts) == 3 and parts[0] == 'backup' and parts[1].isdigit() and parts[2] == 'delta':
+                self.store_delta(int(parts[1]), self.read_body())
+            else:
+                self.reply_json(404, {'error': 'Not found'})
+        except (KeyError, TypeError, ValueError, OSError) as e:
+            self.reply_json(400, {'error': str(e)})
+
+    def commit_manifest(self, user_id, manifest):
+        store = self.server.store
+        missing = [digest for digest in manifest['chunks'] if not store.has_chunk(digest)]
+        if missing:
+            self.reply_json(409, {'error': 'Missing chunks', 'missing': missing})
+            return
+        body = b''.join(store.get_chunk(digest) for digest in manifest['chunks'])
+        if len(body) != manifest['size'] or hashlib.sha256(body).hexdigest() != manifest['sha256']:
+            raise ValueError("Assembled backup does not match its manifest")
+        self.store_backup(user_id, body)
+
+    def do_PUT(self):
+        parts = self.path.strip('/').split('/')
+        if len(parts) != 3 or parts[:2] != ['backup', 'chunks'] or not DIGEST_PATTERN.match(parts[2]):
+            self.reply_json(404, {'error': 'Not found'})
+            return
+        try:
+            body = self.read_body()
+        except (ValueError, OSError) as e:
+            self.reply_json(400, {'error': str(e)})
+            return
+        if hashlib.sha256(body).hexdigest() != parts[2]:
+            self.reply_json(400, {'error': 'Chunk digest mismatch'})
+            return
+        created = not self.server.store.has_chunk(parts[2])
+        if created:
+            self.server.store.put_chunk(parts[2], body)
+        self.reply_json(201 if created else 200, {'stored': parts[2]})
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        if not 2 <= len(parts) <= 3 or parts[0] != 'recover' or not parts[1].isdigit() \
+                or parts[2:] not in ([], ['deltas']):
+            self.reply_json(404, {'error': 'Not found'})
+            return
+        user_id = int(parts[1])
+        body = self.server.store.get_backup(user_id)
+        if body is None:
+            self.reply_json(404, {'error': 'No backup found'})
+        elif parts[2:] == ['deltas']:
+            self.reply(200, b'[' + b','.join(self.server.store.get_deltas(user_id)) + b']')
+        else:
+            self.reply(200, body)
+
+class BackupServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, store=None, verbose=False):
+        super().__init__(address, BackupRequestHandler)
+        self.store = store or BackupStore()
+        self.verbose = verbose
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Reference backup API server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--directory', help="Store backups on disk instead of in memory")
+    args = parser.parse_args()
+    server = BackupServer((args.host, args.port), BackupStore(args.directory), verbose=True)
+    print(f"Serving backup API on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
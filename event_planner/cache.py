@@ -0,0 +1,97 @@
+import sys
+from collections import OrderedDict
+
+QUERY_CACHE_SIZE = 8 * 1024 * 1024
+SIZE_SAMPLE = 32
+
+def estimate_size(value):
+    # Rough in-memory footprint of a result: the containers plus every value in them.
+    # Long lists of rows are sized from an evenly spaced sample, so sizing a result
+    # costs about the same however many rows it has.
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        if len(value) > SIZE_SAMPLE:
+            step = len(value) / SIZE_SAMPLE
+            sample = [value[int(i * step)] for i in range(SIZE_SAMPLE)]
+            size += sum(estimate_size(item) for item in sample) * len(value) // SIZE_SAMPLE
+        else:
+            size += sum(estimate_size(item) for item in value)
+    elif isinstance(value, dict):
+        size += sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    return size
+
+class QueryCache:
+    # LRU of query results capped at max_bytes of estimated memory. Each entry is
+    # stored with the tags of the rows it was built from, and invalidate(tag) drops
+    # every entry depending on that tag, so a write only evicts what it touched.
+    def __init__(self, max_bytes=QUERY_CACHE_SIZE):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (value, size, tags)
+        self.keys_by_tag = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped by every invalidation, so results read elsewhere can be checked for staleness
+        self.version = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, tags=()):
+        self.discard(key)
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        tags = frozenset(tags)
+        self.entries[key] = (value, size, tags)
+        self.size += size
+        for tag in tags:
+            self.keys_by_tag.setdefault(tag, set()).add(key)
+        while self.size > self.max_bytes:
+            self.discard(next(iter(self.entries)))
+            self.evictions += 1
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= entry[1]
+        for tag in entry[2]:
+            keys = self.keys_by_tag[tag]
+            keys.discard(key)
+            if not keys:
+                del self.keys_by_tag[tag]
+
+    def invalidate(self, *tags):
+        self.version += 1
+        for tag in tags:
+            for key in list(self.keys_by_tag.get(tag, ())):
+                self.discard(key)
+
+    def clear(self):
+        self.version += 1
+        self.entries.clear()
+        self.keys_by_tag.clear()
+        self.size = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+            'size': self.size,
+        }
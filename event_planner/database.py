@@ -2,67 +2,274 @@ import sqlite3
 import csv
 import json
 import hashlib
+import os
+import base64
+import gzip
 from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from .cache import QueryCache
+from .migrations import migrate, get_schema_version, SCHEMA_VERSION
+
+# Connection tuning presets. "durable" matches SQLite's defaults (rollback journal,
+# fsync on every commit); "balanced" uses WAL so commits only fsync at checkpoints;
+# "throughput" leaves fsync to the OS and is meant for bulk jobs on scratch copies.
+CONNECTION_PROFILES = {
+    "durable": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "mmap_size": 0,
+        "cache_size": -2000,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,
+    },
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 64 * 1024 * 1024,
+        "cache_size": -16000,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    "throughput": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64000,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+}
+DEFAULT_PROFILE = "balanced"
+PROFILE_ENV_VAR = "EVENT_PLANNER_DB_PROFILE"
+
+def apply_connection_profile(conn, profile):
+    settings = CONNECTION_PROFILES[profile]
+    # journal_mode first: mmap and synchronous semantics depend on it
+    conn.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+    for pragma in ("synchronous", "mmap_size", "cache_size", "temp_store", "busy_timeout"):
+        conn.execute(f"PRAGMA {pragma} = {settings[pragma]}")
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError, AttributeError):
+        raise ValueError(f"Invalid page cursor: {cursor!r}")
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid page cursor: {cursor!r}")
+    return values
+
+# Keyset sort keys as (expression, row index, descending). The trailing id makes
+# every key unique, and each key follows an index so a page is a seek, never an OFFSET.
+EVENT_SORT_KEY = [('date', 3, False), ('time', 4, False), ('name', 2, False), ('id', 0, False)]
+EVENT_DATE_SORT_KEY = [('time', 4, False), ('name', 2, False), ('id', 0, False)]
+ARCHIVED_SORT_KEY = [('archived_date', 7, True), ('id', 0, True)]
+GUEST_SORT_KEY = [('name', 2, False), ('id', 0, False)]
+TASK_SORT_KEY = [('id', 0, False)]
+
+EXPORT_BATCH_SIZE = 1000
+BULK_BATCH_SIZE = 1000
+SNAPSHOT_PAGES_PER_STEP = 1024
+EXPORT_BUFFER_SIZE = 1024 * 1024
+
+# Explicit column lists keep exports stable when later migrations add columns
+EXPORT_QUERIES = {
+    'events': '''
+        SELECT id, user_id, name, date, time, venue, description, is_archived
+        FROM events WHERE user_id = ?
+    ''',
+    'archived_events': '''
+        SELECT id, user_id, name, date, time, venue, description, archived_date
+        FROM archived_events WHERE user_id = ?
+    ''',
+    'tasks': '''
+        SELECT t.id, t.event_id, t.description, t.is_completed FROM tasks t
+        JOIN events e ON t.event_id = e.id
+        WHERE e.user_id = ?
+    ''',
+    'guests': '''
+        SELECT g.id, g.event_id, g.name, g.email FROM guests g
+        JOIN events e ON g.event_id = e.id
+        WHERE e.user_id = ?
+    ''',
+}
+
+# Field names for each exported table, in EXPORT_QUERIES column order
+RECORD_FIELDS = {
+    'events': ('id', 'user_id', 'name', 'date', 'time', 'venue', 'description', 'is_archived'),
+    'archived_events': ('id', 'user_id', 'name', 'date', 'time', 'venue', 'description', 'archived_date'),
+    'tasks': ('id', 'event_id', 'description', 'is_completed'),
+    'guests': ('id', 'event_id', 'name', 'email'),
+}
+BOOLEAN_FIELDS = {'is_archived', 'is_completed'}
+
+def row_to_record(table, row):
+    record = dict(zip(RECORD_FIELDS[table], row))
+    for field in BOOLEAN_FIELDS.intersection(record):
+        record[field] = bool(record[field])
+    return record
+
+CSV_EXPORTS = [
+    ('events', ['ID', 'User ID', 'Name', 'Date', 'Time', 'Venue', 'Description', 'Is Archived'],
+     EXPORT_QUERIES['events']),
+    ('archived', ['ID', 'User ID', 'Name', 'Date', 'Time', 'Venue', 'Description', 'Archived Date'],
+     EXPORT_QUERIES['archived_events']),
+    ('tasks', ['ID', 'Event ID', 'Description', 'Is Completed'], EXPORT_QUERIES['tasks']),
+    ('guests', ['ID', 'Event ID', 'Name', 'Email'], EXPORT_QUERIES['guests']),
+]
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def keyset_batches(conn, query, user_id, batch_size):
+    # Reads an EXPORT_QUERIES query in id order, one statement per batch, so no lock
+    # is held between batches
+    rows = conn.execute(f'SELECT * FROM ({query}) ORDER BY id LIMIT ?', (user_id, batch_size)).fetchall()
+    while rows:
+        yield rows
+        rows = conn.execute(f'SELECT * FROM ({query}) WHERE id > ? ORDER BY id LIMIT ?',
+                            (user_id, rows[-1][0], batch_size)).fetchall()
+
+def write_csv_table(conn, user_id, filename, suffix, header, query, compress=False, progress=None,
+                    batch_size=EXPORT_BATCH_SIZE, keyset=False):
+    # Streams one table in fetchmany batches (or keyset_batches), so memory stays
+    # bounded by batch_size
+    path = f'{filename}_{suffix}.csv'
+    if compress:
+        f = gzip.open(f'{path}.gz', 'wt', newline='', compresslevel=6)
+    else:
+        f = open(path, 'w', newline='', buffering=EXPORT_BUFFER_SIZE)
+    with f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        if keyset:
+            batches = keyset_batches(conn, query, user_id, batch_size)
+        else:
+            cursor = conn.execute(query, (user_id,))
+            batches = iter(lambda: cursor.fetchmany(batch_size), [])
+        written = 0
+        for rows in batches:
+            writer.writerows(rows)
+            written += len(rows)
+            if progress:
+                progress(suffix, written)
+    return written
+
+# Temp-table schema and payload columns used to stage restore_backup_data
+RESTORE_STAGING = {
+    'events': ('''
+        id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, name TEXT NOT NULL, date TEXT NOT NULL,
+        time TEXT, venue TEXT, description TEXT, is_archived INTEGER NOT NULL
+    ''', ('id', 'user_id', 'name', 'date', 'time', 'venue', 'description', 'is_archived')),
+    'archived_events': ('''
+        id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, name TEXT NOT NULL, date TEXT NOT NULL,
+        time TEXT, venue TEXT, description TEXT, archived_date TEXT
+    ''', ('id', 'user_id', 'name', 'date', 'time', 'venue', 'description', 'archived_date')),
+    'tasks': ('''
+        id INTEGER PRIMARY KEY, event_id INTEGER NOT NULL, description TEXT NOT NULL,
+        is_completed INTEGER NOT NULL
+    ''', ('id', 'event_id', 'description', 'is_completed')),
+    'guests': ('''
+        id INTEGER PRIMARY KEY, event_id INTEGER NOT NULL, name TEXT NOT NULL, email TEXT
+    ''', ('id', 'event_id', 'name', 'email')),
+}
+
+# (error, query) pairs run against the staged backup; any returned row fails the restore
+RESTORE_CHECKS = [
+    ("Backup contains events for another user",
+     'SELECT 1 FROM temp.restore_events WHERE user_id != :user_id LIMIT 1'),
+    ("Backup contains archived events for another user",
+     'SELECT 1 FROM temp.restore_archived_events WHERE user_id != :user_id LIMIT 1'),
+    ("Backup contains tasks for unknown events", '''
+        SELECT 1 FROM temp.restore_tasks t
+        WHERE NOT EXISTS (SELECT 1 FROM temp.restore_events e WHERE e.id = t.event_id) LIMIT 1
+    '''),
+    ("Backup contains guests for unknown events", '''
+        SELECT 1 FROM temp.restore_guests g
+        WHERE NOT EXISTS (SELECT 1 FROM temp.restore_events e WHERE e.id = g.event_id) LIMIT 1
+    '''),
+    ("Backup event IDs collide with another user's events", '''
+        SELECT 1 FROM temp.restore_events r JOIN events e ON e.id = r.id
+        WHERE e.user_id != :user_id LIMIT 1
+    '''),
+    ("Backup archived event IDs collide with another user's", '''
+        SELECT 1 FROM temp.restore_archived_events r JOIN archived_events a ON a.id = r.id
+        WHERE a.user_id != :user_id LIMIT 1
+    '''),
+    ("Backup task IDs collide with another user's tasks", '''
+        SELECT 1 FROM temp.restore_tasks r JOIN tasks t ON t.id = r.id
+        JOIN events e ON e.id = t.event_id WHERE e.user_id != :user_id LIMIT 1
+    '''),
+    ("Backup guest IDs collide with another user's guests", '''
+        SELECT 1 FROM temp.restore_guests r JOIN guests g ON g.id = r.id
+        JOIN events e ON e.id = g.event_id WHERE e.user_id != :user_id LIMIT 1
+    '''),
+]
 
 class EventDatabase:
-    def __init__(self, db_name="events.db"):
+    def __init__(self, db_name="events.db", profile=None, cache_size=0):
+        profile = profile or os.environ.get(PROFILE_ENV_VAR) or DEFAULT_PROFILE
+        if profile not in CONNECTION_PROFILES:
+            raise ValueError(f"Unknown connection profile: {profile}")
+        self.db_name = db_name
+        self.profile = profile
         self.conn = sqlite3.connect(db_name)
+        apply_connection_profile(self.conn, profile)
+        # Read-through cache of event/task/guest lookups, off unless cache_size (bytes) is given
+        self.cache = QueryCache(cache_size) if cache_size else None
+        self.data_version = None
         self.create_tables()
 
+    def _cached(self, key, fetch, tags):
+        if self.cache is None:
+            return fetch()
+        # data_version moves when another connection (an import or recovery job)
+        # commits; writes through this object invalidate their own entries
+        version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+        if version != self.data_version:
+            self.cache.clear()
+            self.data_version = version
+        value = self.cache.get(key)
+        if value is None:
+            value = fetch()
+            if value is None:
+                return None
+            self.cache.put(key, value, tags(value))
+        # Callers get their own list; the rows themselves are immutable tuples
+        return list(value) if isinstance(value, list) else value
+
+    def _invalidate(self, *tags):
+        if self.cache is not None:
+            self.cache.invalidate(*tags)
+
+    def _event_tags(self, event_id):
+        return [('event', event_id), ('tasks', event_id), ('guests', event_id)]
+
+    def _invalidate_event(self, event_id):
+        self._invalidate(*self._event_tags(event_id))
+
+    def _parent_event_id(self, table, row_id):
+        # Looked up before a task/guest write so the event's cached lists can be dropped
+        if self.cache is None:
+            return None
+        row = self.conn.execute(f'SELECT event_id FROM {table} WHERE id = ?', (row_id,)).fetchone()
+        return row[0] if row else None
+
+    def clear_cache(self):
+        # For writes that bypass these methods, e.g. raw SQL on self.conn
+        if self.cache is not None:
+            self.cache.clear()
+
     def create_tables(self):
-        with self.conn:
-            self.conn.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY,
-                    username TEXT UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL,
-                    email TEXT
-                )
-            ''')
-            self.conn.execute('''
-                CREATE TABLE IF NOT EXISTS events (
-                    id INTEGER PRIMARY KEY,
-                    user_id INTEGER NOT NULL,
-                    name TEXT NOT NULL,
-                    date TEXT NOT NULL,
-                    time TEXT,
-                    venue TEXT,
-                    description TEXT,
-                    is_archived INTEGER DEFAULT 0,
-                    FOREIGN KEY (user_id) REFERENCES users(id)
-                )
-            ''')
-            self.conn.execute('''
-                CREATE TABLE IF NOT EXISTS archived_events (
-                    id INTEGER PRIMARY KEY,
-                    user_id INTEGER NOT NULL,
-                    name TEXT NOT NULL,
-                    date TEXT NOT NULL,
-                    time TEXT,
-                    venue TEXT,
-                    description TEXT,
-                    archived_date TEXT,
-                    FOREIGN KEY (user_id) REFERENCES users(id)
-                )
-            ''')
-            self.conn.execute('''
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id INTEGER PRIMARY KEY,
-                    event_id INTEGER NOT NULL,
-                    description TEXT NOT NULL,
-                    is_completed INTEGER DEFAULT 0,
-                    FOREIGN KEY (event_id) REFERENCES events(id)
-                )
-            ''')
-            self.conn.execute('''
-                CREATE TABLE IF NOT EXISTS guests (
-                    id INTEGER PRIMARY KEY,
-                    event_id INTEGER NOT NULL,
-                    name TEXT NOT NULL,
-                    email TEXT,
-                    FOREIGN KEY (event_id) REFERENCES events(id)
-                )
-            ''')
+        return migrate(self.conn)
 
     def create_user(self, username, password, email=None):
         with self.conn:
@@ -109,20 +316,24 @@ class EventDatabase:
 
     def get_user_by_id(self, user_id):
         with self.conn:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT id, username, password_hash, email 
-                FROM users WHERE id = ?
-            ''', (user_id,))
-            result = cursor.fetchone()
-            if result:
-                return {
-                    "id": result[0],
-                    "username": result[1],
-                    "password_hash": result[2],
-                    "email": result[3]
-                }
-            return None
+            return self._read_user(user_id)
+
+    def _read_user(self, user_id):
+        # No transaction handling of its own, so it can join an open read transaction
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT id, username, password_hash, email 
+            FROM users WHERE id = ?
+        ''', (user_id,))
+        result = cursor.fetchone()
+        if result:
+            return {
+                "id": result[0],
+                "username": result[1],
+                "password_hash": result[2],
+                "email": result[3]
+            }
+        return None
 
     def get_user_email(self, user_id):
         with self.conn:
@@ -131,6 +342,10 @@ class EventDatabase:
             result = cursor.fetchone()
             return result[0] if result else None
 
+    def count_users(self):
+        with self.conn:
+            return self.conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
     def _hash_password(self, password):
         return hashlib.sha256(password.encode()).hexdigest()
 
@@ -144,6 +359,7 @@ class EventDatabase:
                 INSERT INTO events (user_id, name, date, time, venue, description)
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (user_id, name, date, time, venue, description))
+            self._invalidate(('user', user_id))
             return cursor.lastrowid
 
     def update_event(self, event_id, name, date, time, venue, description):
@@ -153,20 +369,26 @@ class EventDatabase:
                 SET name = ?, date = ?, time = ?, venue = ?, description = ?
                 WHERE id = ?
             ''', (name, date, time, venue, description, event_id))
+            self._invalidate(('event', event_id))
 
     def delete_event(self, event_id):
         with self.conn:
             self.conn.execute('DELETE FROM guests WHERE event_id = ?', (event_id,))
             self.conn.execute('DELETE FROM tasks WHERE event_id = ?', (event_id,))
             self.conn.execute('DELETE FROM events WHERE id = ?', (event_id,))
+            self._invalidate_event(event_id)
 
     def get_all_events(self, user_id):
-        with self.conn:
-            return self.conn.execute('''
-                SELECT * FROM events 
-                WHERE user_id = ? AND is_archived = 0
-                ORDER BY date, time
-            ''', (user_id,)).fetchall()
+        def fetch():
+            with self.conn:
+                return self.conn.execute('''
+                    SELECT * FROM events 
+                    WHERE user_id = ? AND is_archived = 0
+                    ORDER BY date, time
+                ''', (user_id,)).fetchall()
+        # Tagged with every listed event, so editing one of them drops the list too
+        return self._cached(('events', user_id), fetch,
+                            lambda rows: [('user', user_id)] + [('event', row[0]) for row in rows])
 
     def get_archived_events(self, user_id):
         with self.conn:
@@ -176,14 +398,30 @@ class EventDatabase:
                 ORDER BY archived_date DESC
             ''', (user_id,)).fetchall()
 
-    def search_events(self, user_id, query):
+    def search_events(self, user_id, query, ranked=False):
+        # The trigram index needs at least three characters; shorter queries
+        # fall back to LIKE over the user's (indexed) events.
+        if len(query) < 3:
+            with self.conn:
+                return self.conn.execute('''
+                    SELECT * FROM events 
+                    WHERE user_id = ? AND is_archived = 0 AND 
+                    (name LIKE ? OR venue LIKE ? OR description LIKE ?)
+                    ORDER BY date, time
+                ''', (user_id, f'%{query}%', f'%{query}%', f'%{query}%')).fetchall()
+        order_by = 'bm25(events_fts), e.date, e.time' if ranked else 'e.date, e.time'
+        # CROSS JOIN pins events_fts as the outer loop so MATCH runs once, not per event
         with self.conn:
-            return self.conn.execute('''
-                SELECT * FROM events 
-                WHERE user_id = ? AND is_archived = 0 AND 
-                (name LIKE ? OR venue LIKE ? OR description LIKE ?)
-                ORDER BY date, time
-            ''', (user_id, f'%{query}%', f'%{query}%', f'%{query}%')).fetchall()
+            return self.conn.execute(f'''
+                SELECT e.* FROM events_fts
+                CROSS JOIN events e ON e.id = events_fts.rowid
+                WHERE events_fts MATCH ? AND e.user_id = ? AND e.is_archived = 0
+                ORDER BY {order_by}
+            ''', (self._fts_phrase(query), user_id)).fetchall()
+
+    def _fts_phrase(self, query):
+        # Quote as a single FTS5 phrase so user input is never parsed as query syntax
+        return '"' + query.replace('"', '""') + '"'
 
     def get_events_by_date(self, user_id, date):
         with self.conn:
@@ -193,9 +431,181 @@ class EventDatabase:
                 ORDER BY time, name
             ''', (user_id, date)).fetchall()
 
-    def get_event_by_id(self, event_id):
+    def get_all_events_page(self, user_id, page_size=100, cursor=None):
+        return self._fetch_page('''
+            SELECT * FROM events
+            WHERE user_id = ? AND is_archived = 0
+        ''', (user_id,), EVENT_SORT_KEY, page_size, cursor)
+
+    def get_archived_events_page(self, user_id, page_size=100, cursor=None):
+        return self._fetch_page('''
+            SELECT * FROM archived_events
+            WHERE user_id = ?
+        ''', (user_id,), ARCHIVED_SORT_KEY, page_size, cursor)
+
+    def search_events_page(self, user_id, query, page_size=100, cursor=None):
+        if len(query) < 3:
+            return self._fetch_page('''
+                SELECT * FROM events
+                WHERE user_id = ? AND is_archived = 0 AND
+                (name LIKE ? OR venue LIKE ? OR description LIKE ?)
+            ''', (user_id, f'%{query}%', f'%{query}%', f'%{query}%'), EVENT_SORT_KEY, page_size, cursor)
+        sort_key = [(f'e.{column}', index, descending) for column, index, descending in EVENT_SORT_KEY]
+        return self._fetch_page('''
+            SELECT e.* FROM events_fts
+            CROSS JOIN events e ON e.id = events_fts.rowid
+            WHERE events_fts MATCH ? AND e.user_id = ? AND e.is_archived = 0
+        ''', (self._fts_phrase(query), user_id), sort_key, page_size, cursor)
+
+    def get_events_by_date_page(self, user_id, date, page_size=100, cursor=None):
+        return self._fetch_page('''
+            SELECT * FROM events
+            WHERE user_id = ? AND date = ? AND is_archived = 0
+        ''', (user_id, date), EVENT_DATE_SORT_KEY, page_size, cursor)
+
+    def get_tasks_for_event_page(self, event_id, page_size=100, cursor=None):
+        return self._fetch_page('''
+            SELECT * FROM tasks
+            WHERE event_id = ?
+        ''', (event_id,), TASK_SORT_KEY, page_size, cursor)
+
+    def get_guests_for_event_page(self, event_id, page_size=100, cursor=None):
+        return self._fetch_page('''
+            SELECT * FROM guests
+            WHERE event_id = ?
+        ''', (event_id,), GUEST_SORT_KEY, page_size, cursor)
+
+    def iter_pages(self, fetch_page, page_size=500):
+        # Walks any *_page method, e.g. partial(db.get_guests_for_event_page, event_id),
+        # holding at most one page in memory
+        cursor = None
+        while True:
+            rows, cursor = fetch_page(page_size=page_size, cursor=cursor)
+            yield from rows
+            if cursor is None:
+                return
+
+    def get_event_counts_by_date(self, user_id, start_date, end_date):
+        # {date: active events} for start_date..end_date inclusive; a range scan over
+        # the covering idx_events_user_archived_date, so cost follows the range asked for
+        with self.conn:
+            return dict(self.conn.execute('''
+                SELECT date, COUNT(*) FROM events
+                WHERE user_id = ? AND is_archived = 0 AND date BETWEEN ? AND ?
+                GROUP BY date
+            ''', (user_id, start_date, end_date)))
+
+    def _fetch_page(self, select, params, sort_key, page_size, cursor):
+        # Returns (rows, next_cursor); next_cursor is None on the last page
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        args = list(params)
+        null_phase = None
+        if cursor is not None:
+            values = decode_cursor(cursor)
+            if len(values) != len(sort_key):
+                raise ValueError(f"Invalid page cursor: {cursor!r}")
+            leading, _, descending = sort_key[0]
+            if descending and values[0] is not None:
+                # NULLs sort last under DESC. They are read by a second query once the
+                # non-NULL rows run out, so the first one can seek on the leading column.
+                null_phase = (f'{select} AND {leading} IS NULL', list(args))
+            predicate, predicate_args = self._keyset_predicate(sort_key, values)
+            select = f'{select} AND {predicate}'
+            args.extend(predicate_args)
+        order_by = ', '.join(f'{expression} DESC' if descending else expression
+                             for expression, _, descending in sort_key)
         with self.conn:
-            return self.conn.execute('SELECT * FROM events WHERE id = ?', (event_id,)).fetchone()
+            # One extra row tells us whether another page exists
+            rows = self.conn.execute(f'{select} ORDER BY {order_by} LIMIT ?',
+                                     args + [page_size + 1]).fetchall()
+            if null_phase is not None and len(rows) <= page_size:
+                null_select, null_args = null_phase
+                rows += self.conn.execute(f'{null_select} ORDER BY {order_by} LIMIT ?',
+                                          null_args + [page_size + 1 - len(rows)]).fetchall()
+        if len(rows) <= page_size:
+            return rows, None
+        rows = rows[:page_size]
+        return rows, encode_cursor([rows[-1][index] for _, index, _ in sort_key])
+
+    def _keyset_predicate(self, sort_key, values):
+        # Expands (a, b, c) > (x, y, z) by hand because row-value comparison
+        # treats NULL as unknown, while ORDER BY sorts NULLs first. NULLs of a
+        # descending leading column are left to _fetch_page's second query.
+        terms, args = [], []
+        for position, (expression, _, descending) in enumerate(sort_key):
+            value = values[position]
+            if descending:
+                if value is None:
+                    continue
+                if position == 0:
+                    after = f'{expression} < ?'
+                else:
+                    after = f'({expression} < ? OR {expression} IS NULL)'
+            else:
+                after = f'{expression} > ?' if value is not None else f'{expression} IS NOT NULL'
+            ties = [f'{previous} IS ?' for previous, _, _ in sort_key[:position]]
+            terms.append('(' + ' AND '.join(ties + [after]) + ')')
+            args.extend(values[:position])
+            if value is not None:
+                args.append(value)
+        predicate = '(' + ' OR '.join(terms) + ')'
+        # Bound the leading column as well so SQLite can seek into the index
+        leading, _, descending = sort_key[0]
+        if values[0] is not None:
+            if descending:
+                predicate = f'{leading} <= ? AND {predicate}'
+            else:
+                predicate = f'{leading} >= ? AND {predicate}'
+            args.insert(0, values[0])
+        return predicate, args
+
+    def get_event_by_id(self, event_id):
+        def fetch():
+            with self.conn:
+                return self.conn.execute('SELECT * FROM events WHERE id = ?', (event_id,)).fetchone()
+        return self._cached(('event', event_id), fetch, lambda row: [('event', event_id)])
+
+    def get_event_detail(self, event_id, user_id):
+        # Event, guests and tasks read in one transaction, so they agree with each
+        # other; None if the event does not exist or belongs to another user
+        def fetch():
+            self.conn.execute('BEGIN')
+            try:
+                row = self.conn.execute('''
+                    SELECT id, user_id, name, date, time, venue, description, is_archived, task_total, task_done
+                    FROM events WHERE id = ? AND user_id = ?
+                ''', (event_id, user_id)).fetchone()
+                if row is None:
+                    return None
+                guests = self.conn.execute('''
+                    SELECT g.* FROM guests g
+                    JOIN events e ON e.id = g.event_id
+                    WHERE g.event_id = ? AND e.user_id = ?
+                    ORDER BY g.name
+                ''', (event_id, user_id)).fetchall()
+                tasks = self.conn.execute('''
+                    SELECT t.* FROM tasks t
+                    JOIN events e ON e.id = t.event_id
+                    WHERE t.event_id = ? AND e.user_id = ?
+                    ORDER BY t.id
+                ''', (event_id, user_id)).fetchall()
+            finally:
+                self.conn.commit()
+            return {"event": row[:8], "guests": guests, "tasks": tasks, "task_counts": row[8:]}
+        return self._cached(('detail', event_id, user_id), fetch, lambda detail: self._event_tags(event_id))
+
+    def cache_event_detail(self, event_id, user_id, detail, version):
+        # Stores a get_event_detail result read on another connection (see prefetch.py).
+        # version is self.cache.version from before that read; if this connection has
+        # written since, the result may be stale and is dropped.
+        if self.cache is None or detail is None or self.cache.version != version:
+            return False
+        self.cache.put(('detail', event_id, user_id), detail, self._event_tags(event_id))
+        return True
+
+    def has_cached_event_detail(self, event_id, user_id):
+        return self.cache is not None and ('detail', event_id, user_id) in self.cache
 
     def add_task(self, event_id, description):
         with self.conn:
@@ -203,26 +613,41 @@ class EventDatabase:
                 INSERT INTO tasks (event_id, description)
                 VALUES (?, ?)
             ''', (event_id, description))
+            # The event row changes too: its task counters are kept by triggers
+            self._invalidate(('event', event_id), ('tasks', event_id))
 
     def get_tasks_for_event(self, event_id):
+        def fetch():
+            with self.conn:
+                return self.conn.execute('''
+                    SELECT * FROM tasks 
+                    WHERE event_id = ?
+                    ORDER BY id
+                ''', (event_id,)).fetchall()
+        return self._cached(('tasks', event_id), fetch, lambda rows: [('tasks', event_id)])
+
+    def get_task_counts(self, event_id):
+        # (total, completed) from the counters on events; None for unknown events
         with self.conn:
             return self.conn.execute('''
-                SELECT * FROM tasks 
-                WHERE event_id = ?
-                ORDER BY id
-            ''', (event_id,)).fetchall()
+                SELECT task_total, task_done FROM events WHERE id = ?
+            ''', (event_id,)).fetchone()
 
     def update_task_status(self, task_id, is_completed):
         with self.conn:
+            event_id = self._parent_event_id('tasks', task_id)
             self.conn.execute('''
                 UPDATE tasks 
                 SET is_completed = ?
                 WHERE id = ?
             ''', (1 if is_completed else 0, task_id))
+            self._invalidate(('event', event_id), ('tasks', event_id))
 
     def delete_task(self, task_id):
         with self.conn:
+            event_id = self._parent_event_id('tasks', task_id)
             self.conn.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
+            self._invalidate(('event', event_id), ('tasks', event_id))
 
     def add_guest(self, event_id, name, email):
         with self.conn:
@@ -230,225 +655,393 @@ class EventDatabase:
                 INSERT INTO guests (event_id, name, email)
                 VALUES (?, ?, ?)
             ''', (event_id, name, email))
+            self._invalidate(('guests', event_id))
+
+    def add_events_bulk(self, user_id, events, batch_size=BULK_BATCH_SIZE):
+        # events: iterable of (name, date, time, venue, description)
+        ids = self._bulk_insert('events', ('user_id', 'name', 'date', 'time', 'venue', 'description'),
+                                ((user_id, *event) for event in events), batch_size)
+        self._invalidate(('user', user_id))
+        return ids
+
+    def add_tasks_bulk(self, event_id, descriptions, batch_size=BULK_BATCH_SIZE):
+        ids = self._bulk_insert('tasks', ('event_id', 'description'),
+                                ((event_id, description) for description in descriptions), batch_size)
+        self._invalidate(('event', event_id), ('tasks', event_id))
+        return ids
+
+    def add_guests_bulk(self, event_id, guests, batch_size=BULK_BATCH_SIZE):
+        # guests: iterable of (name, email)
+        ids = self._bulk_insert('guests', ('event_id', 'name', 'email'),
+                                ((event_id, name, email) for name, email in guests), batch_size)
+        self._invalidate(('guests', event_id))
+        return ids
+
+    def _bulk_insert(self, table, columns, rows, batch_size):
+        # One transaction and one commit for the whole iterable, fed to executemany in
+        # bounded batches. IDs are assigned up front under the write lock so they can be
+        # returned (executemany has no per-row lastrowid).
+        sql = f'''
+            INSERT INTO {table} (id, {', '.join(columns)})
+            VALUES ({', '.join('?' * (len(columns) + 1))})
+        '''
+        ids = []
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            next_id = self.conn.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {table}').fetchone()[0]
+            for batch in batched(rows, batch_size):
+                batch_ids = range(next_id, next_id + len(batch))
+                self.conn.executemany(sql, [(row_id, *row) for row_id, row in zip(batch_ids, batch)])
+                ids.extend(batch_ids)
+                next_id += len(batch)
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return ids
 
     def get_guests_for_event(self, event_id):
-        with self.conn:
-            return self.conn.execute('''
-                SELECT * FROM guests 
-                WHERE event_id = ?
-                ORDER BY name
-            ''', (event_id,)).fetchall()
+        def fetch():
+            with self.conn:
+                return self.conn.execute('''
+                    SELECT * FROM guests 
+                    WHERE event_id = ?
+                    ORDER BY name
+                ''', (event_id,)).fetchall()
+        return self._cached(('guests', event_id), fetch, lambda rows: [('guests', event_id)])
 
     def delete_guest(self, guest_id):
         with self.conn:
+            event_id = self._parent_event_id('guests', guest_id)
             self.conn.execute('DELETE FROM guests WHERE id = ?', (guest_id,))
+            self._invalidate(('guests', event_id))
 
     def archive_event(self, event_id):
         with self.conn:
             cursor = self.conn.cursor()
-            event = self.get_event_by_id(event_id)
-            if not event:
-                return False
-            tasks = self.get_tasks_for_event(event_id)
-            if tasks and not all(task[3] for task in tasks):
-                return False
             try:
+                # Copies the event only if it exists and all of its tasks are done
                 cursor.execute('''
                     INSERT INTO archived_events (
                         id, user_id, name, date, time, venue, description, archived_date
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    event[0], event[1], event[2], event[3], event[4], event[5], event[6],
-                    datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                ))
+                    )
+                    SELECT id, user_id, name, date, time, venue, description, ?
+                    FROM events WHERE id = ? AND task_done = task_total
+                ''', (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), event_id))
+                if cursor.rowcount == 0:
+                    return False
                 cursor.execute('DELETE FROM tasks WHERE event_id = ?', (event_id,))
                 cursor.execute('DELETE FROM guests WHERE event_id = ?', (event_id,))
                 cursor.execute('DELETE FROM events WHERE id = ?', (event_id,))
+                self._invalidate_event(event_id)
                 return True
             except sqlite3.Error:
                 return False
 
-    def export_to_csv(self, user_id, filename):
+    def export_to_csv(self, user_id, filename, compress=False, progress=None, batch_size=EXPORT_BATCH_SIZE):
+        # Each SELECT is its own short read; no transaction spans the four file writes
+        total = 0
+        for suffix, header, query in CSV_EXPORTS:
+            total += write_csv_table(self.conn, user_id, filename, suffix, header, query,
+                                     compress=compress, progress=progress, batch_size=batch_size)
+        return total
+
+    def export_to_json(self, user_id, filename, compact=False):
+        # Same document json.dump(data, indent=4) used to produce, written one record at a time
+        with open(f'{filename}.json', 'w', buffering=EXPORT_BUFFER_SIZE) as f:
+            self.write_json_document(f, [
+                (table, self.iter_records(user_id, table)) for table in RECORD_FIELDS
+            ], compact=compact)
+
+    def export_to_ndjson(self, user_id, filename):
+        # One {"type": <table>, "data": <record>} object per line
+        with open(f'{filename}.ndjson', 'w', buffering=EXPORT_BUFFER_SIZE) as f:
+            for table in RECORD_FIELDS:
+                for record in self.iter_records(user_id, table):
+                    f.write(json.dumps({'type': table, 'data': record}, separators=(',', ':')))
+                    f.write('\n')
+
+    def iter_records(self, user_id, table, batch_size=EXPORT_BATCH_SIZE):
+        cursor = self.conn.execute(EXPORT_QUERIES[table], (user_id,))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield row_to_record(table, row)
+
+    def write_json_document(self, f, items, compact=False):
+        # items: (key, value) pairs; iterator values are streamed as JSON arrays
+        newline, pad, inner = ('', '', '') if compact else ('\n', ' ' * 4, ' ' * 8)
+        separators = (',', ':') if compact else (',', ': ')
+        indent = None if compact else 4
+
+        def dumps(value, prefix):
+            return json.dumps(value, indent=indent, separators=separators).replace('\n', '\n' + prefix)
+
+        f.write('{')
+        for position, (key, value) in enumerate(items):
+            f.write(f'{"," if position else ""}{newline}{pad}{json.dumps(key)}{separators[1]}')
+            if isinstance(value, (dict, list, str, int, float, bool, type(None))):
+                f.write(dumps(value, pad))
+                continue
+            empty = True
+            for record in value:
+                f.write('[' if empty else ',')
+                f.write(f'{newline}{inner}{dumps(record, inner)}')
+                empty = False
+            f.write('[]' if empty else f'{newline}{pad}]')
+        f.write(f'{newline}}}')
+
+    def export_snapshot(self, path, vacuum=False, pages_per_step=SNAPSHOT_PAGES_PER_STEP, progress=None):
+        # Full copy of the database file. The online backup API copies pages_per_step
+        # pages at a time and lets writers in between steps; VACUUM INTO writes a
+        # compacted copy in one go. Either way the file only appears once complete.
+        partial_path = f'{path}.partial'
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        if vacuum:
+            self.conn.execute('VACUUM INTO ?', (partial_path,))
+        else:
+            target = sqlite3.connect(partial_path)
+            try:
+                self.conn.backup(target, pages=pages_per_step,
+                                 progress=self._backup_progress(progress))
+                # A single self-contained file, even when the source runs in WAL mode
+                target.execute('PRAGMA journal_mode = DELETE')
+            finally:
+                target.close()
+        os.replace(partial_path, path)
+
+    def restore_snapshot(self, path, pages_per_step=SNAPSHOT_PAGES_PER_STEP, progress=None):
+        # Replaces the whole database with a snapshot from export_snapshot
+        source = sqlite3.connect(f'{Path(path).resolve().as_uri()}?mode=ro', uri=True)
+        try:
+            try:
+                check = source.execute('PRAGMA quick_check').fetchone()[0]
+                tables = {row[0] for row in source.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            except sqlite3.DatabaseError:
+                raise ValueError(f"{path} is not a SQLite database")
+            if check != 'ok':
+                raise ValueError(f"Snapshot failed integrity check: {check}")
+            if not {'users', 'events', 'tasks', 'guests'} <= tables:
+                raise ValueError(f"{path} is not an Event Planner snapshot")
+            if get_schema_version(source) > SCHEMA_VERSION:
+                raise ValueError("Snapshot was made by a newer version of Event Planner")
+            source.backup(self.conn, pages=pages_per_step, progress=self._backup_progress(progress))
+        finally:
+            source.close()
+        # Older snapshots are brought up to the current schema
+        migrate(self.conn)
+        self.clear_cache()
+
+    def _backup_progress(self, progress):
+        if progress is None:
+            return None
+        return lambda status, remaining, total: progress('pages', total - remaining)
+
+    def get_backup_data(self, user_id, include_seq=False):
+        # The user, every table and (with include_seq) the change sequence are read in
+        # one transaction, so they describe a single state even while another
+        # connection keeps writing
+        self.conn.execute('BEGIN')
+        try:
+            data = {
+                "user_id": user_id,
+                "user": self._read_user(user_id),
+                "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S")
+            }
+            if include_seq:
+                data["seq"] = self.get_change_seq()
+            for table in RECORD_FIELDS:
+                data[table] = list(self.iter_records(user_id, table))
+        finally:
+            self.conn.commit()
+        return data
+
+    def get_change_seq(self):
+        # AUTOINCREMENT keeps the high-water mark even after changelog is pruned
+        row = self.conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changelog'").fetchone()
+        return row[0] if row else 0
+
+    def get_backup_state(self, user_id, api_url):
         with self.conn:
-            events = self.conn.execute('SELECT * FROM events WHERE user_id = ?', (user_id,)).fetchall()
-            with open(f'{filename}_events.csv', 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['ID', 'User ID', 'Name', 'Date', 'Time', 'Venue', 'Description', 'Is Archived'])
-                writer.writerows(events)
-            archived = self.conn.execute('SELECT * FROM archived_events WHERE user_id = ?', (user_id,)).fetchall()
-            with open(f'{filename}_archived.csv', 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['ID', 'User ID', 'Name', 'Date', 'Time', 'Venue', 'Description', 'Archived Date'])
-                writer.writerows(archived)
-            tasks = self.conn.execute('''
-                SELECT t.* FROM tasks t
-                JOIN events e ON t.event_id = e.id
-                WHERE e.user_id = ?
-            ''', (user_id,)).fetchall()
-            with open(f'{filename}_tasks.csv', 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['ID', 'Event ID', 'Description', 'Is Completed'])
-                writer.writerows(tasks)
-            guests = self.conn.execute('''
-                SELECT g.* FROM guests g
-                JOIN events e ON g.event_id = e.id
-                WHERE e.user_id = ?
-            ''', (user_id,)).fetchall()
-            with open(f'{filename}_guests.csv', 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['ID', 'Event ID', 'Name', 'Email'])
-                writer.writerows(guests)
-
-    def export_to_json(self, user_id, filename):
-        data = {
-            'events': [],
-            'archived_events': [],
-            'tasks': [],
-            'guests': []
-        }
+            return self.conn.execute('''
+                SELECT acked_seq, deltas, digest FROM backup_state WHERE user_id = ? AND api_url = ?
+            ''', (user_id, api_url)).fetchone()
+
+    def is_backup_current(self, user_id, api_url):
+        # True when nothing the user owns has changed since the last acknowledged
+        # backup to api_url; one indexed lookup, cheap enough for the UI thread
+        state = self.get_backup_state(user_id, api_url)
+        if state is None or state[0] is None:
+            return False
+        return self.conn.execute('''
+            SELECT 1 FROM changelog WHERE user_id = ? AND seq > ? LIMIT 1
+        ''', (user_id, state[0])).fetchone() is None
+
+    def track_backups(self, user_id, api_url):
+        # Starts change logging for the user; must run before the first full backup
+        # is read so nothing changed during it goes unlogged
         with self.conn:
-            for row in self.conn.execute('SELECT * FROM events WHERE user_id = ?', (user_id,)):
-                data['events'].append({
-                    'id': row[0],
-                    'user_id': row[1],
-                    'name': row[2],
-                    'date': row[3],
-                    'time': row[4],
-                    'venue': row[5],
-                    'description': row[6],
-                    'is_archived': bool(row[7])
-                })
-            for row in self.conn.execute('SELECT * FROM archived_events WHERE user_id = ?', (user_id,)):
-                data['archived_events'].append({
-                    'id': row[0],
-                    'user_id': row[1],
-                    'name': row[2],
-                    'date': row[3],
-                    'time': row[4],
-                    'venue': row[5],
-                    'description': row[6],
-                    'archived_date': row[7]
-                })
-            for row in self.conn.execute('''
-                SELECT t.* FROM tasks t
-                JOIN events e ON t.event_id = e.id
-                WHERE e.user_id = ?
-            ''', (user_id,)):
-                data['tasks'].append({
-                    'id': row[0],
-                    'event_id': row[1],
-                    'description': row[2],
-                    'is_completed': bool(row[3])
-                })
-            for row in self.conn.execute('''
-                SELECT g.* FROM guests g
-                JOIN events e ON g.event_id = e.id
-                WHERE e.user_id = ?
-            ''', (user_id,)):
-                data['guests'].append({
-                    'id': row[0],
-                    'event_id': row[1],
-                    'name': row[2],
-                    'email': row[3]
-                })
-        with open(f'{filename}.json', 'w') as f:
-            json.dump(data, f, indent=4)
-
-    def get_backup_data(self, user_id):
-        data = {
-            "user_id": user_id,
-            "user": self.get_user_by_id(user_id),
-            "events": [],
-            "archived_events": [],
-            "tasks": [],
-            "guests": [],
-            "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S")
-        }
+            self.conn.execute('''
+                INSERT OR IGNORE INTO backup_state (user_id, api_url) VALUES (?, ?)
+            ''', (user_id, api_url))
+        return self.get_backup_state(user_id, api_url)
+
+    def acknowledge_backup(self, user_id, api_url, seq, full, digest=None):
+        # digest: content digest of a full backup; a delta leaves it unknown
         with self.conn:
-            for row in self.conn.execute('SELECT * FROM events WHERE user_id = ?', (user_id,)):
-                data['events'].append({
-                    'id': row[0],
-                    'user_id': row[1],
-                    'name': row[2],
-                    'date': row[3],
-                    'time': row[4],
-                    'venue': row[5],
-                    'description': row[6],
-                    'is_archived': bool(row[7])
-                })
-            for row in self.conn.execute('SELECT * FROM archived_events WHERE user_id = ?', (user_id,)):
-                data['archived_events'].append({
-                    'id': row[0],
-                    'user_id': row[1],
-                    'name': row[2],
-                    'date': row[3],
-                    'time': row[4],
-                    'venue': row[5],
-                    'description': row[6],
-                    'archived_date': row[7]
-                })
-            for row in self.conn.execute('SELECT * FROM tasks WHERE event_id IN (SELECT id FROM events WHERE user_id = ?)', (user_id,)):
-                data['tasks'].append({
-                    'id': row[0],
-                    'event_id': row[1],
-                    'description': row[2],
-                    'is_completed': bool(row[3])
-                })
-            for row in self.conn.execute('SELECT * FROM guests WHERE event_id IN (SELECT id FROM events WHERE user_id = ?)', (user_id,)):
-                data['guests'].append({
-                    'id': row[0],
-                    'event_id': row[1],
-                    'name': row[2],
-                    'email': row[3]
-                })
-        return data
+            self.conn.execute('''
+                UPDATE backup_state SET acked_seq = ?, deltas = CASE WHEN ? THEN 0 ELSE deltas + 1 END,
+                digest = ?
+                WHERE user_id = ? AND api_url = ?
+            ''', (seq, full, digest, user_id, api_url))
+            self.conn.execute('''
+                DELETE FROM changelog WHERE user_id = ?
+                AND seq <= (SELECT MIN(acked_seq) FROM backup_state WHERE user_id = ?)
+            ''', (user_id, user_id))
 
-    def restore_backup_data(self, backup_data):
-        user_id = backup_data['user_id']
+    def reset_backup_state(self, user_id):
+        # After a recovery the next backup has to be a full one
         with self.conn:
+            self.conn.execute('DELETE FROM backup_state WHERE user_id = ?', (user_id,))
+            self.conn.execute('DELETE FROM changelog WHERE user_id = ?', (user_id,))
+
+    def get_backup_delta(self, user_id, since_seq, batch_size=BULK_BATCH_SIZE):
+        # Current state of every row changed after since_seq: rows still owned by the
+        # user are upserts, the rest deletes. The sequence, the changelog and the rows
+        # are read in one transaction, so the delta is a single state up to seq and a
+        # change racing with it is left for the next delta.
+        self.conn.execute('BEGIN')
+        try:
+            seq = self.get_change_seq()
+            delta = {
+                "user_id": user_id,
+                "kind": "delta",
+                "base_seq": since_seq,
+                "seq": seq,
+                "user": self._read_user(user_id),
+                "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+                "upserts": {},
+                "deletes": {},
+            }
+            for table in RECORD_FIELDS:
+                ids = [row[0] for row in self.conn.execute('''
+                    SELECT DISTINCT row_id FROM changelog
+                    WHERE user_id = ? AND table_name = ? AND seq > ? AND seq <= ?
+                    ORDER BY row_id
+                ''', (user_id, table, since_seq, seq))]
+                records = []
+                for batch in batched(ids, batch_size):
+                    records.extend(row_to_record(table, row) for row in self.conn.execute(
+                        f"SELECT * FROM ({EXPORT_QUERIES[table]}) WHERE id IN ({', '.join('?' * len(batch))})",
+                        (user_id, *batch)))
+                found = {record['id'] for record in records}
+                delta['upserts'][table] = sorted(records, key=lambda record: record['id'])
+                delta['deletes'][table] = [row_id for row_id in ids if row_id not in found]
+        finally:
+            self.conn.commit()
+        return delta
+
+    def restore_backup_data(self, backup_data, deltas=(), batch_size=BULK_BATCH_SIZE):
+        # Stage the payload in temp tables and validate it there, so a bad backup is
+        # rejected before the live tables are touched; then swap it in with set-based
+        # INSERT ... SELECT inside one short write transaction. deltas from
+        # get_backup_delta are replayed onto the staged copy, oldest first.
+        user_id = backup_data['user_id']
+        try:
+            self._stage_backup(backup_data, batch_size)
+            user = self._apply_staged_deltas(backup_data, deltas, batch_size)
+            self._validate_staged_backup(user_id, user)
+            self.conn.commit()
+            self.conn.execute('BEGIN IMMEDIATE')
             # Clear existing data for the user
             self.conn.execute('DELETE FROM guests WHERE event_id IN (SELECT id FROM events WHERE user_id = ?)', (user_id,))
             self.conn.execute('DELETE FROM tasks WHERE event_id IN (SELECT id FROM events WHERE user_id = ?)', (user_id,))
             self.conn.execute('DELETE FROM events WHERE user_id = ?', (user_id,))
             self.conn.execute('DELETE FROM archived_events WHERE user_id = ?', (user_id,))
-            # Restore user
-            user = backup_data['user']
             self.conn.execute('''
                 INSERT OR REPLACE INTO users (id, username, password_hash, email)
                 VALUES (?, ?, ?, ?)
             ''', (user['id'], user['username'], user['password_hash'], user['email']))
-            # Restore events
-            for event in backup_data['events']:
-                self.conn.execute('''
-                    INSERT INTO events (id, user_id, name, date, time, venue, description, is_archived)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    event['id'], event['user_id'], event['name'], event['date'],
-                    event['time'], event['venue'], event['description'], 1 if event['is_archived'] else 0
-                ))
-            # Restore archived events
-            for archived_event in backup_data['archived_events']:
-                self.conn.execute('''
-                    INSERT INTO archived_events (id, user_id, name, date, time, venue, description, archived_date)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    archived_event['id'], archived_event['user_id'], archived_event['name'],
-                    archived_event['date'], archived_event['time'], archived_event['venue'],
-                    archived_event['description'], archived_event['archived_date']
-                ))
-            # Restore tasks
-            for task in backup_data['tasks']:
-                self.conn.execute('''
-                    INSERT INTO tasks (id, event_id, description, is_completed)
-                    VALUES (?, ?, ?, ?)
-                ''', (
-                    task['id'], task['event_id'], task['description'], 1 if task['is_completed'] else 0
-                ))
-            # Restore guests
-            for guest in backup_data['guests']:
-                self.conn.execute('''
-                    INSERT INTO guests (id, event_id, name, email)
-                    VALUES (?, ?, ?, ?)
-                ''', (
-                    guest['id'], guest['event_id'], guest['name'], guest['email']
-                ))
\ No newline at end of file
+            self.conn.execute('''
+                INSERT INTO events (id, user_id, name, date, time, venue, description, is_archived)
+                SELECT id, user_id, name, date, time, venue, description, is_archived FROM temp.restore_events
+            ''')
+            self.conn.execute('''
+                INSERT INTO archived_events (id, user_id, name, date, time, venue, description, archived_date)
+                SELECT id, user_id, name, date, time, venue, description, archived_date
+                FROM temp.restore_archived_events
+            ''')
+            self.conn.execute('''
+                INSERT INTO tasks (id, event_id, description, is_completed)
+                SELECT id, event_id, description, is_completed FROM temp.restore_tasks
+            ''')
+            self.conn.execute('''
+                INSERT INTO guests (id, event_id, name, email)
+                SELECT id, event_id, name, email FROM temp.restore_guests
+            ''')
+            self.conn.commit()
+            self.clear_cache()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        finally:
+            for table in RESTORE_STAGING:
+                self.conn.execute(f'DROP TABLE IF EXISTS temp.restore_{table}')
+
+    def _stage_backup(self, backup_data, batch_size):
+        for table, (schema, columns) in RESTORE_STAGING.items():
+            self.conn.execute(f'DROP TABLE IF EXISTS temp.restore_{table}')
+            self.conn.execute(f'CREATE TEMP TABLE restore_{table} ({schema})')
+            if table not in backup_data:
+                raise ValueError(f"Backup is missing {table}")
+            self._stage_records(table, 'INSERT', backup_data[table], batch_size)
+
+    def _stage_records(self, table, verb, records, batch_size):
+        columns = RESTORE_STAGING[table][1]
+        sql = f'''
+            {verb} INTO temp.restore_{table} ({', '.join(columns)})
+            VALUES ({', '.join('?' * len(columns))})
+        '''
+        try:
+            rows = ([record[column] for column in columns] for record in records)
+            for batch in batched(rows, batch_size):
+                self.conn.executemany(sql, batch)
+        except KeyError as e:
+            raise ValueError(f"Backup {table} record is missing {e}")
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"Invalid {table} in backup: {e}")
+
+    def _apply_staged_deltas(self, backup_data, deltas, batch_size):
+        user = backup_data['user']
+        seq = backup_data.get('seq')
+        for delta in deltas:
+            if delta.get('user_id') != backup_data['user_id'] or seq is None or delta.get('base_seq') != seq:
+                raise ValueError("Backup deltas do not follow on from the backup")
+            try:
+                for table, ids in delta['deletes'].items():
+                    if table not in RESTORE_STAGING:
+                        raise ValueError(f"Unknown table {table!r} in backup delta")
+                    for batch in batched(((row_id,) for row_id in ids), batch_size):
+                        self.conn.executemany(f'DELETE FROM temp.restore_{table} WHERE id = ?', batch)
+                for table, records in delta['upserts'].items():
+                    if table not in RESTORE_STAGING:
+                        raise ValueError(f"Unknown table {table!r} in backup delta")
+                    self._stage_records(table, 'INSERT OR REPLACE', records, batch_size)
+                user = delta['user']
+                seq = delta['seq']
+            except (KeyError, AttributeError) as e:
+                raise ValueError(f"Malformed backup delta: {e}")
+        return user
+
+    def _validate_staged_backup(self, user_id, user):
+        if user is None or user.get('id') != user_id:
+            raise ValueError("Backup user does not match its user_id")
+        owner = self.conn.execute('SELECT id FROM users WHERE username = ?', (user['username'],)).fetchone()
+        if owner and owner[0] != user_id:
+            raise ValueError(f"Username {user['username']!r} belongs to another account")
+        for message, sql in RESTORE_CHECKS:
+            if self.conn.execute(sql, {'user_id': user_id}).fetchone():
+                raise ValueError(message)
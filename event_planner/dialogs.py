@@ -3,7 +3,6 @@ from PyQt5.QtWidgets import (
     QMessageBox, QTimeEdit, QCheckBox, QTextEdit, QTextBrowser, QPushButton
 )
 from PyQt5.QtCore import Qt, QDate, QTime
-import requests
 
 class TaskDialog(QDialog):
     def __init__(self, parent=None, task_data=None):
@@ -241,18 +240,9 @@ class SettingsDialog(QDialog):
         if not hasattr(parent, 'current_user_id') or not parent.current_user_id:
             QMessageBox.warning(self, "Error", "No user is logged in")
             return
-        try:
-            data = parent.db.get_backup_data(parent.current_user_id)
-            response = requests.post(f"{api_url}/backup", json=data, timeout=10)
-            response.raise_for_status()
-            result = response.json()
-            parent.status_bar.showMessage(f"Backup completed: {result['message']}", 5000)
-        except requests.exceptions.RequestException as e:
-            QMessageBox.critical(self, "Backup Error", f"Failed to connect to API: {str(e)}")
-        except ValueError as e:
-            QMessageBox.critical(self, "Backup Error", f"Invalid API response: {str(e)}")
-        except Exception as e:
-            QMessageBox.critical(self, "Backup Error", f"Backup failed: {str(e)}")
+        # Runs as a background job owned by the main window, so this dialog can be
+        # closed and the window keeps working while the request is in flight
+        parent.start_backup(api_url)
 
     def perform_recovery(self):
         api_url = self.api_url_input.text().strip()
@@ -270,21 +260,4 @@ class SettingsDialog(QDialog):
         if not hasattr(parent, 'current_user_id') or not parent.current_user_id:
             QMessageBox.warning(self, "Error", "No user is logged in")
             return
-        try:
-            response = requests.get(f"{api_url}/recover/{parent.current_user_id}", timeout=10)
-            response.raise_for_status()
-            backup_data = response.json()
-            parent.db.restore_backup_data(backup_data)
-            parent.load_events()
-            parent.status_bar.showMessage("Data recovered successfully", 5000)
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
-                QMessageBox.critical(self, "Recovery Error", "No backup found for this user")
-            else:
-                QMessageBox.critical(self, "Recovery Error", f"API error: {str(e)}")
-        except requests.exceptions.RequestException as e:
-            QMessageBox.critical(self, "Recovery Error", f"Failed to connect to API: {str(e)}")
-        except ValueError as e:
-            QMessageBox.critical(self, "Recovery Error", f"Invalid API response: {str(e)}")
-        except Exception as e:
-            QMessageBox.critical(self, "Recovery Error", f"Recovery failed: {str(e)}")
\ No newline at end of file
+        parent.start_recovery(api_url)
@@ -0,0 +1,103 @@
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from .database import EventDatabase, CSV_EXPORTS, EXPORT_BATCH_SIZE, write_csv_table
+
+def open_snapshot_connections(db_name, count, timeout=5.0):
+    # Opens `count` read-only connections that all see the same committed state.
+    # A brief RESERVED lock keeps writers out while each reader starts its read
+    # transaction; in WAL mode writers are free again as soon as it is released.
+    uri = f'{Path(db_name).resolve().as_uri()}?mode=ro'
+    writer = sqlite3.connect(db_name, timeout=timeout, isolation_level=None)
+    readers = []
+    try:
+        writer.execute('BEGIN IMMEDIATE')
+        try:
+            for _ in range(count):
+                conn = sqlite3.connect(uri, uri=True, timeout=timeout,
+                                       isolation_level=None, check_same_thread=False)
+                readers.append(conn)
+                conn.execute('BEGIN')
+                conn.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        finally:
+            writer.execute('ROLLBACK')
+    except sqlite3.Error:
+        close_snapshot_connections(readers)
+        raise
+    finally:
+        writer.close()
+    return readers
+
+def close_snapshot_connections(readers):
+    for conn in readers:
+        if conn.in_transaction:
+            conn.execute('COMMIT')
+        conn.close()
+
+def journal_mode(db_name):
+    conn = sqlite3.connect(db_name)
+    try:
+        return conn.execute('PRAGMA journal_mode').fetchone()[0].lower()
+    finally:
+        conn.close()
+
+def export_csv_snapshot(db_name, user_id, filename, compress=False, max_workers=len(CSV_EXPORTS),
+                        progress=None, batch_size=EXPORT_BATCH_SIZE):
+    # Writes the four CSV files concurrently from one consistent snapshot without
+    # touching the caller's connection. progress(table, rows) may be called from
+    # worker threads. Outside WAL mode (the "durable" profile) an open read blocks
+    # every writer, so the tables are then read one short keyset batch at a time on
+    # a single connection instead: writers stay unblocked, but the files are no
+    # longer one snapshot.
+    start = time.perf_counter()
+    if journal_mode(db_name) != 'wal':
+        tables = _export_csv_batched(db_name, user_id, filename, compress, progress, batch_size)
+    else:
+        readers = open_snapshot_connections(db_name, len(CSV_EXPORTS))
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = {
+                    suffix: pool.submit(write_csv_table, conn, user_id, filename, suffix, header, query,
+                                        compress=compress, progress=progress, batch_size=batch_size)
+                    for conn, (suffix, header, query) in zip(readers, CSV_EXPORTS)
+                }
+                tables = {suffix: future.result() for suffix, future in futures.items()}
+        finally:
+            close_snapshot_connections(readers)
+    seconds = time.perf_counter() - start
+    rows = sum(tables.values())
+    return {
+        'rows': rows,
+        'tables': tables,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds else 0.0,
+    }
+
+def _export_csv_batched(db_name, user_id, filename, compress, progress, batch_size):
+    conn = sqlite3.connect(db_name, isolation_level=None)
+    try:
+        return {
+            suffix: write_csv_table(conn, user_id, filename, suffix, header, query, compress=compress,
+                                    progress=progress, batch_size=batch_size, keyset=True)
+            for suffix, header, query in CSV_EXPORTS
+        }
+    finally:
+        conn.close()
+
+def export_snapshot_file(db_name, path, vacuum=False, progress=None, profile=None):
+    # Background-job entry points: each opens its own connection
+    db = EventDatabase(db_name, profile)
+    try:
+        db.export_snapshot(path, vacuum=vacuum, progress=progress)
+    finally:
+        db.conn.close()
+    return path
+
+def restore_snapshot_file(db_name, path, progress=None, profile=None):
+    db = EventDatabase(db_name, profile)
+    try:
+        db.restore_snapshot(path, progress=progress)
+    finally:
+        db.conn.close()
+    return path
@@ -0,0 +1,308 @@
+import csv
+import gzip
+import json
+import os
+import re
+from .database import EventDatabase, BULK_BATCH_SIZE, CSV_EXPORTS, RECORD_FIELDS
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+# Lower-cased header names used by common ticketing exports
+NAME_HEADERS = ('name', 'full name', 'guest name', 'guest', 'attendee', 'attendee name')
+FIRST_NAME_HEADERS = ('first name', 'firstname', 'given name')
+LAST_NAME_HEADERS = ('last name', 'lastname', 'surname', 'family name')
+EMAIL_HEADERS = ('email', 'e-mail', 'email address', 'e-mail address')
+
+IMPORT_STATEMENTS = {
+    'events': '''
+        INSERT INTO events (id, user_id, name, date, time, venue, description, is_archived)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    'archived_events': '''
+        INSERT INTO archived_events (id, user_id, name, date, time, venue, description, archived_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    'tasks': 'INSERT INTO tasks (event_id, description, is_completed) VALUES (?, ?, ?)',
+    'guests': 'INSERT INTO guests (event_id, name, email) VALUES (?, ?, ?)',
+}
+
+NULLABLE_FIELDS = {'time', 'venue', 'description', 'archived_date', 'email'}
+
+def normalize_email(email):
+    # Returns the canonical form, '' for a blank email, or None if it is malformed
+    email = (email or '').strip().lower()
+    if not email:
+        return ''
+    return email if EMAIL_PATTERN.match(email) else None
+
+def guest_key(name, email):
+    # Guests are the same person if their emails match, or, without an email, their names
+    return ('email', email) if email else ('name', ' '.join(name.split()).casefold())
+
+def _find_column(header, candidates):
+    for position, column in enumerate(header):
+        if column.strip().lower() in candidates:
+            return position
+    return None
+
+def _guest_reader(rows):
+    header = next(rows, None)
+    if header is None:
+        return
+    name_column = _find_column(header, NAME_HEADERS)
+    first_column = _find_column(header, FIRST_NAME_HEADERS)
+    last_column = _find_column(header, LAST_NAME_HEADERS)
+    email_column = _find_column(header, EMAIL_HEADERS)
+    if name_column is None and first_column is None:
+        raise ValueError("CSV file needs a 'Name' (or 'First Name') column")
+
+    def cell(row, position):
+        return row[position].strip() if position is not None and position < len(row) else ''
+
+    for row in rows:
+        if name_column is not None:
+            name = cell(row, name_column)
+        else:
+            name = ' '.join(part for part in (cell(row, first_column), cell(row, last_column)) if part)
+        yield name, cell(row, email_column)
+
+def import_guests_csv(db, event_id, path, progress=None, batch_size=BULK_BATCH_SIZE):
+    # Streams the file into add_guests_bulk (one transaction), skipping rows without a
+    # name or with a malformed email, and guests already on the event or earlier in the file.
+    seen = set()
+    for name, email in db.conn.execute('SELECT name, email FROM guests WHERE event_id = ?', (event_id,)):
+        seen.add(guest_key(name, normalize_email(email) or ''))
+    stats = {'imported': 0, 'duplicates': 0, 'invalid': 0}
+
+    def guests(rows):
+        for read, (name, email) in enumerate(_guest_reader(rows), start=1):
+            if progress and read % batch_size == 0:
+                progress('guests', read)
+            email = normalize_email(email)
+            if not name or email is None:
+                stats['invalid'] += 1
+                continue
+            key = guest_key(name, email)
+            if key in seen:
+                stats['duplicates'] += 1
+                continue
+            seen.add(key)
+            yield name, email or None
+
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        stats['imported'] = len(db.add_guests_bulk(event_id, guests(csv.reader(f)), batch_size=batch_size))
+    return stats
+
+def import_guests_csv_file(db_name, event_id, path, progress=None, profile=None):
+    # Entry point for background jobs: uses its own connection
+    db = EventDatabase(db_name, profile)
+    try:
+        return import_guests_csv(db, event_id, path, progress=progress)
+    finally:
+        db.conn.close()
+
+class JsonStream:
+    # Minimal incremental reader for a top-level JSON object whose large values are
+    # arrays; each array element is decoded on its own so memory stays bounded.
+    def __init__(self, f, chunk_size=64 * 1024):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def _read(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+
+    def peek(self):
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position < len(self.buffer) or self.eof:
+                return self.buffer[self.position:self.position + 1]
+            self._read()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Malformed JSON export: expected {char!r} at {self.peek()!r}")
+        self.position += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise ValueError("Malformed JSON export")
+                self._read()
+                continue
+            if end == len(self.buffer) and not self.eof:
+                # A number or literal may continue in the next chunk
+                self._read()
+                continue
+            self.position = end
+            return value
+
+    def items(self):
+        # Yields (key, element) for each element of top-level arrays and
+        # (key, value) for any other top-level value
+        self.expect('{')
+        if self.peek() == '}':
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            if self.peek() == '[':
+                self.expect('[')
+                if self.peek() == ']':
+                    self.position += 1
+                else:
+                    while True:
+                        yield key, self.value()
+                        if self.peek() == ',':
+                            self.position += 1
+                            continue
+                        self.expect(']')
+                        break
+            else:
+                yield key, self.value()
+            if self.peek() == ',':
+                self.position += 1
+                continue
+            self.expect('}')
+            return
+
+def iter_json_export(path):
+    with open(path, encoding='utf-8') as f:
+        for key, value in JsonStream(f).items():
+            if key in RECORD_FIELDS and isinstance(value, dict):
+                yield key, value
+
+def iter_ndjson_export(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record['type'], record['data']
+
+def _open_csv(path):
+    if os.path.exists(f'{path}.gz'):
+        return gzip.open(f'{path}.gz', 'rt', newline='', encoding='utf-8')
+    return open(path, newline='', encoding='utf-8')
+
+def iter_csv_export(base):
+    # Reads {base}_events.csv, _archived.csv, _tasks.csv and _guests.csv (or .csv.gz)
+    for (suffix, _, _), table in zip(CSV_EXPORTS, RECORD_FIELDS):
+        path = f'{base}_{suffix}.csv'
+        if not os.path.exists(path) and not os.path.exists(f'{path}.gz'):
+            continue
+        with _open_csv(path) as f:
+            rows = csv.reader(f)
+            next(rows, None)
+            for row in rows:
+                record = dict(zip(RECORD_FIELDS[table], row))
+                # csv.writer writes None as '', so blank optional fields come back as NULL
+                for field, value in record.items():
+                    if value == '' and field in NULLABLE_FIELDS:
+                        record[field] = None
+                yield table, record
+
+def csv_export_base(path):
+    # Maps any of the four exported file names back to the prefix they share
+    name = path[:-3] if path.endswith('.gz') else path
+    for suffix, _, _ in CSV_EXPORTS:
+        if name.endswith(f'_{suffix}.csv'):
+            return name[:-len(f'_{suffix}.csv')]
+    return name[:-4] if name.endswith('.csv') else name
+
+def import_records(db, user_id, records, progress=None, batch_size=BULK_BATCH_SIZE):
+    # Inserts exported records (in any table order) under user_id. Event IDs are
+    # shifted past every existing event/archived ID so tasks and guests can be remapped
+    # without a lookup table; foreign keys are checked once, at commit.
+    conn = db.conn
+    foreign_keys = conn.execute('PRAGMA foreign_keys').fetchone()[0]
+    conn.execute('PRAGMA foreign_keys = ON')
+    counts = dict.fromkeys(RECORD_FIELDS, 0)
+    pending = {table: [] for table in RECORD_FIELDS}
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('PRAGMA defer_foreign_keys = ON')
+            offset = conn.execute('''
+                SELECT MAX(COALESCE((SELECT MAX(id) FROM events), 0),
+                           COALESCE((SELECT MAX(id) FROM archived_events), 0))
+            ''').fetchone()[0]
+
+            def flush(table):
+                conn.executemany(IMPORT_STATEMENTS[table], pending[table])
+                counts[table] += len(pending[table])
+                pending[table] = []
+                if progress:
+                    progress(table, counts[table])
+
+            for table, record in records:
+                if table not in pending:
+                    continue
+                pending[table].append(_import_row(table, record, user_id, offset))
+                if len(pending[table]) >= batch_size:
+                    flush(table)
+            for table in pending:
+                if pending[table]:
+                    flush(table)
+            # Task rows may be flushed before their event row exists (a full task batch
+            # ahead of the last event batch, or tasks listed first), and the counter
+            # triggers skip those; recount every imported event instead
+            conn.execute('''
+                UPDATE events SET
+                    task_total = (SELECT COUNT(*) FROM tasks WHERE event_id = events.id),
+                    task_done = (SELECT COUNT(*) FROM tasks WHERE event_id = events.id AND is_completed)
+                WHERE user_id = ? AND id > ?
+            ''', (user_id, offset))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    finally:
+        conn.execute(f'PRAGMA foreign_keys = {foreign_keys}')
+        db.clear_cache()
+    return counts
+
+def _import_row(table, record, user_id, offset):
+    if table == 'events':
+        return (int(record['id']) + offset, user_id, record['name'], record['date'], record['time'],
+                record['venue'], record['description'], _flag(record['is_archived']))
+    if table == 'archived_events':
+        return (int(record['id']) + offset, user_id, record['name'], record['date'], record['time'],
+                record['venue'], record['description'], record['archived_date'])
+    if table == 'tasks':
+        return (int(record['event_id']) + offset, record['description'], _flag(record['is_completed']))
+    return (int(record['event_id']) + offset, record['name'], record['email'])
+
+def _flag(value):
+    # JSON exports booleans, CSV exports 0/1 strings
+    if isinstance(value, str):
+        return 1 if value.strip().lower() in ('1', 'true') else 0
+    return 1 if value else 0
+
+def import_export(db, user_id, path, progress=None):
+    # Picks the reader from the file name: .json, .ndjson, or one of the CSV files
+    if path.endswith('.ndjson'):
+        records = iter_ndjson_export(path)
+    elif path.endswith('.json'):
+        records = iter_json_export(path)
+    else:
+        records = iter_csv_export(csv_export_base(path))
+    return import_records(db, user_id, records, progress=progress)
+
+def import_export_file(db_name, user_id, path, progress=None, profile=None):
+    db = EventDatabase(db_name, profile)
+    try:
+        return import_export(db, user_id, path, progress=progress)
+    finally:
+        db.conn.close()
@@ -0,0 +1,249 @@
+import sqlite3
+
+def _changelog_triggers(table, owner):
+    # owner(ref) selects the user_id owning the new/old row. Changes are only
+    # logged for users that have backup_state, i.e. that back up incrementally.
+    events = [
+        ('insert', 'INSERT', 'new', owner('new')),
+        ('update', 'UPDATE', 'new', f"{owner('new')} UNION {owner('old')}"),
+        ('delete', 'DELETE', 'old', owner('old')),
+    ]
+    return [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS changelog_{table}_{name} AFTER {event} ON {table} BEGIN
+            INSERT INTO changelog (table_name, row_id, user_id)
+            SELECT '{table}', {ref}.id, owner.user_id FROM ({owners}) owner
+            WHERE owner.user_id IN (SELECT user_id FROM backup_state);
+        END
+        '''
+        for name, event, ref, owners in events
+    ]
+
+def _own_user(ref):
+    return f"SELECT {ref}.user_id AS user_id"
+
+def _event_user(ref):
+    return f"SELECT user_id FROM events WHERE id = {ref}.event_id"
+
+# Each entry upgrades the schema by one version; PRAGMA user_version records
+# how many have been applied. Only append to this list, never edit a shipped entry.
+# Version 1 keeps IF NOT EXISTS so databases created before versioning adopt it.
+MIGRATIONS = [
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            email TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            date TEXT NOT NULL,
+            time TEXT,
+            venue TEXT,
+            description TEXT,
+            is_archived INTEGER DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS archived_events (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            date TEXT NOT NULL,
+            time TEXT,
+            venue TEXT,
+            description TEXT,
+            archived_date TEXT,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY,
+            event_id INTEGER NOT NULL,
+            description TEXT NOT NULL,
+            is_completed INTEGER DEFAULT 0,
+            FOREIGN KEY (event_id) REFERENCES events(id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS guests (
+            id INTEGER PRIMARY KEY,
+            event_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            email TEXT,
+            FOREIGN KEY (event_id) REFERENCES events(id)
+        )
+        ''',
+    ],
+    [
+        # Composite indexes matching the WHERE/ORDER BY of the hot read paths
+        '''
+        CREATE INDEX IF NOT EXISTS idx_events_user_archived_date
+        ON events (user_id, is_archived, date, time, name)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_archived_events_user_date
+        ON archived_events (user_id, archived_date)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_tasks_event
+        ON tasks (event_id, id)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_guests_event_name
+        ON guests (event_id, name)
+        ''',
+    ],
+    [
+        # Full-text index for search_events. The trigram tokenizer matches arbitrary
+        # substrings (3+ chars), so results line up with the old LIKE '%q%' search.
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+            name, venue, description,
+            content='events', content_rowid='id', tokenize='trigram'
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+            INSERT INTO events_fts (rowid, name, venue, description)
+            VALUES (new.id, new.name, new.venue, new.description);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+            INSERT INTO events_fts (events_fts, rowid, name, venue, description)
+            VALUES ('delete', old.id, old.name, old.venue, old.description);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS events_fts_update
+        AFTER UPDATE OF name, venue, description ON events BEGIN
+            INSERT INTO events_fts (events_fts, rowid, name, venue, description)
+            VALUES ('delete', old.id, old.name, old.venue, old.description);
+            INSERT INTO events_fts (rowid, name, venue, description)
+            VALUES (new.id, new.name, new.venue, new.description);
+        END
+        ''',
+        "INSERT INTO events_fts (events_fts) VALUES ('rebuild')",
+    ],
+    [
+        # Change tracking for incremental backups. backup_state records the last
+        # change acknowledged by each backup target; changelog holds the rows
+        # changed since, and is pruned as backups are acknowledged.
+        '''
+        CREATE TABLE IF NOT EXISTS backup_state (
+            user_id INTEGER NOT NULL,
+            api_url TEXT NOT NULL,
+            acked_seq INTEGER,
+            deltas INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, api_url)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS changelog (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_changelog_user_seq
+        ON changelog (user_id, seq)
+        ''',
+        *_changelog_triggers('events', _own_user),
+        *_changelog_triggers('archived_events', _own_user),
+        *_changelog_triggers('tasks', _event_user),
+        *_changelog_triggers('guests', _event_user),
+    ],
+    [
+        # Digest of the content last uploaded as a full backup, and logging of
+        # account changes, so an unchanged account can skip its backup entirely
+        'ALTER TABLE backup_state ADD COLUMN digest TEXT',
+        '''
+        CREATE TRIGGER IF NOT EXISTS changelog_users_update AFTER UPDATE ON users
+        WHEN new.id IN (SELECT user_id FROM backup_state) BEGIN
+            INSERT INTO changelog (table_name, row_id, user_id) VALUES ('users', new.id, new.id);
+        END
+        ''',
+    ],
+    [
+        # Per-event task counters kept by triggers, so archive eligibility and the
+        # task count are a primary-key lookup instead of a scan of the event's tasks
+        'ALTER TABLE events ADD COLUMN task_total INTEGER NOT NULL DEFAULT 0',
+        'ALTER TABLE events ADD COLUMN task_done INTEGER NOT NULL DEFAULT 0',
+        '''
+        UPDATE events SET
+            task_total = (SELECT COUNT(*) FROM tasks WHERE tasks.event_id = events.id),
+            task_done = (SELECT COUNT(*) FROM tasks WHERE tasks.event_id = events.id AND tasks.is_completed)
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS tasks_counters_insert AFTER INSERT ON tasks BEGIN
+            UPDATE events SET task_total = task_total + 1,
+                task_done = task_done + (CASE WHEN new.is_completed THEN 1 ELSE 0 END)
+            WHERE id = new.event_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS tasks_counters_delete AFTER DELETE ON tasks BEGIN
+            UPDATE events SET task_total = task_total - 1,
+                task_done = task_done - (CASE WHEN old.is_completed THEN 1 ELSE 0 END)
+            WHERE id = old.event_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS tasks_counters_update
+        AFTER UPDATE OF event_id, is_completed ON tasks BEGIN
+            UPDATE events SET task_total = task_total - 1,
+                task_done = task_done - (CASE WHEN old.is_completed THEN 1 ELSE 0 END)
+            WHERE id = old.event_id;
+            UPDATE events SET task_total = task_total + 1,
+                task_done = task_done + (CASE WHEN new.is_completed THEN 1 ELSE 0 END)
+            WHERE id = new.event_id;
+        END
+        ''',
+        # Counter updates are not backed up, so they must not reach the changelog
+        'DROP TRIGGER IF EXISTS changelog_events_update',
+        '''
+        CREATE TRIGGER IF NOT EXISTS changelog_events_update
+        AFTER UPDATE OF id, user_id, name, date, time, venue, description, is_archived ON events BEGIN
+            INSERT INTO changelog (table_name, row_id, user_id)
+            SELECT 'events', new.id, owner.user_id FROM (SELECT new.user_id AS user_id UNION SELECT old.user_id) owner
+            WHERE owner.user_id IN (SELECT user_id FROM backup_state);
+        END
+        ''',
+    ],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    # Warm start: a single PRAGMA read and nothing else
+    if get_schema_version(conn) >= SCHEMA_VERSION:
+        return False
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Re-read under the write lock in case another process migrated meanwhile
+        version = get_schema_version(conn)
+        for statements in MIGRATIONS[version:]:
+            for statement in statements:
+                conn.execute(statement)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        conn.execute('COMMIT')
+    except sqlite3.Error:
+        conn.execute('ROLLBACK')
+        raise
+    return True
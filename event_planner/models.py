@@ -0,0 +1,77 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+class EventTableModel(QAbstractTableModel):
+    HEADERS = ["Name", "Date", "Time", "Venue", "Description"]
+    # Column -> index into an events/archived_events row
+    COLUMNS = [2, 3, 4, 5, 6]
+
+    def __init__(self, parent=None, page_size=200):
+        super().__init__(parent)
+        self.page_size = page_size
+        self.rows = []
+        self.fetch_page = None
+        self.cursor = None
+
+    def load(self, fetch_page):
+        # fetch_page(page_size=..., cursor=...) -> (rows, next_cursor), e.g. a
+        # functools.partial over one of the EventDatabase *_page methods
+        rows, cursor = fetch_page(page_size=self.page_size, cursor=None)
+        self.set_page(fetch_page, rows, cursor)
+
+    def set_page(self, fetch_page, rows, cursor):
+        # Like load, for a first page already fetched elsewhere (e.g. by a search worker)
+        self.beginResetModel()
+        self.fetch_page = fetch_page
+        self.rows = list(rows)
+        self.cursor = cursor
+        self.endResetModel()
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self.fetch_page = None
+        self.cursor = None
+        self.rows = list(rows)
+        self.endResetModel()
+
+    def clear(self):
+        self.set_rows([])
+
+    def event_row(self, row):
+        if 0 <= row < len(self.rows):
+            return self.rows[row]
+        return None
+
+    def event_id(self, row):
+        event = self.event_row(row)
+        return event[0] if event else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        value = self.rows[index.row()][self.COLUMNS[index.column()]]
+        return value if value is not None else ""
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.cursor is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        rows, self.cursor = self.fetch_page(page_size=self.page_size, cursor=self.cursor)
+        if not rows:
+            return
+        start = len(self.rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
@@ -0,0 +1,118 @@
+import sqlite3
+import threading
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from .database import EventDatabase
+
+PREFETCH_NEIGHBOURS = 3
+PREFETCH_DEBOUNCE_MS = 100
+
+def prefetch_rows(current, first_visible, last_visible, row_count, neighbours=PREFETCH_NEIGHBOURS):
+    # Rows worth loading ahead, nearest to the current row first: its neighbours,
+    # then the rest of the visible rows. Any argument is -1 when there is none (no
+    # selection, or the view ends before the viewport does).
+    if row_count <= 0:
+        return []
+    first_visible = max(first_visible, 0)
+    last_visible = row_count - 1 if last_visible < 0 else min(last_visible, row_count - 1)
+    rows = set(range(first_visible, last_visible + 1))
+    if 0 <= current < row_count:
+        rows.update(range(max(current - neighbours, 0), min(current + neighbours, row_count - 1) + 1))
+        rows.discard(current)
+    else:
+        current = first_visible
+    return sorted(rows, key=lambda row: (abs(row - current), row < current))
+
+class PrefetchSignals(QObject):
+    loaded = pyqtSignal(int, int, int, object)
+
+class PrefetchTask(QRunnable):
+    def __init__(self, db_name, profile, user_id, event_ids, version):
+        super().__init__()
+        self.db_name = db_name
+        self.profile = profile
+        self.user_id = user_id
+        self.event_ids = event_ids
+        self.version = version
+        self.signals = PrefetchSignals()
+        self.cancelled = False
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def run(self):
+        if self.cancelled:
+            return
+        # Own connection: sqlite3 connections are bound to the thread that opened them
+        db = EventDatabase(self.db_name, self.profile)
+        with self.lock:
+            self.conn = db.conn
+        try:
+            for event_id in self.event_ids:
+                if self.cancelled:
+                    break
+                detail = db.get_event_detail(event_id, self.user_id)
+                self.signals.loaded.emit(self.version, self.user_id, event_id, detail)
+        except sqlite3.OperationalError:
+            # Raised as "interrupted" when cancel() fires mid-query
+            return
+        finally:
+            with self.lock:
+                self.conn = None
+                db.conn.close()
+
+    def cancel(self):
+        self.cancelled = True
+        with self.lock:
+            if self.conn is not None:
+                self.conn.interrupt()
+
+class DetailPrefetcher(QObject):
+    # Loads get_event_detail for rows around the selection on a worker thread and
+    # hands the results to the UI connection's query cache, which bounds them and
+    # drops them again when the event is written to.
+    def __init__(self, db, parent=None, debounce_ms=PREFETCH_DEBOUNCE_MS):
+        super().__init__(parent)
+        self.db = db
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self._start)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.user_id = None
+        self.pending = []
+        self.active_task = None
+
+    def submit(self, user_id, event_ids, debounce=False):
+        # Selection changes start at once so the next row is ready before the next key
+        # press; scrolling waits for the view to settle
+        self.user_id = user_id
+        self.pending = list(event_ids)
+        if debounce:
+            self.timer.start()
+        else:
+            self._start()
+
+    def cancel(self):
+        self.timer.stop()
+        if self.active_task is not None:
+            self.active_task.cancel()
+            self.active_task = None
+
+    def _start(self):
+        self.cancel()
+        if self.db.cache is None or self.db.db_name == ":memory:":
+            # Nowhere to keep results, or a worker connection would see an empty database
+            return
+        event_ids = [
+            event_id for event_id in dict.fromkeys(self.pending)
+            if event_id is not None and not self.db.has_cached_event_detail(event_id, self.user_id)
+        ]
+        if not event_ids:
+            return
+        task = PrefetchTask(self.db.db_name, self.db.profile, self.user_id, event_ids, self.db.cache.version)
+        task.signals.loaded.connect(self._store)
+        self.active_task = task
+        self.pool.start(task)
+
+    def _store(self, version, user_id, event_id, detail):
+        self.db.cache_event_detail(event_id, user_id, detail, version)
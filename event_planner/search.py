@@ -0,0 +1,149 @@
+import sqlite3
+import threading
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from .database import EventDatabase
+
+SEARCH_DEBOUNCE_MS = 250
+SEARCH_PAGE_SIZE = 200
+
+def refine_events(events, query):
+    # In-memory equivalent of search_events over name, venue and description
+    needle = query.casefold()
+    return [
+        event for event in events
+        if any(needle in (field or '').casefold() for field in (event[2], event[5], event[6]))
+    ]
+
+def fetch_search_page(db, user_id, query, page_size=SEARCH_PAGE_SIZE, cursor=None):
+    # One keyset page of matches; every event when the query is empty
+    if query:
+        return db.search_events_page(user_id, query, page_size=page_size, cursor=cursor)
+    return db.get_all_events_page(user_id, page_size=page_size, cursor=cursor)
+
+class SearchSignals(QObject):
+    finished = pyqtSignal(int, str, list, object)
+    failed = pyqtSignal(int, str, str)
+
+class SearchTask(QRunnable):
+    def __init__(self, db_name, profile, user_id, query, generation, page_size=SEARCH_PAGE_SIZE):
+        super().__init__()
+        self.db_name = db_name
+        self.profile = profile
+        self.user_id = user_id
+        self.query = query
+        self.generation = generation
+        self.page_size = page_size
+        self.signals = SearchSignals()
+        self.cancelled = False
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def run(self):
+        if self.cancelled:
+            return
+        # Own connection: sqlite3 connections are bound to the thread that opened them
+        db = EventDatabase(self.db_name, self.profile)
+        with self.lock:
+            self.conn = db.conn
+        try:
+            # Only the first page; the table model pulls the rest as it scrolls
+            events, cursor = fetch_search_page(db, self.user_id, self.query, self.page_size)
+        except sqlite3.Error as e:
+            # cancel() interrupts the query mid-flight; anything else is a real failure
+            if not self.cancelled:
+                self.signals.failed.emit(self.generation, self.query, str(e))
+            return
+        finally:
+            with self.lock:
+                self.conn = None
+                db.conn.close()
+        if not self.cancelled:
+            self.signals.finished.emit(self.generation, self.query, events, cursor)
+
+    def cancel(self):
+        self.cancelled = True
+        with self.lock:
+            if self.conn is not None:
+                self.conn.interrupt()
+
+class EventSearch(QObject):
+    # (query, first page of events, cursor for the next page or None)
+    results_ready = pyqtSignal(str, list, object)
+    # (query, error message) when a search fails other than by being cancelled
+    search_failed = pyqtSignal(str, str)
+
+    def __init__(self, db, parent=None, debounce_ms=SEARCH_DEBOUNCE_MS, page_size=SEARCH_PAGE_SIZE):
+        super().__init__(parent)
+        self.db = db
+        self.page_size = page_size
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self._start)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.user_id = None
+        self.pending_query = ""
+        self.generation = 0
+        self.active_task = None
+        self.last_query = None
+        self.last_results = None
+        self.last_cursor = None
+
+    def set_debounce(self, debounce_ms):
+        self.timer.setInterval(debounce_ms)
+
+    def submit(self, user_id, query):
+        if user_id != self.user_id:
+            self.invalidate()
+        self.user_id = user_id
+        self.pending_query = query
+        self.timer.start()  # restarts the window on every keystroke
+
+    def cancel(self):
+        self.timer.stop()
+        self.generation += 1
+        if self.active_task is not None:
+            self.active_task.cancel()
+            self.active_task = None
+
+    def invalidate(self):
+        # Cached results are stale once events are added, edited or removed
+        self.cancel()
+        self.last_query = None
+        self.last_results = None
+        self.last_cursor = None
+
+    def _start(self):
+        query = self.pending_query
+        self.cancel()
+        if self.last_results is not None and self.last_cursor is None and query.startswith(self.last_query):
+            # Extending the previous query can only narrow its results, as long as
+            # they were complete rather than a first page
+            self._deliver(self.generation, query, refine_events(self.last_results, query), None)
+            return
+        if self.db.db_name == ":memory:":
+            # A worker connection would open a separate, empty in-memory database
+            events, cursor = fetch_search_page(self.db, self.user_id, query, self.page_size)
+            self._deliver(self.generation, query, events, cursor)
+            return
+        task = SearchTask(self.db.db_name, self.db.profile, self.user_id, query, self.generation, self.page_size)
+        task.signals.finished.connect(self._deliver)
+        task.signals.failed.connect(self._fail)
+        self.active_task = task
+        self.pool.start(task)
+
+    def _deliver(self, generation, query, events, cursor):
+        if generation != self.generation:
+            return
+        self.active_task = None
+        self.last_query = query
+        self.last_results = events
+        self.last_cursor = cursor
+        self.results_ready.emit(query, events, cursor)
+
+    def _fail(self, generation, query, message):
+        if generation != self.generation:
+            return
+        self.active_task = None
+        self.search_failed.emit(query, message)
@@ -0,0 +1,24 @@
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+class JobSignals(QObject):
+    progress = pyqtSignal(str, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+class Job(QRunnable):
+    # Runs fn(*args, progress=..., **kwargs) on a QThreadPool thread. fn must not
+    # touch the UI thread's EventDatabase connection; results come back as signals.
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = JobSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, progress=self.signals.progress.emit, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(result)
@@ -23,7 +23,6 @@ def app(mock_db):
         app.fullscreen_btn = MagicMock()
         app.current_user_id = 1
         app.current_username = "test_user"
-        app.event_id_map = {}
         app.guest_id_map = {}
         app.task_id_map = {}
         app.is_fullscreen = False
@@ -76,14 +75,91 @@ def test_show_signup_dialog(app, mock_db):
         app.status_bar.showMessage.assert_not_called()  # Message shown via QMessageBox
 
 def test_load_events(app, mock_db):
-    mock_db.get_all_events.return_value = [
-        (1, 1, "Event 1", "2025-06-01", "12:00", "Venue", "Desc", 0)
-    ]
+    mock_db.get_all_events_page.return_value = (
+        [(1, 1, "Event 1", "2025-06-01", "12:00", "Venue", "Desc", 0)], None
+    )
     app.load_events()
 
-    mock_db.get_all_events.assert_called_with(1)
-    app.events_table.setRowCount.assert_called_with(1)
-    assert app.event_id_map == {0: 1}
+    mock_db.get_all_events_page.assert_called_with(1, page_size=200, cursor=None)
+    assert app.events_model.rowCount() == 1
+    assert app.events_model.event_id(0) == 1
+
+def test_highlight_calendar_queries_visible_month(app, mock_db):
+    app.calendar = MagicMock()
+    app.calendar.yearShown.return_value = 2025
+    app.calendar.monthShown.return_value = 2
+    app.view_toggle = MagicMock()
+    app.view_toggle.isChecked.return_value = False
+    mock_db.get_event_counts_by_date.return_value = {"2025-02-03": 1, "2025-02-10": 6}
+    app.highlight_calendar()
+
+    mock_db.get_event_counts_by_date.assert_called_with(1, "2025-02-01", "2025-02-28")
+    assert app.calendar_highlights == {"2025-02-03": 1, "2025-02-10": 4}
+    assert app.calendar.setDateTextFormat.call_count == 2
+
+def test_calendar_highlights_touch_only_changed_days(app):
+    app.calendar = MagicMock()
+    app.set_calendar_highlights({"2025-06-01": 1, "2025-06-02": 2})
+    app.calendar.setDateTextFormat.reset_mock()
+    app.set_calendar_highlights({"2025-06-01": 1, "2025-06-02": 3, "2025-06-05": 1})
+    assert app.calendar.setDateTextFormat.call_count == 2
+    app.calendar.setDateTextFormat.reset_mock()
+    app.set_calendar_highlights({})
+    assert app.calendar.setDateTextFormat.call_count == 3
+    assert app.calendar_highlights == {}
+
+def test_clearing_search_reloads_paged_events(app, mock_db):
+    app.event_search = MagicMock()
+    app.load_events = MagicMock()
+    app.search_events("")
+    app.load_events.assert_called_once_with()
+    app.event_search.submit.assert_not_called()
+
+def test_search_results_page_lazily(app, mock_db):
+    app.search_input.text.return_value = "party"
+    mock_db.search_events_page.return_value = ([(3, 1, "Party 3", "2025-06-03", None, "Venue", "Desc", 0)], None)
+    app.show_search_results("party", [(1, 1, "Party 1", "2025-06-01", None, "Venue", "Desc", 0)], "cursor-1")
+    assert app.events_model.rowCount() == 1
+    app.events_model.fetchMore()
+    mock_db.search_events_page.assert_called_once_with(1, "party", page_size=200, cursor="cursor-1")
+    assert app.events_model.rowCount() == 2
+
+@pytest.mark.parametrize("action", ["export_snapshot", "restore_snapshot"])
+def test_snapshots_need_a_single_account_planner(app, mock_db, action):
+    app.db = mock_db
+    mock_db.count_users.return_value = 2
+    with patch('event_planner.app.QMessageBox') as mock_box, \
+            patch('event_planner.app.QFileDialog') as mock_file_dialog, \
+            patch('event_planner.app.Job') as mock_job:
+        getattr(app, action)()
+    mock_box.warning.assert_called_once()
+    mock_file_dialog.getSaveFileName.assert_not_called()
+    mock_file_dialog.getOpenFileName.assert_not_called()
+    mock_job.assert_not_called()
+
+def test_search_errors_show_for_the_current_query(app):
+    app.search_input.text.return_value = "party"
+    app.show_search_error("par", "database is locked")
+    app.status_bar.showMessage.assert_not_called()
+    app.show_search_error("party", "database is locked")
+    app.status_bar.showMessage.assert_called_once_with("Search failed: database is locked", 5000)
+
+def test_guest_import_button_stays_disabled_while_importing(app):
+    app.import_guests_btn = MagicMock()
+    for name in ("edit_event_btn", "delete_event_btn", "add_guest_btn", "add_task_btn"):
+        setattr(app, name, MagicMock())
+    assert app.import_job is None
+    app.import_job = MagicMock()
+    app.toggle_event_buttons(True)
+    app.import_guests_btn.setEnabled.assert_called_with(False)
+    app.import_job = None
+    app.toggle_event_buttons(True)
+    app.import_guests_btn.setEnabled.assert_called_with(True)
+
+def test_model_reset_clears_selection_state(app, mock_db):
+    app.current_event_id = 5
+    app.events_model.set_rows([])
+    assert app.current_event_id is None
 
 def test_add_event(app, mock_db):
     with patch('event_planner.dialogs.EventDialog') as mock_event_dialog:
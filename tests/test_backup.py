@@ -0,0 +1,110 @@
+import json
+import threading
+import pytest
+import requests
+from unittest.mock import MagicMock, patch
+from event_planner.backup import BackupError, backup_user, recover_user
+from event_planner.backup_client import BackupCancelled
+from event_planner.database import EventDatabase
+
+def _without_timestamp(data):
+    return {key: value for key, value in data.items() if key != 'timestamp'}
+
+@pytest.fixture
+def db_file(tmp_path):
+    db_name = str(tmp_path / "events.db")
+    db = EventDatabase(db_name)
+    user_id = db.create_user("test_user", "password")
+    event_id = db.add_event(user_id, "Event 1", "2025-06-01", "12:00", "Venue", "Desc")
+    db.add_task(event_id, "Task 1")
+    db.add_guest(event_id, "Guest 1", "guest@example.com")
+    backup = db.get_backup_data(user_id)
+    db.conn.close()
+    return db_name, user_id, backup
+
+@pytest.fixture
+def client():
+    with patch('event_planner.backup.get_client') as get_client:
+        get_client.return_value.api_url = "https://example.com"
+        get_client.return_value.get_deltas.return_value = []
+        yield get_client.return_value
+
+def _http_error(status):
+    response = MagicMock()
+    response.status_code = status
+    return requests.exceptions.HTTPError(f"{status} Error", response=response)
+
+def test_backup_user_posts_backup_data(db_file, client):
+    db_name, user_id, backup = db_file
+    progress = []
+    progress_callback = lambda label, n: progress.append((label, n))
+    client.upload_backup.return_value = {"message": "ok"}
+    message = backup_user(db_name, user_id, "https://example.com", progress=progress_callback)
+    assert message == "ok"
+    data = client.upload_backup.call_args.args[0]
+    assert client.upload_backup.call_args.kwargs == {'progress': progress_callback, 'cancel': None}
+    assert data['seq'] == 0
+    assert {**data, 'seq': None, 'timestamp': None} == {**backup, 'seq': None, 'timestamp': None}
+    assert progress == [('records', 3)]
+
+def test_backup_user_cancelled_before_upload(db_file, client):
+    db_name, user_id, _ = db_file
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(BackupCancelled):
+        backup_user(db_name, user_id, "https://example.com", cancel=cancel)
+    client.upload_backup.assert_not_called()
+
+def test_backup_user_connection_error(db_file, client):
+    db_name, user_id, _ = db_file
+    client.upload_backup.side_effect = requests.exceptions.ConnectionError("down")
+    with pytest.raises(BackupError, match="Failed to connect to API"):
+        backup_user(db_name, user_id, "https://example.com")
+
+def test_recover_user_restores_downloaded_backup(db_file, client):
+    db_name, user_id, backup = db_file
+    db = EventDatabase(db_name)
+    db.add_event(user_id, "Added Later", "2025-07-01", "12:00", "Venue", "Desc")
+    db.conn.close()
+    body = json.dumps(backup).encode()
+    progress = []
+    client.iter_backup.return_value = (chunk for chunk in [body[:10], body[10:]])
+    assert recover_user(db_name, user_id, "https://example.com",
+                        progress=lambda label, n: progress.append((label, n))) == user_id
+    client.iter_backup.assert_called_with(user_id)
+    assert progress == [('bytes', 10), ('bytes', len(body))]
+    db = EventDatabase(db_name)
+    assert _without_timestamp(db.get_backup_data(user_id)) == _without_timestamp(backup)
+    db.conn.close()
+
+def test_recover_user_cancel_leaves_data_untouched(db_file, client):
+    db_name, user_id, backup = db_file
+    cancel = threading.Event()
+    body = json.dumps({**backup, 'events': []}).encode()
+    closed = []
+    def chunks_then_cancel():
+        try:
+            yield body[:10]
+            cancel.set()
+            yield body[10:]
+        finally:
+            closed.append(True)
+    client.iter_backup.return_value = chunks_then_cancel()
+    with pytest.raises(BackupCancelled):
+        recover_user(db_name, user_id, "https://example.com", cancel=cancel)
+    assert closed == [True]
+    db = EventDatabase(db_name)
+    assert _without_timestamp(db.get_backup_data(user_id)) == _without_timestamp(backup)
+    db.conn.close()
+
+def test_recover_user_missing_backup(db_file, client):
+    db_name, user_id, _ = db_file
+    client.iter_backup.side_effect = _http_error(404)
+    with pytest.raises(BackupError, match="No backup found for this user"):
+        recover_user(db_name, user_id, "https://example.com")
+
+def test_recover_user_invalid_payload(db_file, client):
+    db_name, user_id, backup = db_file
+    client.iter_backup.return_value = (chunk for chunk in [json.dumps({"user_id": user_id}).encode()])
+    with pytest.raises(BackupError, match="Invalid backup data"):
+        recover_user(db_name, user_id, "https://example.com")
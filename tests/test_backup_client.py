@@ -0,0 +1,193 @@
+import gzip
+import json
+import threading
+import time
+import pytest
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from event_planner.backup_client import BackupClient, get_client
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # Minimal stand-in for the backup API that records what actually went over the wire
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body=b'', headers=None):
+        self.send_response(status)
+        if self.server.advertise_gzip:
+            self.send_header('Accept-Encoding', 'gzip')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def record(self, body=b''):
+        self.server.requests.append({
+            'method': self.command, 'path': self.path, 'port': self.client_address[1],
+            'headers': dict(self.headers), 'body': body,
+        })
+        if self.server.failures:
+            self.reply(self.server.failures.pop(0), headers=self.server.failure_headers)
+            return False
+        return True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if not self.record(body):
+            return
+        if self.headers.get('Content-Encoding') == 'gzip':
+            if self.server.reject_gzip:
+                self.reply(self.server.reject_gzip)
+                return
+            body = gzip.decompress(body)
+        data = json.loads(body)
+        self.server.backups[data['user_id']] = data
+        self.reply(200, json.dumps({'message': 'Backup stored'}).encode(), {'Content-Type': 'application/json'})
+
+    def do_GET(self):
+        if not self.record():
+            return
+        data = self.server.backups.get(int(self.path.rsplit('/', 1)[-1]))
+        if data is None:
+            self.reply(404)
+            return
+        body = json.dumps(data).encode()
+        headers = {'Content-Type': 'application/json'}
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            headers['Content-Encoding'] = 'gzip'
+        self.server.sent.append(len(body))
+        self.reply(200, body, headers)
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.requests = []
+    server.backups = {}
+    server.sent = []
+    server.failures = []
+    server.failure_headers = {}
+    server.reject_gzip = None
+    server.advertise_gzip = False
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def client(server):
+    client = BackupClient(f"http://127.0.0.1:{server.server_address[1]}", timeout=5, backoff=0.01)
+    yield client
+    client.close()
+
+def _backup(events=200):
+    return {
+        'user_id': 1,
+        'user': {'id': 1, 'username': 'test_user', 'password_hash': 'x' * 64, 'email': None},
+        'events': [{'id': i, 'user_id': 1, 'name': f"Event {i}", 'date': '2025-06-01', 'time': '12:00',
+                    'venue': 'Venue', 'description': 'Description ' * 4, 'is_archived': False}
+                   for i in range(events)],
+        'archived_events': [], 'tasks': [], 'guests': [],
+    }
+
+def test_bodies_are_plain_unless_the_server_accepts_gzip(server, client):
+    data = _backup()
+    client.post_backup(data)
+    client.post_backup(data)
+    assert all('Content-Encoding' not in request['headers'] for request in server.requests)
+    assert client.compress is None
+    assert server.backups[1] == data
+
+def test_post_backup_sends_gzipped_body_once_advertised(server, client):
+    server.advertise_gzip = True
+    data = _backup()
+    assert client.post_backup(data) == {'message': 'Backup stored'}
+    assert 'Content-Encoding' not in server.requests[0]['headers']
+    assert client.compress is True
+    assert client.post_backup(data) == {'message': 'Backup stored'}
+    request = server.requests[1]
+    raw_size = len(json.dumps(data, separators=(',', ':')).encode())
+    assert request['headers']['Content-Encoding'] == 'gzip'
+    assert len(request['body']) < raw_size / 5
+    assert server.backups[1] == data
+
+def test_iter_backup_accepts_gzip_response(server, client):
+    data = _backup()
+    server.backups[1] = data
+    body = b''.join(client.iter_backup(1, chunk_size=1024))
+    assert json.loads(body) == data
+    assert 'gzip' in server.requests[0]['headers']['Accept-Encoding']
+    assert server.sent[0] < len(body) / 5
+
+def test_session_reuses_one_connection(server, client):
+    server.backups[1] = _backup(10)
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        client.post_backup(_backup(10))
+        b''.join(client.iter_backup(1))
+        timings.append(time.perf_counter() - start)
+    assert len(server.requests) == 10
+    assert len({request['port'] for request in server.requests}) == 1
+    assert max(timings) < 5
+
+def test_retries_transient_errors_with_backoff(server, client):
+    server.failures = [503, 502]
+    with patch('event_planner.backup_client.time.sleep') as sleep:
+        assert client.post_backup(_backup(1)) == {'message': 'Backup stored'}
+    assert len(server.requests) == 3
+    delays = [call.args[0] for call in sleep.call_args_list]
+    assert len(delays) == 2
+    assert 0 <= delays[0] <= 0.01 and 0 <= delays[1] <= 0.02
+
+def test_retry_after_header_is_honoured(server, client):
+    server.failures = [429]
+    server.failure_headers = {'Retry-After': '2'}
+    with patch('event_planner.backup_client.time.sleep') as sleep:
+        client.post_backup(_backup(1))
+    sleep.assert_called_once_with(2)
+
+def test_gives_up_after_retries(server, client):
+    server.failures = [503] * 10
+    with patch('event_planner.backup_client.time.sleep'):
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.post_backup(_backup(1))
+    assert len(server.requests) == client.retries + 1
+
+def test_client_errors_are_not_retried(server, client):
+    with pytest.raises(requests.exceptions.HTTPError) as e:
+        b''.join(client.iter_backup(42))
+    assert e.value.response.status_code == 404
+    assert len(server.requests) == 1
+
+def test_connection_errors_are_retried():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    port = server.server_address[1]
+    server.server_close()
+    client = BackupClient(f"http://127.0.0.1:{port}", retries=2)
+    with patch('event_planner.backup_client.time.sleep') as sleep:
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.post_backup(_backup(1))
+    assert sleep.call_count == 2
+    client.close()
+
+@pytest.mark.parametrize("status", [415, 400])
+def test_falls_back_to_uncompressed_body(server, client, status):
+    server.reject_gzip = status
+    client.compress = True
+    data = _backup(5)
+    assert client.post_backup(data) == {'message': 'Backup stored'}
+    assert 'Content-Encoding' not in server.requests[1]['headers']
+    assert not client.compress
+    client.post_backup(data)
+    assert len(server.requests) == 3
+
+def test_get_client_is_shared_per_api_url():
+    assert get_client("https://example.com/") is get_client("https://example.com")
+    assert get_client("https://example.com") is not get_client("https://example.org")
@@ -0,0 +1,268 @@
+import gzip
+import hashlib
+import json
+import threading
+import pytest
+import requests
+from unittest.mock import patch
+from event_planner.backup import UP_TO_DATE, backup_digest, backup_user, recover_user
+from event_planner.backup_client import BackupCancelled, BackupClient, get_client, split_chunks
+from event_planner.backup_server import BackupServer, BackupStore
+from event_planner.database import EventDatabase
+
+@pytest.fixture(params=["memory", "directory"])
+def server(request, tmp_path):
+    store = BackupStore(str(tmp_path / "store") if request.param == "directory" else None)
+    server = BackupServer(('127.0.0.1', 0), store)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def _without_timestamp(data):
+    return {key: value for key, value in data.items() if key != 'timestamp'}
+
+@pytest.fixture
+def client(server):
+    client = BackupClient(server.url, timeout=5, backoff=0.01)
+    yield client
+    client.close()
+
+def _backup(events=300):
+    return {
+        'user_id': 1,
+        'user': {'id': 1, 'username': 'test_user', 'password_hash': 'x' * 64, 'email': None},
+        'events': [{'id': i, 'user_id': 1, 'name': f"Event {i}", 'date': '2025-06-01', 'time': '12:00',
+                    'venue': f"Venue {i * 7919 % 1000}", 'description': hashlib.sha256(str(i).encode()).hexdigest(),
+                    'is_archived': False}
+                   for i in range(events)],
+        'archived_events': [], 'tasks': [], 'guests': [],
+    }
+
+def _recover(client, user_id):
+    return json.loads(b''.join(client.iter_backup(user_id)))
+
+def test_chunked_upload_round_trip(server, client):
+    data = _backup()
+    progress = []
+    result = client.upload_backup(data, progress=lambda label, n: progress.append((label, n)), chunk_size=4096)
+    assert result == {'message': 'Backup stored for user 1'}
+    assert client.chunked
+    chunks = len(split_chunks(json.dumps(data, separators=(',', ':'), sort_keys=True).encode(), 4096))
+    assert chunks > 5
+    assert progress[0] == ('chunks', 0) and progress[-1] == ('chunks', chunks)
+    assert _recover(client, 1) == data
+
+def test_upload_skips_chunks_the_server_has(server, client):
+    data = _backup()
+    client.upload_backup(data, chunk_size=4096)
+    data['events'][-1]['name'] = "Renamed"
+    with patch.object(client, 'send', wraps=client.send) as send:
+        client.upload_backup(data, chunk_size=4096)
+    puts = [call for call in send.call_args_list if call.args[0] == 'PUT']
+    assert len(puts) == 1
+    assert _recover(client, 1) == data
+
+def test_upload_resumes_after_failure(server, client):
+    data = _backup()
+    send = client.send
+    sent = []
+    def fail_third_chunk(method, path, body, content_type='application/json'):
+        if method == 'PUT':
+            sent.append(path)
+            if len(sent) == 3:
+                raise requests.exceptions.ConnectionError("dropped")
+        return send(method, path, body, content_type)
+    with patch.object(client, 'send', side_effect=fail_third_chunk):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.upload_backup(data, chunk_size=4096, workers=1)
+    assert _recover_status(client, 1) == 404
+    with patch.object(client, 'send', wraps=send) as retry:
+        client.upload_backup(data, chunk_size=4096, workers=1)
+    resent = [call.args[1] for call in retry.call_args_list if call.args[0] == 'PUT']
+    assert not set(sent[:2]) & set(resent)
+    assert _recover(client, 1) == data
+
+def _recover_status(client, user_id):
+    with pytest.raises(requests.exceptions.HTTPError) as e:
+        _recover(client, user_id)
+    return e.value.response.status_code
+
+def test_upload_cancel_stops_before_commit(server, client):
+    cancel = threading.Event()
+    def cancel_after_first(label, done):
+        if done:
+            cancel.set()
+    with pytest.raises(BackupCancelled):
+        client.upload_backup(_backup(), progress=cancel_after_first, cancel=cancel, chunk_size=4096, workers=1)
+    assert _recover_status(client, 1) == 404
+
+def test_server_rejects_corrupt_chunk(server, client):
+    digest = hashlib.sha256(b"expected").hexdigest()
+    with pytest.raises(requests.exceptions.HTTPError) as e:
+        client.send('PUT', f"/backup/chunks/{digest}", b"tampered", 'application/octet-stream')
+    assert e.value.response.status_code == 400
+
+def test_server_rejects_manifest_with_missing_chunks(server, client):
+    manifest = {'user_id': 1, 'size': 1, 'sha256': '0' * 64, 'chunks': ['1' * 64]}
+    with pytest.raises(requests.exceptions.HTTPError) as e:
+        client.send('POST', "/backup/1/manifest", json.dumps(manifest).encode())
+    assert e.value.response.status_code == 409
+    assert e.value.response.json()['missing'] == ['1' * 64]
+
+def test_server_rejects_backup_for_other_user(server, client):
+    data = _backup(5)
+    with pytest.raises(requests.exceptions.HTTPError) as e:
+        client.send('POST', "/backup/2/manifest", json.dumps(_manifest_for(client, data)).encode())
+    assert e.value.response.status_code == 400
+
+def _manifest_for(client, data):
+    body = json.dumps(data).encode()
+    client.send('PUT', f"/backup/chunks/{hashlib.sha256(body).hexdigest()}", body, 'application/octet-stream')
+    return {'user_id': 1, 'size': len(body), 'sha256': hashlib.sha256(body).hexdigest(),
+            'chunks': [hashlib.sha256(body).hexdigest()]}
+
+def test_single_post_backup_is_still_supported(server, client):
+    data = _backup(5)
+    assert client.post_backup(data) == {'message': 'Backup stored for user 1'}
+    assert _recover(client, 1) == data
+
+def test_falls_back_when_server_has_no_chunk_endpoints(server, client):
+    data = _backup(5)
+    missing = requests.Response()
+    missing.status_code = 404
+    send = client.send
+    def no_chunks(method, path, body, content_type='application/json'):
+        if path == '/backup/chunks/missing':
+            raise requests.exceptions.HTTPError("404", response=missing)
+        return send(method, path, body, content_type)
+    with patch.object(client, 'send', side_effect=no_chunks):
+        client.upload_backup(data)
+    assert client.chunked is False
+    assert _recover(client, 1) == data
+
+def test_backup_and_recover_jobs_against_reference_server(server, tmp_path):
+    db_name = str(tmp_path / "events.db")
+    db = EventDatabase(db_name)
+    user_id = db.create_user("test_user", "password")
+    event_id = db.add_event(user_id, "Event 1", "2025-06-01", "12:00", "Venue", "Desc")
+    db.add_task(event_id, "Task 1")
+    backup = db.get_backup_data(user_id)
+    db.conn.close()
+    assert backup_user(db_name, user_id, server.url) == f"Backup stored for user {user_id}"
+    db = EventDatabase(db_name)
+    db.delete_event(event_id)
+    db.conn.close()
+    assert recover_user(db_name, user_id, server.url) == user_id
+    db = EventDatabase(db_name)
+    assert _without_timestamp(db.get_backup_data(user_id)) == _without_timestamp(backup)
+    db.conn.close()
+
+def test_responses_are_gzipped(server, client):
+    data = _backup()
+    client.post_backup(data)
+    response = requests.get(f"{server.url}/recover/1", headers={'Accept-Encoding': 'gzip'}, stream=True)
+    raw = response.raw.read()
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(raw)) == data
+    response.close()
+
+def test_client_negotiates_gzip_bodies(server, client):
+    data = _backup()
+    client.post_backup(data)
+    assert client.compress is True
+    client.post_backup(data)
+    response = requests.get(f"{server.url}/recover/1")
+    assert response.headers['Accept-Encoding'] == 'gzip'
+    assert response.json() == data
+
+@pytest.fixture
+def db_file(tmp_path):
+    db_name = str(tmp_path / "events.db")
+    db = EventDatabase(db_name)
+    user_id = db.create_user("test_user", "password")
+    for i in range(20):
+        event_id = db.add_event(user_id, f"Event {i}", "2025-06-01", "12:00", "Venue", "Desc")
+        db.add_task(event_id, f"Task {i}")
+    db.conn.close()
+    return db_name, user_id
+
+def test_incremental_backup_sends_only_changes(server, db_file):
+    db_name, user_id = db_file
+    backup_user(db_name, user_id, server.url)
+    db = EventDatabase(db_name)
+    event_id = db.get_all_events(user_id)[0][0]
+    db.update_task_status(db.get_tasks_for_event(event_id)[0][0], True)
+    db.add_guest(event_id, "Guest 1", None)
+    db.conn.close()
+    progress = []
+    message = backup_user(db_name, user_id, server.url, progress=lambda label, n: progress.append((label, n)))
+    assert message == f"Changes stored for user {user_id}"
+    assert progress == [('changes', 2)]
+    deltas = server.store.get_deltas(user_id)
+    assert len(deltas) == 1
+    assert json.loads(deltas[0])['upserts']['guests'][0]['name'] == "Guest 1"
+    db = EventDatabase(db_name)
+    assert db.get_backup_state(user_id, server.url) == (db.get_change_seq(), 1, None)
+    assert db.conn.execute("SELECT COUNT(*) FROM changelog").fetchone()[0] == 0
+    expected = db.get_backup_data(user_id)
+    db.delete_event(event_id)
+    db.conn.close()
+    recover_user(db_name, user_id, server.url)
+    db = EventDatabase(db_name)
+    assert _without_timestamp(db.get_backup_data(user_id)) == _without_timestamp(expected)
+    assert db.get_backup_state(user_id, server.url) is None
+    db.conn.close()
+
+def test_full_checkpoint_after_interval(server, db_file):
+    db_name, user_id = db_file
+    with patch('event_planner.backup.FULL_BACKUP_INTERVAL', 2):
+        for i in range(4):
+            db = EventDatabase(db_name)
+            db.add_guest(db.get_all_events(user_id)[0][0], f"Guest {i}", None)
+            db.conn.close()
+            backup_user(db_name, user_id, server.url)
+            assert len(server.store.get_deltas(user_id)) == [0, 1, 2, 0][i]
+
+def test_delta_conflict_falls_back_to_full_backup(server, db_file):
+    db_name, user_id = db_file
+    backup_user(db_name, user_id, server.url)
+    # Another device replaced the backup, so this database's delta no longer applies
+    stored = json.loads(server.store.get_backup(user_id))
+    server.store.put_backup(user_id, json.dumps({**stored, 'seq': 999}).encode(), 999)
+    db = EventDatabase(db_name)
+    db.add_guest(db.get_all_events(user_id)[0][0], "Guest 1", None)
+    db.conn.close()
+    assert backup_user(db_name, user_id, server.url) == f"Backup stored for user {user_id}"
+    assert server.store.get_deltas(user_id) == []
+    assert json.loads(server.store.get_backup(user_id))['guests'][0]['name'] == "Guest 1"
+
+def test_unchanged_backup_is_skipped_without_network(server, db_file):
+    db_name, user_id = db_file
+    backup_user(db_name, user_id, server.url)
+    with patch('event_planner.backup_client.BackupClient.request') as request:
+        assert backup_user(db_name, user_id, server.url + "/") == UP_TO_DATE
+    request.assert_not_called()
+
+def test_reverted_changes_skip_full_backup(server, db_file):
+    db_name, user_id = db_file
+    get_client(server.url).deltas = False
+    backup_user(db_name, user_id, server.url)
+    db = EventDatabase(db_name)
+    event_id = db.get_all_events(user_id)[0][0]
+    db.add_guest(event_id, "Guest 1", None)
+    db.delete_guest(db.get_guests_for_event(event_id)[0][0])
+    db.conn.close()
+    with patch('event_planner.backup_client.BackupClient.upload_backup') as upload:
+        assert backup_user(db_name, user_id, server.url) == UP_TO_DATE
+    upload.assert_not_called()
+    db = EventDatabase(db_name)
+    assert db.is_backup_current(user_id, server.url)
+    db.conn.close()
+
+def test_backup_digest_ignores_timestamp_and_seq():
+    data = _backup(3)
+    digest = backup_digest(data)
+    assert backup_digest({**data, 'timestamp': "20250101_000000", 'seq': 5}) == digest
+    assert backup_digest({**data, 'events': data['events'][:2]}) != digest
@@ -0,0 +1,63 @@
+from event_planner.cache import QueryCache, estimate_size
+
+def test_get_counts_hits_and_misses():
+    cache = QueryCache(1024)
+    assert cache.get('a') is None
+    cache.put('a', (1, 'x'))
+    assert cache.get('a') == (1, 'x')
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+def test_least_recently_used_entry_is_evicted():
+    row = (1, 'x' * 100)
+    cache = QueryCache(estimate_size(row) * 2)
+    cache.put('a', row)
+    cache.put('b', row)
+    cache.get('a')
+    cache.put('c', row)
+    assert cache.get('b') is None
+    assert cache.get('a') == row and cache.get('c') == row
+    assert cache.evictions == 1
+    assert cache.size <= cache.max_bytes
+
+def test_entries_larger_than_the_cap_are_not_stored():
+    cache = QueryCache(100)
+    cache.put('a', [(i, 'row') for i in range(100)])
+    assert len(cache) == 0
+    assert cache.size == 0
+
+def test_invalidate_drops_every_entry_with_the_tag():
+    cache = QueryCache(4096)
+    cache.put('event', (1,), [('event', 1)])
+    cache.put('list', [(1,), (2,)], [('event', 1), ('event', 2)])
+    cache.put('other', [(3,)], [('event', 3)])
+    cache.invalidate(('event', 1))
+    assert cache.get('event') is None and cache.get('list') is None
+    assert cache.get('other') == [(3,)]
+    assert cache.keys_by_tag == {('event', 3): {'other'}}
+    assert cache.size == estimate_size([(3,)])
+
+def test_put_replaces_an_existing_entry():
+    cache = QueryCache(4096)
+    cache.put('a', (1,), [('event', 1)])
+    cache.put('a', (2,), [('event', 2)])
+    assert len(cache) == 1
+    assert cache.size == estimate_size((2,))
+    cache.invalidate(('event', 1))
+    assert cache.get('a') == (2,)
+
+def test_version_moves_on_every_invalidation():
+    cache = QueryCache(4096)
+    version = cache.version
+    cache.put('a', (1,), [('event', 1)])
+    assert cache.version == version
+    cache.invalidate(('event', 2))
+    assert cache.version == version + 1
+    cache.clear()
+    assert cache.version == version + 2
+    assert 'a' not in cache
+
+def test_dict_values_are_sized_by_their_contents():
+    small = {'rows': [(1, 'x')]}
+    large = {'rows': [(i, 'x' * 100) for i in range(100)]}
+    assert estimate_size(large) > estimate_size(small) > estimate_size({})
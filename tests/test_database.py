@@ -1,5 +1,10 @@
+import csv
+import gzip
+import json
+import sqlite3
 import pytest
-from event_planner.database import EventDatabase
+from event_planner.database import EventDatabase, encode_cursor
+from event_planner.migrations import MIGRATIONS, SCHEMA_VERSION, get_schema_version
 
 @pytest.fixture
 def db():
@@ -20,6 +25,7 @@ def test_create_user_duplicate(db):
     db.create_user("test_user", "password")
     user_id = db.create_user("test_user", "password2")
     assert user_id is None
+    assert db.count_users() == 1
 
 def test_authenticate_user(db):
     user_id = db.create_user("test_user", "password")
@@ -77,4 +83,876 @@ def test_archive_event(db):
     assert len(archived) == 1
     assert archived[0][2] == "Event 1"
     events = db.get_all_events(user_id)
-    assert len(events) == 0
\ No newline at end of file
+    assert len(events) == 0
+
+@pytest.mark.parametrize("call, index", [
+    (lambda db: db.get_all_events(1), "idx_events_user_archived_date"),
+    (lambda db: db.get_events_by_date(1, "2025-06-01"), "idx_events_user_archived_date"),
+    (lambda db: db.get_event_counts_by_date(1, "2025-06-01", "2025-06-30"), "idx_events_user_archived_date"),
+    (lambda db: db.get_archived_events(1), "idx_archived_events_user_date"),
+    (lambda db: db.get_tasks_for_event(1), "idx_tasks_event"),
+    (lambda db: db.get_guests_for_event(1), "idx_guests_event_name"),
+])
+def test_hot_queries_use_index(db, call, index):
+    # Explains the statement the method actually runs, with its parameters bound
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    call(db)
+    db.conn.set_trace_callback(None)
+    select = next(statement for statement in statements if "SELECT" in statement)
+    plan = _query_plan(db, select, ())
+    assert f"USING INDEX {index}" in plan or f"USING COVERING INDEX {index}" in plan
+    assert "TEMP B-TREE" not in plan
+
+def _create_legacy_database(path):
+    # Tables as created before schema versioning: no indexes, user_version 0
+    conn = sqlite3.connect(path)
+    for statement in MIGRATIONS[0]:
+        conn.execute(statement)
+    conn.execute("INSERT INTO users (username, password_hash) VALUES ('legacy', 'x')")
+    conn.commit()
+    conn.close()
+
+def test_indexes_added_to_existing_database(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    _create_legacy_database(path)
+    db = EventDatabase(path)
+    names = {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_events_user_archived_date", "idx_archived_events_user_date",
+            "idx_tasks_event", "idx_guests_event_name"} <= names
+    assert db.conn.execute("SELECT username FROM users").fetchall() == [("legacy",)]
+    db.conn.close()
+
+def test_migrations_set_user_version(db):
+    assert get_schema_version(db.conn) == SCHEMA_VERSION
+
+def test_warm_start_applies_nothing(tmp_path):
+    path = str(tmp_path / "events.db")
+    EventDatabase(path).conn.close()
+    db = EventDatabase(path)
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    assert db.create_tables() is False
+    assert statements == ["PRAGMA user_version"]
+    db.conn.close()
+
+def test_failed_migration_rolls_back(tmp_path, monkeypatch):
+    path = str(tmp_path / "events.db")
+    _create_legacy_database(path)
+    monkeypatch.setattr("event_planner.migrations.MIGRATIONS", MIGRATIONS + [["CREATE TABLE users (id)"]])
+    monkeypatch.setattr("event_planner.migrations.SCHEMA_VERSION", SCHEMA_VERSION + 1)
+    with pytest.raises(sqlite3.OperationalError):
+        EventDatabase(path)
+    conn = sqlite3.connect(path)
+    assert get_schema_version(conn) == 0
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index'").fetchone()[0] == 1
+    conn.close()
+
+def _pragma(db, name):
+    return db.conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+def _query_plan(db, sql, params):
+    return " ".join(row[3] for row in db.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+def test_default_profile_uses_wal(tmp_path):
+    db = EventDatabase(str(tmp_path / "events.db"))
+    assert db.profile == "balanced"
+    assert _pragma(db, "journal_mode") == "wal"
+    assert _pragma(db, "synchronous") == 1
+    assert _pragma(db, "busy_timeout") == 5000
+    db.conn.close()
+
+def test_profile_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("EVENT_PLANNER_DB_PROFILE", "durable")
+    db = EventDatabase(str(tmp_path / "events.db"))
+    assert db.profile == "durable"
+    assert _pragma(db, "journal_mode") == "delete"
+    assert _pragma(db, "synchronous") == 2
+    db.conn.close()
+
+def test_profile_argument_overrides_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("EVENT_PLANNER_DB_PROFILE", "durable")
+    db = EventDatabase(str(tmp_path / "events.db"), profile="throughput")
+    assert _pragma(db, "synchronous") == 0
+    assert _pragma(db, "cache_size") == -64000
+    db.conn.close()
+
+def test_unknown_profile_rejected():
+    with pytest.raises(ValueError):
+        EventDatabase(":memory:", profile="fast")
+
+def test_search_events_matches_substrings(db):
+    user_id = db.create_user("test_user", "password")
+    db.add_event(user_id, "Summer Party", "2025-06-01", "12:00", "Rooftop Bar", "Drinks")
+    db.add_event(user_id, "Board Meeting", "2025-06-02", "09:00", "Office", "Quarterly review")
+    assert [e[2] for e in db.search_events(user_id, "mmer")] == ["Summer Party"]
+    assert [e[2] for e in db.search_events(user_id, "ROOFTOP")] == ["Summer Party"]
+    assert [e[2] for e in db.search_events(user_id, "arterly rev")] == ["Board Meeting"]
+    assert [e[2] for e in db.search_events(user_id, "r")] == ["Summer Party", "Board Meeting"]
+    assert db.search_events(user_id, 'say "hi"') == []
+
+def test_search_events_scoped_to_user(db):
+    user_id = db.create_user("test_user", "password")
+    other_id = db.create_user("other_user", "password")
+    db.add_event(other_id, "Summer Party", "2025-06-01", "12:00", "Venue", "Desc")
+    assert db.search_events(user_id, "Summer") == []
+
+def test_search_index_follows_updates_and_deletes(db):
+    user_id = db.create_user("test_user", "password")
+    event_id = db.add_event(user_id, "Summer Party", "2025-06-01", "12:00", "Venue", "Desc")
+    db.update_event(event_id, "Winter Gala", "2025-12-01", "19:00", "Hall", "Formal")
+    assert db.search_events(user_id, "Summer") == []
+    assert [e[0] for e in db.search_events(user_id, "Gala")] == [event_id]
+    db.delete_event(event_id)
+    assert db.search_events(user_id, "Gala") == []
+
+def test_search_events_ranked(db):
+    user_id = db.create_user("test_user", "password")
+    db.add_event(user_id, "Lunch", "2025-06-01", "12:00", "Cafe", "Bring cake for the cake sale")
+    db.add_event(user_id, "Cake tasting", "2025-06-02", "12:00", "Bakery", "Cake cake cake")
+    assert [e[2] for e in db.search_events(user_id, "cake", ranked=True)] == ["Cake tasting", "Lunch"]
+
+def test_search_index_built_for_existing_events(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    _create_legacy_database(path)
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO events (user_id, name, date) VALUES (1, 'Legacy Picnic', '2025-06-01')")
+    conn.commit()
+    conn.close()
+    db = EventDatabase(path)
+    assert [e[2] for e in db.search_events(1, "Picnic")] == ["Legacy Picnic"]
+    db.conn.close()
+
+def test_search_query_drives_from_fts_index(db):
+    plan = db.conn.execute('''
+        EXPLAIN QUERY PLAN SELECT e.* FROM events_fts
+        CROSS JOIN events e ON e.id = events_fts.rowid
+        WHERE events_fts MATCH ? AND e.user_id = ? AND e.is_archived = 0
+    ''', ('"abc"', 1)).fetchall()
+    assert "events_fts VIRTUAL TABLE" in plan[0][3]
+
+def _collect_pages(fetch_page, page_size):
+    rows, cursor = fetch_page(page_size=page_size, cursor=None)
+    pages = [rows]
+    while cursor is not None:
+        rows, cursor = fetch_page(page_size=page_size, cursor=cursor)
+        pages.append(rows)
+    return pages
+
+def _add_mixed_events(db, user_id):
+    for i in range(23):
+        time = [None, "09:00", "18:00"][i % 3]
+        db.add_event(user_id, f"Event {i % 4}", f"2025-06-0{i % 5 + 1}", time, "Venue", "Shared text")
+
+def test_all_events_pages_match_full_query(db):
+    user_id = db.create_user("test_user", "password")
+    _add_mixed_events(db, user_id)
+    expected = db.conn.execute(
+        "SELECT * FROM events WHERE user_id = ? ORDER BY date, time, name, id", (user_id,)).fetchall()
+    pages = _collect_pages(lambda **kw: db.get_all_events_page(user_id, **kw), 4)
+    assert [len(page) for page in pages] == [4, 4, 4, 4, 4, 3]
+    assert [row for page in pages for row in page] == expected
+
+def test_events_by_date_and_search_pages(db):
+    user_id = db.create_user("test_user", "password")
+    _add_mixed_events(db, user_id)
+    by_date = _collect_pages(lambda **kw: db.get_events_by_date_page(user_id, "2025-06-02", **kw), 2)
+    assert [row for page in by_date for row in page] == db.conn.execute(
+        "SELECT * FROM events WHERE date = '2025-06-02' ORDER BY time, name, id").fetchall()
+    searched = _collect_pages(lambda **kw: db.search_events_page(user_id, "Shared", **kw), 5)
+    assert [row[0] for page in searched for row in page] == [
+        row[0] for row in db.conn.execute("SELECT * FROM events ORDER BY date, time, name, id")]
+
+def test_archived_events_pages_descend(db):
+    user_id = db.create_user("test_user", "password")
+    archived_dates = [(1, "2025-03-01"), (2, None), (3, "2025-01-01"), (4, "2025-01-01"), (5, "2025-03-01")]
+    db.conn.executemany('''
+        INSERT INTO archived_events (id, user_id, name, date, archived_date)
+        VALUES (?, ?, 'Event', '2025-06-01', ?)
+    ''', [(event_id, user_id, archived) for event_id, archived in archived_dates])
+    pages = _collect_pages(lambda **kw: db.get_archived_events_page(user_id, **kw), 2)
+    assert [row[0] for page in pages for row in page] == [5, 1, 4, 3, 2]
+
+def test_archived_pages_cross_into_null_dates(db):
+    user_id = db.create_user("test_user", "password")
+    db.conn.executemany('''
+        INSERT INTO archived_events (id, user_id, name, date, archived_date)
+        VALUES (?, ?, 'Event', '2025-06-01', ?)
+    ''', [(event_id, user_id, None if event_id % 3 == 0 else f"2025-01-{event_id % 5 + 1:02d}")
+          for event_id in range(1, 21)])
+    expected = db.conn.execute('''
+        SELECT id FROM archived_events WHERE user_id = ? ORDER BY archived_date DESC, id DESC
+    ''', (user_id,)).fetchall()
+    for page_size in (1, 3, 4, 7):
+        pages = _collect_pages(lambda **kw: db.get_archived_events_page(user_id, **kw), page_size)
+        assert [(row[0],) for page in pages for row in page] == expected
+        assert all(len(page) == page_size for page in pages[:-1])
+
+def test_archived_page_seeks_index(db):
+    user_id = db.create_user("test_user", "password")
+    cursor = encode_cursor(["2025-03-01", 5])
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    db.get_archived_events_page(user_id, page_size=3, cursor=cursor)
+    db.conn.set_trace_callback(None)
+    selects = [statement for statement in statements if "SELECT" in statement]
+    assert len(selects) == 2
+    plan = _query_plan(db, selects[0], ())
+    assert "idx_archived_events_user_date (user_id=? AND archived_date<?)" in plan
+    plan = _query_plan(db, selects[1], ())
+    assert "idx_archived_events_user_date (user_id=? AND archived_date=?)" in plan
+
+def test_event_page_seeks_index(db):
+    user_id = db.create_user("test_user", "password")
+    _add_mixed_events(db, user_id)
+    rows, cursor = db.get_all_events_page(user_id, page_size=3)
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    db.get_all_events_page(user_id, page_size=3, cursor=cursor)
+    db.conn.set_trace_callback(None)
+    select = next(statement for statement in statements if "SELECT" in statement)
+    plan = _query_plan(db, select, ())
+    assert "idx_events_user_archived_date (user_id=? AND is_archived=? AND date>?)" in plan
+    assert "TEMP B-TREE" not in plan
+    assert "OFFSET" not in select
+
+def test_guest_and_task_pages(db):
+    user_id = db.create_user("test_user", "password")
+    event_id = db.add_event(user_id, "Event 1", "2025-06-01", "12:00", "Venue", "Desc")
+    for name in ["Carol", "alice", "Bob", "Alice", "Bob"]:
+        db.add_guest(event_id, name, None)
+    for i in range(7):
+        db.add_task(event_id, f"Task {i}")
+    guests = _collect_pages(lambda **kw: db.get_guests_for_event_page(event_id, **kw), 2)
+    assert [row for page in guests for row in page] == db.get_guests_for_event(event_id)
+    tasks = _collect_pages(lambda **kw: db.get_tasks_for_event_page(event_id, **kw), 3)
+    assert [len(page) for page in tasks] == [3, 3, 1]
+    assert [row for page in tasks for row in page] == db.get_tasks_for_event(event_id)
+
+def test_iter_pages_streams_every_row(db):
+    user_id = db.create_user("test_user", "password")
+    _add_mixed_events(db, user_id)
+    calls = []
+    def fetch_page(**kw):
+        calls.append(kw)
+        return db.get_all_events_page(user_id, **kw)
+    rows = list(db.iter_pages(fetch_page, page_size=10))
+    assert len(rows) == 23
+    assert len(calls) == 3
+
+def test_invalid_cursor_rejected(db):
+    user_id = db.create_user("test_user", "password")
+    with pytest.raises(ValueError):
+        db.get_all_events_page(user_id, cursor="not-a-cursor")
+    with pytest.raises(ValueError):
+        db.get_tasks_for_event_page(1, cursor=encode_cursor([1, 2]))
+    with pytest.raises(ValueError):
+        db.get_all_events_page(user_id, page_size=0)
+
+def _seed_export_data(db):
+    user_id = db.create_user("test_user", "password")
+    other_id = db.create_user("other_user", "password")
+    event_id = db.add_event(user_id, "Event 1", "2025-06-01", "12:00", "Venue", "Desc, with comma")
+    db.add_event(other_id, "Other", "2025-06-01", "12:00", "Venue", "Desc")
+    db.add_task(event_id, "Task 1")
+    db.add_guest(event_id, "Guest 1", "guest@example.com")
+    db.add_guest(event_id, "Guest 2", None)
+    return user_id, event_id
+
+def test_export_to_csv_streams_all_tables(db, tmp_path):
+    user_id, event_id = _seed_export_data(db)
+    progress = []
+    total = db.export_to_csv(user_id, str(tmp_path / "out"), progress=lambda t, n: progress.append((t, n)),
+                             batch_size=1)
+    assert total == 4
+    with open(tmp_path / "out_events.csv", newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows == [
+        ['ID', 'User ID', 'Name', 'Date', 'Time', 'Venue', 'Description', 'Is Archived'],
+        [str(event_id), str(user_id), 'Event 1', '2025-06-01', '12:00', 'Venue', 'Desc, with comma', '0'],
+    ]
+    with open(tmp_path / "out_guests.csv", newline='') as f:
+        assert len(list(csv.reader(f))) == 3
+    assert (tmp_path / "out_archived.csv").exists()
+    assert progress == [("events", 1), ("tasks", 1), ("guests", 1), ("guests", 2)]
+
+def test_export_to_csv_gzip(db, tmp_path):
+    user_id, _ = _seed_export_data(db)
+    db.export_to_csv(user_id, str(tmp_path / "out"), compress=True)
+    with gzip.open(tmp_path / "out_tasks.csv.gz", 'rt', newline='') as f:
+        assert list(csv.reader(f))[1][2] == "Task 1"
+    assert not (tmp_path / "out_tasks.csv").exists()
+
+def test_export_to_json_matches_json_dump(db, tmp_path):
+    user_id, event_id = _seed_export_data(db)
+    db.export_to_json(user_id, str(tmp_path / "out"))
+    expected = {
+        'events': [{'id': event_id, 'user_id': user_id, 'name': 'Event 1', 'date': '2025-06-01',
+                    'time': '12:00', 'venue': 'Venue', 'description': 'Desc, with comma',
+                    'is_archived': False}],
+        'archived_events': [],
+        'tasks': [{'id': 1, 'event_id': event_id, 'description': 'Task 1', 'is_completed': False}],
+        'guests': [{'id': 1, 'event_id': event_id, 'name': 'Guest 1', 'email': 'guest@example.com'},
+                   {'id': 2, 'event_id': event_id, 'name': 'Guest 2', 'email': None}],
+    }
+    assert (tmp_path / "out.json").read_text() == json.dumps(expected, indent=4)
+
+def test_export_to_json_compact(db, tmp_path):
+    user_id, _ = _seed_export_data(db)
+    db.export_to_json(user_id, str(tmp_path / "pretty"))
+    db.export_to_json(user_id, str(tmp_path / "compact"), compact=True)
+    compact = (tmp_path / "compact.json").read_text()
+    assert "\n" not in compact
+    assert json.loads(compact) == json.loads((tmp_path / "pretty.json").read_text())
+
+def test_export_to_ndjson(db, tmp_path):
+    user_id, event_id = _seed_export_data(db)
+    db.export_to_ndjson(user_id, str(tmp_path / "out"))
+    lines = [json.loads(line) for line in (tmp_path / "out.ndjson").read_text().splitlines()]
+    assert [line['type'] for line in lines] == ['events', 'tasks', 'guests', 'guests']
+    assert lines[1]['data'] == {'id': 1, 'event_id': event_id, 'description': 'Task 1', 'is_completed': False}
+
+def test_backup_data_uses_export_records(db):
+    user_id, event_id = _seed_export_data(db)
+    data = db.get_backup_data(user_id)
+    assert data['user']['username'] == "test_user"
+    assert [event['id'] for event in data['events']] == [event_id]
+    assert len(data['guests']) == 2
+    assert data['archived_events'] == []
+
+def test_add_events_bulk_returns_ids(db):
+    user_id = db.create_user("test_user", "password")
+    first = db.add_event(user_id, "Existing", "2025-06-01", "12:00", "Venue", "Desc")
+    ids = db.add_events_bulk(user_id, (
+        (f"Event {i}", "2025-06-02", "12:00", "Venue", "Desc") for i in range(5)
+    ), batch_size=2)
+    assert ids == list(range(first + 1, first + 6))
+    assert [db.get_event_by_id(event_id)[2] for event_id in ids] == [f"Event {i}" for i in range(5)]
+    assert [e[0] for e in db.search_events(user_id, "Event 3")] == [ids[3]]
+
+def test_add_tasks_and_guests_bulk(db):
+    user_id = db.create_user("test_user", "password")
+    event_id = db.add_event(user_id, "Event 1", "2025-06-01", "12:00", "Venue", "Desc")
+    task_ids = db.add_tasks_bulk(event_id, ["Task 1", "Task 2"])
+    guest_ids = db.add_guests_bulk(event_id, [("Guest 1", "g1@example.com"), ("Guest 2", None)])
+    assert [task[0] for task in db.get_tasks_for_event(event_id)] == task_ids
+    assert [guest[0] for guest in db.get_guests_for_event(event_id)] == guest_ids
+    assert db.add_guests_bulk(event_id, []) == []
+
+def test_bulk_insert_is_atomic(db):
+    user_id = db.create_user("test_user", "password")
+    event_id = db.add_event(user_id, "Event 1", "2025-06-01", "12:00", "Venue", "Desc")
+    with pytest.raises(sqlite3.IntegrityError):
+        db.add_guests_bulk(event_id, [("Guest 1", None), (None, None)], batch_size=1)
+    assert db.get_guests_for_event(event_id) == []
+    assert not db.conn.in_transaction
+
+def test_bulk_insert_commits_once(db):
+    user_id = db.create_user("test_user", "password")
+    event_id = db.add_event(user_id, "Event 1", "2025-06-01", "12:00", "Venue", "Desc")
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    db.add_guests_bulk(event_id, ((f"Guest {i}", None) for i in range(2500)), batch_size=1000)
+    db.conn.set_trace_callback(None)
+    assert statements.count("COMMIT") == 1
+
+@pytest.mark.parametrize("vacuum", [False, True])
+def test_snapshot_round_trip(tmp_path, vacuum):
+    source = EventDatabase(str(tmp_path / "source.db"))
+    user_id, event_id = _seed_export_data(source)
+    snapshot = str(tmp_path / "planner.snapshot")
+    progress = []
+    source.export_snapshot(snapshot, vacuum=vacuum, pages_per_step=1,
+                           progress=lambda label, pages: progress.append(pages))
+    assert not (tmp_path / "planner.snapshot.partial").exists()
+    assert vacuum or (progress and progress == sorted(progress))
+    target = EventDatabase(str(tmp_path / "target.db"))
+    target.create_user("someone", "password")
+    target.restore_snapshot(snapshot, pages_per_step=2)
+    assert target.get_user_by_id(user_id)["username"] == "test_user"
+    assert target.get_guests_for_event(event_id) == source.get_guests_for_event(event_id)
+    assert [e[0] for e in target.search_events(user_id, "comma")] == [event_id]
+    assert _pragma(target, "journal_mode") == "wal"
+    source.conn.close()
+    target.conn.close()
+
+def test_restore_snapshot_migrates_older_schema(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    _create_legacy_database(path)
+    db = EventDatabase(":memory:")
+    db.restore_snapshot(path)
+    assert get_schema_version(db.conn) == SCHEMA_VERSION
+    assert db.authenticate_user("legacy", "x") is None
+    assert db.conn.execute("SELECT username FROM users").fetchall() == [("legacy",)]
+
+def test_restore_snapshot_rejects_other_files(db, tmp_path):
+    junk = tmp_path / "junk.db"
+    junk.write_bytes(b"not a database" * 100)
+    with pytest.raises(ValueError):
+        db.restore_snapshot(str(junk))
+    other = sqlite3.connect(str(tmp_path / "other.db"))
+    other.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY)")
+    other.close()
+    with pytest.raises(ValueError):
+        db.restore_snapshot(str(tmp_path / "other.db"))
+
+def _write_during(db, marker, write):
+    # Runs write() once, from another connection, when db starts a statement containing marker
+    def trace(statement):
+        if marker in statement and not done:
+            done.append(statement)
+            write()
+    done = []
+    db.conn.set_trace_callback(trace)
+    return done
+
+def test_backup_data_is_one_snapshot(tmp_path):
+    path = str(tmp_path / "events.db")
+    db, other = EventDatabase(path), EventDatabase(path)
+    user_id, event_id = _seed_export_data(db)
+    db.track_backups(user_id, "https://example.com")
+
+    def write():
+        new_event = other.add_event(user_id, "Added", "2025-07-01", "12:00", "Venue", "Desc")
+        other.add_task(new_event, "Added task")
+    done = _write_during(db, "FROM tasks t", write)
+    data = db.get_backup_data(user_id, include_seq=True)
+    db.conn.set_trace_callback(None)
+    assert done
+    assert [event['name'] for event in data['events']] == ["Event 1"]
+    assert [task['event_id'] for task in data['tasks']] == [event_id]
+    assert data['seq'] < db.get_change_seq()
+    assert not db.conn.in_transaction
+    restored = EventDatabase(":memory:")
+    restored.restore_backup_data(data)
+    restored.conn.close()
+    db.conn.close()
+    other.conn.close()
+
+def test_backup_delta_is_one_snapshot(tmp_path):
+    path = str(tmp_path / "events.db")
+    db, other = EventDatabase(path), EventDatabase(path)
+    user_id, event_id = _seed_export_data(db)
+    db.track_backups(user_id, "https://example.com")
+    full = db.get_backup_data(user_id, include_seq=True)
+    guest_id, = db.add_guests_bulk(event_id, [("Guest 3", None)])
+    # Deleted after the changelog scan found the new guest but before its row is read
+    done = _write_during(db, "FROM guests g", lambda: other.delete_guest(guest_id))
+    delta = db.get_backup_delta(user_id, full['seq'])
+    db.conn.set_trace_callback(None)
+    assert done
+    assert [guest['name'] for guest in delta['upserts']['guests']] == ["Guest 3"]
+    assert delta['deletes']['guests'] == []
+    assert delta['seq'] == full['seq'] + 1 < db.get_change_seq()
+    assert not db.conn.in_transaction
+    restored = EventDatabase(":memory:")
+    restored.restore_backup_data(full, [delta])
+    restored.conn.close()
+    db.conn.close()
+    other.conn.close()
+
+def test_restore_backup_round_trip(db):
+    user_id, event_id = _seed_export_data(db)
+    backup = db.get_backup_data(user_id)
+    db.add_event(user_id, "Added Later", "2025-07-01", "12:00", "Venue", "Desc")
+    db.add_guest(event_id, "Guest 3", None)
+    db.restore_backup_data(backup)
+    assert db.get_backup_data(user_id)['events'] == backup['events']
+    assert [g[2] for g in db.get_guests_for_event(event_id)] == ["Guest 1", "Guest 2"]
+    assert [e[2] for e in db.search_events(user_id, "Later")] == []
+    assert db.conn.execute("SELECT name FROM sqlite_temp_master").fetchall() == []
+
+def test_restore_backup_into_empty_database(db):
+    user_id, event_id = _seed_export_data(db)
+    backup = json.loads(json.dumps(db.get_backup_data(user_id)))
+    other = EventDatabase(":memory:")
+    other.restore_backup_data(backup)
+    assert other.authenticate_user("test_user", "password") == user_id
+    assert len(other.get_tasks_for_event(event_id)) == 1
+    other.conn.close()
+
+@pytest.mark.parametrize("corrupt", [
+    lambda backup: backup['tasks'].append(
+        {'id': 50, 'event_id': 999, 'description': 'Orphan', 'is_completed': False}),
+    lambda backup: backup['guests'].append({'id': 50, 'event_id': backup['events'][0]['id'], 'name': None,
+                                            'email': None}),
+    lambda backup: backup['events'].append(dict(backup['events'][0])),
+    lambda backup: backup['events'][0].pop('name'),
+    lambda backup: backup['events'][0].update(user_id=2),
+    lambda backup: backup['events'].append({**backup['events'][0], 'id': 2}),
+    lambda backup: backup.pop('guests'),
+])
+def test_restore_backup_rejects_invalid_payload(db, corrupt):
+    user_id, event_id = _seed_export_data(db)
+    backup = db.get_backup_data(user_id)
+    db.add_event(user_id, "Still Here", "2025-07-01", "12:00", "Venue", "Desc")
+    corrupt(backup)
+    with pytest.raises(ValueError):
+        db.restore_backup_data(backup)
+    assert [e[2] for e in db.search_events(user_id, "Still Here")] == ["Still Here"]
+    assert not db.conn.in_transaction
+
+def test_changelog_only_tracks_users_with_backups(db):
+    user_id, event_id = _seed_export_data(db)
+    assert db.conn.execute("SELECT COUNT(*) FROM changelog").fetchone()[0] == 0
+    assert db.track_backups(user_id, "https://example.com") == (None, 0, None)
+    db.add_task(event_id, "Task 2")
+    other_event = db.conn.execute("SELECT id FROM events WHERE user_id != ?", (user_id,)).fetchone()[0]
+    db.add_task(other_event, "Other task")
+    assert db.conn.execute("SELECT table_name, user_id FROM changelog").fetchall() == [('tasks', user_id)]
+
+def test_backup_delta_reports_upserts_and_deletes(db):
+    user_id, event_id = _seed_export_data(db)
+    db.track_backups(user_id, "https://example.com")
+    seq = db.get_change_seq()
+    db.acknowledge_backup(user_id, "https://example.com", seq, full=True)
+    task_id = db.get_tasks_for_event(event_id)[0][0]
+    db.update_task_status(task_id, True)
+    guest_ids = sorted(g[0] for g in db.get_guests_for_event(event_id))
+    db.delete_guest(guest_ids[0])
+    second_id = db.add_event(user_id, "Event 2", "2025-07-01", "12:00", "Venue", "Desc")
+    db.archive_event(event_id)
+    delta = db.get_backup_delta(user_id, seq)
+    assert delta['base_seq'] == seq and delta['seq'] == db.get_change_seq()
+    assert [e['id'] for e in delta['upserts']['events']] == [second_id]
+    assert [e['id'] for e in delta['upserts']['archived_events']] == [event_id]
+    assert delta['upserts']['tasks'] == [] and delta['upserts']['guests'] == []
+    # Archiving moves the event and drops its remaining task and guest
+    assert delta['deletes'] == {'events': [event_id], 'archived_events': [], 'tasks': [task_id], 'guests': guest_ids}
+
+def test_acknowledge_backup_prunes_changelog(db):
+    user_id, event_id = _seed_export_data(db)
+    db.track_backups(user_id, "https://example.com")
+    db.add_task(event_id, "Task 2")
+    seq = db.get_change_seq()
+    db.add_task(event_id, "Task 3")
+    db.acknowledge_backup(user_id, "https://example.com", seq, full=False)
+    assert db.get_backup_state(user_id, "https://example.com") == (seq, 1, None)
+    assert [row[0] for row in db.conn.execute("SELECT seq FROM changelog")] == [seq + 1]
+    db.acknowledge_backup(user_id, "https://example.com", seq + 1, full=True)
+    assert db.conn.execute("SELECT COUNT(*) FROM changelog").fetchone()[0] == 0
+    assert db.get_change_seq() == seq + 1
+
+def test_restore_backup_replays_deltas(db):
+    user_id, event_id = _seed_export_data(db)
+    db.track_backups(user_id, "https://example.com")
+    full = {**db.get_backup_data(user_id), 'seq': db.get_change_seq()}
+    db.add_guest(event_id, "Guest 3", None)
+    first = db.get_backup_delta(user_id, full['seq'])
+    db.update_event(event_id, "Renamed", "2025-06-02", "13:00", "Venue", "Desc")
+    db.delete_guest(db.get_guests_for_event(event_id)[0][0])
+    second = db.get_backup_delta(user_id, first['seq'])
+    expected = db.get_backup_data(user_id)
+    db.delete_event(event_id)
+    db.restore_backup_data(full, [first, second])
+    assert {**db.get_backup_data(user_id), 'timestamp': None} == {**expected, 'timestamp': None}
+
+def test_restore_backup_rejects_delta_chain_gap(db):
+    user_id, event_id = _seed_export_data(db)
+    db.track_backups(user_id, "https://example.com")
+    full = {**db.get_backup_data(user_id), 'seq': db.get_change_seq()}
+    db.add_guest(event_id, "Guest 3", None)
+    first = db.get_backup_delta(user_id, full['seq'])
+    db.add_guest(event_id, "Guest 4", None)
+    second = db.get_backup_delta(user_id, first['seq'])
+    with pytest.raises(ValueError, match="do not follow"):
+        db.restore_backup_data(full, [second])
+    with pytest.raises(ValueError, match="do not follow"):
+        db.restore_backup_data({**full, 'seq': None}, [first])
+    assert len(db.get_guests_for_event(event_id)) == 4
+
+def test_is_backup_current(db):
+    user_id, event_id = _seed_export_data(db)
+    assert not db.is_backup_current(user_id, "https://example.com")
+    db.track_backups(user_id, "https://example.com")
+    db.acknowledge_backup(user_id, "https://example.com", db.get_change_seq(), full=True, digest="abc")
+    assert db.is_backup_current(user_id, "https://example.com")
+    assert not db.is_backup_current(user_id, "https://example.org")
+    db.update_user(user_id, email="new@example.com")
+    assert not db.is_backup_current(user_id, "https://example.com")
+    db.acknowledge_backup(user_id, "https://example.com", db.get_change_seq(), full=True, digest="abc")
+    db.add_guest(event_id, "Guest 3", None)
+    assert not db.is_backup_current(user_id, "https://example.com")
+
+def test_task_counters_follow_task_writes(db):
+    user_id = db.create_user("test_user", "password")
+    event_id = db.add_event(user_id, "Event 1", "2025-06-01", "12:00", "Venue", "Desc")
+    assert db.get_task_counts(event_id) == (0, 0)
+    db.add_task(event_id, "Task 1")
+    db.add_task(event_id, "Task 2")
+    db.add_tasks_bulk(event_id, ["Task 3"])
+    first, second = [task[0] for task in db.get_tasks_for_event(event_id)][:2]
+    assert db.get_task_counts(event_id) == (3, 0)
+    db.update_task_status(first, True)
+    db.update_task_status(first, True)
+    db.update_task_status(second, True)
+    assert db.get_task_counts(event_id) == (3, 2)
+    db.delete_task(first)
+    assert db.get_task_counts(event_id) == (2, 1)
+    assert db.get_task_counts(999) is None
+
+def test_archive_event_uses_task_counters(db):
+    user_id = db.create_user("test_user", "password")
+    event_id = db.add_event(user_id, "Event 1", "2025-06-01", "12:00", "Venue", "Desc")
+    db.add_task(event_id, "Task 1")
+    assert not db.archive_event(event_id)
+    db.update_task_status(db.get_tasks_for_event(event_id)[0][0], True)
+    assert db.archive_event(event_id)
+    assert db.get_archived_events(user_id)[0][0] == event_id
+    assert not db.archive_event(event_id)
+
+def test_task_counters_survive_restore(db):
+    user_id, event_id = _seed_export_data(db)
+    db.track_backups(user_id, "https://example.com")
+    full = {**db.get_backup_data(user_id), 'seq': db.get_change_seq()}
+    db.add_task(event_id, "Task 2")
+    db.update_task_status(db.get_tasks_for_event(event_id)[-1][0], True)
+    delta = db.get_backup_delta(user_id, full['seq'])
+    db.delete_event(event_id)
+    db.restore_backup_data(full, [delta])
+    assert db.get_task_counts(event_id) == (2, 1)
+
+def test_task_counter_updates_are_not_logged(db):
+    user_id, event_id = _seed_export_data(db)
+    db.track_backups(user_id, "https://example.com")
+    db.update_task_status(db.get_tasks_for_event(event_id)[0][0], True)
+    assert db.conn.execute("SELECT table_name FROM changelog").fetchall() == [('tasks',)]
+
+def test_task_counters_backfilled_on_migration(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    _create_legacy_database(path)
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO events (id, user_id, name, date) VALUES (1, 1, 'Legacy', '2025-06-01')")
+    conn.executemany("INSERT INTO tasks (event_id, description, is_completed) VALUES (1, ?, ?)",
+                     [("Done", 1), ("Open", 0), ("Done too", 1)])
+    conn.commit()
+    conn.close()
+    db = EventDatabase(path)
+    assert db.get_task_counts(1) == (3, 2)
+    db.conn.close()
+
+def test_get_event_detail(db):
+    user_id, event_id = _seed_export_data(db)
+    db.update_task_status(db.get_tasks_for_event(event_id)[0][0], True)
+    detail = db.get_event_detail(event_id, user_id)
+    assert detail['event'] == tuple(db.get_event_by_id(event_id))[:8]
+    assert detail['guests'] == db.get_guests_for_event(event_id)
+    assert detail['tasks'] == db.get_tasks_for_event(event_id)
+    assert detail['task_counts'] == (1, 1)
+    assert not db.conn.in_transaction
+
+def test_get_event_detail_is_scoped_to_user(db):
+    user_id, event_id = _seed_export_data(db)
+    other_id = db.conn.execute("SELECT id FROM users WHERE id != ?", (user_id,)).fetchone()[0]
+    assert db.get_event_detail(event_id, other_id) is None
+    assert db.get_event_detail(999, user_id) is None
+    assert not db.conn.in_transaction
+
+def test_get_event_detail_reads_one_snapshot(tmp_path):
+    path = str(tmp_path / "events.db")
+    db = EventDatabase(path)
+    user_id, event_id = _seed_export_data(db)
+    writer = EventDatabase(path)
+    queries = []
+    def add_guest_between_reads(statement):
+        queries.append(statement)
+        if len(queries) == 3:
+            writer.add_guest(event_id, "Late Guest", None)
+    db.conn.set_trace_callback(add_guest_between_reads)
+    detail = db.get_event_detail(event_id, user_id)
+    db.conn.set_trace_callback(None)
+    assert [guest[2] for guest in detail['guests']] == ["Guest 1", "Guest 2"]
+    assert len(db.get_guests_for_event(event_id)) == 3
+    writer.conn.close()
+    db.conn.close()
+
+@pytest.fixture
+def cached_db():
+    db = EventDatabase(":memory:", cache_size=1024 * 1024)
+    yield db
+    db.conn.close()
+
+def _count_selects(db):
+    selects = []
+    db.conn.set_trace_callback(lambda statement: selects.append(statement)
+                               if statement.lstrip().startswith('SELECT') else None)
+    return selects
+
+def test_cache_is_off_by_default(db):
+    assert db.cache is None
+    db.clear_cache()
+
+def test_cached_reads_skip_the_database(cached_db):
+    user_id, event_id = _seed_export_data(cached_db)
+    first = (cached_db.get_event_by_id(event_id), cached_db.get_all_events(user_id),
+             cached_db.get_tasks_for_event(event_id), cached_db.get_guests_for_event(event_id))
+    selects = _count_selects(cached_db)
+    second = (cached_db.get_event_by_id(event_id), cached_db.get_all_events(user_id),
+              cached_db.get_tasks_for_event(event_id), cached_db.get_guests_for_event(event_id))
+    assert second == first
+    assert selects == []
+    assert cached_db.cache.hits == 4
+    assert cached_db.cache.misses == 4
+
+def test_cached_lists_are_copies(cached_db):
+    user_id, event_id = _seed_export_data(cached_db)
+    cached_db.get_guests_for_event(event_id).clear()
+    assert len(cached_db.get_guests_for_event(event_id)) == 2
+
+def test_event_writes_invalidate_the_cache(cached_db):
+    user_id, event_id = _seed_export_data(cached_db)
+    cached_db.get_all_events(user_id)
+    cached_db.update_event(event_id, "Renamed", "2025-06-01", "12:00", "Venue", "Desc")
+    assert cached_db.get_event_by_id(event_id)[2] == "Renamed"
+    assert [event[2] for event in cached_db.get_all_events(user_id)] == ["Renamed"]
+    other_id = cached_db.add_event(user_id, "Other", "2025-07-01", "12:00", "Venue", "Desc")
+    assert len(cached_db.get_all_events(user_id)) == 2
+    cached_db.delete_event(other_id)
+    assert cached_db.get_event_by_id(other_id) is None
+    assert len(cached_db.get_all_events(user_id)) == 1
+    cached_db.add_events_bulk(user_id, [("Bulk", "2025-08-01", "12:00", "Venue", "Desc")])
+    assert len(cached_db.get_all_events(user_id)) == 2
+
+def test_task_writes_invalidate_tasks_and_counters(cached_db):
+    user_id, event_id = _seed_export_data(cached_db)
+    task_id = cached_db.get_tasks_for_event(event_id)[0][0]
+    cached_db.get_all_events(user_id)
+    cached_db.update_task_status(task_id, False)
+    assert cached_db.get_tasks_for_event(event_id)[0][3] == 0
+    assert cached_db.get_event_by_id(event_id) == cached_db.get_all_events(user_id)[0]
+    total = cached_db.get_event_by_id(event_id)[-2]
+    cached_db.add_task(event_id, "New task")
+    assert len(cached_db.get_tasks_for_event(event_id)) == total + 1
+    assert cached_db.get_event_by_id(event_id)[-2] == total + 1
+    cached_db.delete_task(task_id)
+    assert task_id not in [task[0] for task in cached_db.get_tasks_for_event(event_id)]
+    cached_db.add_tasks_bulk(event_id, ["Bulk task"])
+    assert cached_db.get_event_by_id(event_id)[-2] == total + 1
+
+def test_guest_writes_invalidate_the_cache(cached_db):
+    user_id, event_id = _seed_export_data(cached_db)
+    guest_id = cached_db.get_guests_for_event(event_id)[0][0]
+    cached_db.add_guest(event_id, "Guest 3", None)
+    assert len(cached_db.get_guests_for_event(event_id)) == 3
+    cached_db.delete_guest(guest_id)
+    assert len(cached_db.get_guests_for_event(event_id)) == 2
+    cached_db.add_guests_bulk(event_id, [("Guest 4", None)])
+    assert len(cached_db.get_guests_for_event(event_id)) == 3
+
+def test_writes_only_drop_what_they_touch(cached_db):
+    user_id, event_id = _seed_export_data(cached_db)
+    other_id = cached_db.add_event(user_id, "Other", "2025-07-01", "12:00", "Venue", "Desc")
+    cached_db.get_event_by_id(other_id)
+    cached_db.get_guests_for_event(other_id)
+    cached_db.get_tasks_for_event(event_id)
+    cached_db.add_guest(event_id, "Guest 3", None)
+    cached_db.update_event(event_id, "Renamed", "2025-06-01", "12:00", "Venue", "Desc")
+    selects = _count_selects(cached_db)
+    cached_db.get_event_by_id(other_id)
+    cached_db.get_guests_for_event(other_id)
+    cached_db.get_tasks_for_event(event_id)
+    assert selects == []
+
+def test_archive_invalidates_the_cache(cached_db):
+    user_id, event_id = _seed_export_data(cached_db)
+    for task in cached_db.get_tasks_for_event(event_id):
+        cached_db.update_task_status(task[0], True)
+    cached_db.get_all_events(user_id)
+    assert cached_db.archive_event(event_id)
+    assert cached_db.get_event_by_id(event_id) is None
+    assert cached_db.get_all_events(user_id) == []
+    assert cached_db.get_tasks_for_event(event_id) == []
+
+def test_cache_sees_commits_from_other_connections(tmp_path):
+    path = str(tmp_path / "events.db")
+    db = EventDatabase(path, cache_size=1024 * 1024)
+    user_id, event_id = _seed_export_data(db)
+    assert len(db.get_guests_for_event(event_id)) == 2
+    writer = EventDatabase(path)
+    writer.add_guest(event_id, "Guest 3", None)
+    assert len(db.get_guests_for_event(event_id)) == 3
+    writer.conn.close()
+    db.conn.close()
+
+def test_restore_clears_the_cache(cached_db):
+    user_id, event_id = _seed_export_data(cached_db)
+    backup = cached_db.get_backup_data(user_id)
+    cached_db.get_all_events(user_id)
+    cached_db.delete_event(event_id)
+    cached_db.get_all_events(user_id)
+    cached_db.restore_backup_data(backup)
+    assert [event[0] for event in cached_db.get_all_events(user_id)] == [event_id]
+
+def test_cache_stays_within_its_memory_cap():
+    db = EventDatabase(":memory:", cache_size=64 * 1024)
+    user_id = db.create_user("test_user", "password")
+    event_ids = db.add_events_bulk(user_id, [(f"Event {i}", "2025-06-01", "12:00", "Venue", "Desc")
+                                             for i in range(50)])
+    for event_id in event_ids:
+        db.add_guests_bulk(event_id, [(f"Guest {i}", f"guest{i}@example.com") for i in range(20)])
+        db.get_guests_for_event(event_id)
+    assert db.cache.size <= 64 * 1024
+    assert db.cache.evictions > 0
+    db.conn.close()
+
+def test_event_detail_is_cached_until_the_event_changes(cached_db):
+    user_id, event_id = _seed_export_data(cached_db)
+    detail = cached_db.get_event_detail(event_id, user_id)
+    selects = _count_selects(cached_db)
+    assert cached_db.get_event_detail(event_id, user_id) == detail
+    assert selects == []
+    cached_db.add_guest(event_id, "Guest 3", None)
+    assert len(cached_db.get_event_detail(event_id, user_id)['guests']) == 3
+    task_id = detail['tasks'][0][0]
+    cached_db.update_task_status(task_id, False)
+    assert cached_db.get_event_detail(event_id, user_id)['task_counts'] == (1, 0)
+
+def test_cache_event_detail_keeps_results_from_another_connection(tmp_path):
+    path = str(tmp_path / "events.db")
+    db = EventDatabase(path, cache_size=1024 * 1024)
+    user_id, event_id = _seed_export_data(db)
+    db.get_all_events(user_id)
+    version = db.cache.version
+    worker = EventDatabase(path)
+    detail = worker.get_event_detail(event_id, user_id)
+    assert not db.has_cached_event_detail(event_id, user_id)
+    assert db.cache_event_detail(event_id, user_id, detail, version)
+    assert db.has_cached_event_detail(event_id, user_id)
+    selects = _count_selects(db)
+    assert db.get_event_detail(event_id, user_id) == detail
+    assert selects == []
+    worker.conn.close()
+    db.conn.close()
+
+def test_cache_event_detail_drops_results_older_than_a_write(cached_db):
+    user_id, event_id = _seed_export_data(cached_db)
+    version = cached_db.cache.version
+    detail = cached_db.get_event_detail(event_id, user_id)
+    cached_db.clear_cache()
+    cached_db.add_guest(event_id, "Guest 3", None)
+    assert not cached_db.cache_event_detail(event_id, user_id, detail, version)
+    assert len(cached_db.get_event_detail(event_id, user_id)['guests']) == 3
+    assert not cached_db.cache_event_detail(event_id, user_id, None, cached_db.cache.version)
+
+def test_cache_event_detail_without_a_cache(db):
+    user_id, event_id = _seed_export_data(db)
+    assert not db.cache_event_detail(event_id, user_id, db.get_event_detail(event_id, user_id), 0)
+    assert not db.has_cached_event_detail(event_id, user_id)
+
+def test_get_event_counts_by_date(db):
+    user_id = db.create_user("test_user", "password")
+    other_id = db.create_user("other_user", "password")
+    db.add_events_bulk(user_id, [
+        ("A", "2025-05-31", "12:00", "Venue", "Desc"),
+        ("B", "2025-06-01", "12:00", "Venue", "Desc"),
+        ("C", "2025-06-01", "18:00", "Venue", "Desc"),
+        ("D", "2025-06-30", "12:00", "Venue", "Desc"),
+        ("E", "2025-07-01", "12:00", "Venue", "Desc"),
+    ])
+    db.add_event(other_id, "Other", "2025-06-01", "12:00", "Venue", "Desc")
+    archived_id = db.add_event(user_id, "Archived", "2025-06-15", "12:00", "Venue", "Desc")
+    assert db.archive_event(archived_id)
+    assert db.get_event_counts_by_date(user_id, "2025-06-01", "2025-06-30") == {
+        "2025-06-01": 2, "2025-06-30": 1,
+    }
+    assert db.get_event_counts_by_date(user_id, "2026-01-01", "2026-01-31") == {}
@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import MagicMock, patch
-from PyQt5.QtWidgets import QLineEdit, QDateEdit, QTimeEdit, QCheckBox
+from PyQt5.QtWidgets import QLineEdit, QDateEdit, QTimeEdit, QCheckBox, QMessageBox
 from PyQt5.QtCore import QDate, QTime
 from event_planner.dialogs import (
     TaskDialog, GuestDialog, EventDialog, LoginDialog, SignupDialog, SettingsDialog
@@ -211,16 +211,23 @@ def test_settings_dialog_perform_backup(settings_dialog):
     dialog.api_url_input.text.return_value = "https://example.com"
     parent = MagicMock()
     parent.current_user_id = 1
-    parent.db.get_backup_data.return_value = {"user_id": 1, "data": "test"}
-    dialog.setParent(parent)
-    
-    with patch('requests.post') as mock_post:
-        mock_post.return_value.json.return_value = {"message": "Backup successful"}
+    dialog.parent = MagicMock(return_value=parent)
+
+    with patch('event_planner.dialogs.QMessageBox.question', return_value=QMessageBox.Yes):
         dialog.perform_backup()
-    
-        mock_post.assert_called_with(
-            "https://example.com/backup",
-            json={"user_id": 1, "data": "test"},
-            timeout=10
-        )
-        parent.status_bar.showMessage.assert_called_with("Backup completed: Backup successful", 5000)
\ No newline at end of file
+
+    parent.start_backup.assert_called_with("https://example.com")
+    parent.db.get_backup_data.assert_not_called()
+
+def test_settings_dialog_perform_recovery(settings_dialog):
+    dialog, mock_db = settings_dialog
+    dialog.api_url_input.text.return_value = "https://example.com"
+    parent = MagicMock()
+    parent.current_user_id = 1
+    dialog.parent = MagicMock(return_value=parent)
+
+    with patch('event_planner.dialogs.QMessageBox.question', return_value=QMessageBox.Yes):
+        dialog.perform_recovery()
+
+    parent.start_recovery.assert_called_with("https://example.com")
+    parent.db.restore_backup_data.assert_not_called()
@@ -0,0 +1,102 @@
+import csv
+import sqlite3
+import threading
+import pytest
+from event_planner.database import EventDatabase
+from event_planner.export import (
+    export_csv_snapshot, open_snapshot_connections, close_snapshot_connections,
+    export_snapshot_file, restore_snapshot_file
+)
+
+@pytest.fixture
+def db(tmp_path):
+    db = EventDatabase(str(tmp_path / "events.db"))
+    yield db
+    db.conn.close()
+
+def _seed(db):
+    user_id = db.create_user("test_user", "password")
+    for i in range(30):
+        event_id = db.add_event(user_id, f"Event {i}", "2025-06-01", "12:00", "Venue", "Desc")
+        db.add_task(event_id, f"Task {i}")
+        db.add_guest(event_id, f"Guest {i}", f"guest{i}@example.com")
+    return user_id
+
+def _read(path):
+    with open(path, newline='') as f:
+        return list(csv.reader(f))
+
+def test_snapshot_export_matches_sequential_export(db, tmp_path):
+    user_id = _seed(db)
+    db.export_to_csv(user_id, str(tmp_path / "sequential"))
+    stats = export_csv_snapshot(db.db_name, user_id, str(tmp_path / "parallel"), batch_size=7)
+    for suffix in ("events", "archived", "tasks", "guests"):
+        assert _read(tmp_path / f"parallel_{suffix}.csv") == _read(tmp_path / f"sequential_{suffix}.csv")
+    assert stats['tables'] == {'events': 30, 'archived': 0, 'tasks': 30, 'guests': 30}
+    assert stats['rows'] == 90
+    assert stats['rows_per_second'] > 0
+
+def test_snapshot_connections_share_one_state(db):
+    user_id = _seed(db)
+    readers = open_snapshot_connections(db.db_name, 2)
+    try:
+        db.add_event(user_id, "Late Event", "2025-06-02", "12:00", "Venue", "Desc")
+        for conn in readers:
+            assert conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 30
+        with pytest.raises(sqlite3.OperationalError):
+            readers[0].execute("DELETE FROM events")
+    finally:
+        close_snapshot_connections(readers)
+
+def test_ui_connection_writes_during_export(db, tmp_path):
+    user_id = _seed(db)
+    paused, resume = threading.Event(), threading.Event()
+    def progress(table, rows):
+        if table == "events" and not paused.is_set():
+            paused.set()
+            resume.wait(5)
+    result = {}
+    export = threading.Thread(target=lambda: result.update(export_csv_snapshot(
+        db.db_name, user_id, str(tmp_path / "out"), progress=progress, batch_size=5)))
+    export.start()
+    assert paused.wait(5)
+    db.add_event(user_id, "Added Mid-Export", "2025-06-02", "12:00", "Venue", "Desc")
+    resume.set()
+    export.join(5)
+    assert result['tables']['events'] == 30
+    assert len(db.get_all_events(user_id)) == 31
+
+def test_ui_connection_writes_during_export_without_wal(tmp_path):
+    db = EventDatabase(str(tmp_path / "events.db"), profile="durable")
+    user_id = _seed(db)
+    paused, resume = threading.Event(), threading.Event()
+    def progress(table, rows):
+        if table == "events" and not paused.is_set():
+            paused.set()
+            resume.wait(30)
+    result = {}
+    export = threading.Thread(target=lambda: result.update(export_csv_snapshot(
+        db.db_name, user_id, str(tmp_path / "out"), progress=progress, batch_size=5)))
+    export.start()
+    try:
+        assert paused.wait(5)
+        db.add_event(user_id, "Added Mid-Export", "2025-06-02", "12:00", "Venue", "Desc")
+    finally:
+        resume.set()
+        export.join(5)
+    assert result['tables']['tasks'] == 30
+    assert len(_read(tmp_path / "out_events.csv")) == result['tables']['events'] + 1
+    assert len(db.get_all_events(user_id)) == 31
+    db.conn.close()
+
+def test_snapshot_file_jobs(db, tmp_path):
+    user_id = _seed(db)
+    snapshot = str(tmp_path / "planner.snapshot")
+    progress = []
+    assert export_snapshot_file(db.db_name, snapshot, progress=lambda label, pages: progress.append(label))
+    assert set(progress) == {"pages"}
+    restored = str(tmp_path / "restored.db")
+    restore_snapshot_file(restored, snapshot)
+    other = EventDatabase(restored)
+    assert len(other.get_all_events(user_id)) == 30
+    other.conn.close()
@@ -0,0 +1,180 @@
+import io
+import json
+import sqlite3
+import pytest
+from event_planner.database import BULK_BATCH_SIZE, EventDatabase
+from event_planner.importers import (
+    JsonStream, import_export, import_guests_csv, import_guests_csv_file, import_records,
+    iter_ndjson_export, normalize_email
+)
+
+@pytest.fixture
+def db():
+    db = EventDatabase(":memory:")
+    yield db
+    db.conn.close()
+
+@pytest.fixture
+def event_id(db):
+    user_id = db.create_user("test_user", "password")
+    return db.add_event(user_id, "Conference", "2025-06-01", "09:00", "Hall", "")
+
+def _write(tmp_path, text):
+    path = tmp_path / "guests.csv"
+    path.write_text(text, encoding="utf-8-sig")
+    return str(path)
+
+def test_normalize_email():
+    assert normalize_email("  Alice@Example.COM ") == "alice@example.com"
+    assert normalize_email("") == ""
+    assert normalize_email("not-an-email") is None
+
+def test_import_guests_csv(db, event_id, tmp_path):
+    path = _write(tmp_path, "Full Name,E-mail,Ticket\n"
+                            "Alice,ALICE@example.com,VIP\n"
+                            "Bob,,GA\n"
+                            "Alice Again,alice@example.com,GA\n"
+                            ",nobody@example.com,GA\n"
+                            "Carol,carol-at-example,GA\n"
+                            "bob,,GA\n")
+    stats = import_guests_csv(db, event_id, path)
+    assert stats == {'imported': 2, 'duplicates': 2, 'invalid': 2}
+    assert [(g[2], g[3]) for g in db.get_guests_for_event(event_id)] == [
+        ("Alice", "alice@example.com"), ("Bob", None)]
+
+def test_import_skips_existing_guests(db, event_id, tmp_path):
+    db.add_guest(event_id, "Alice", "Alice@Example.com")
+    path = _write(tmp_path, "first name,last name,email\nAlice,Smith,alice@example.com\nDan,Jones,dan@example.com\n")
+    stats = import_guests_csv(db, event_id, path)
+    assert stats['imported'] == 1
+    assert stats['duplicates'] == 1
+    assert db.get_guests_for_event(event_id)[1][2] == "Dan Jones"
+
+def test_import_reports_progress(db, event_id, tmp_path):
+    rows = "".join(f"Guest {i},guest{i}@example.com\n" for i in range(25))
+    path = _write(tmp_path, "Name,Email\n" + rows)
+    progress = []
+    import_guests_csv(db, event_id, path, progress=lambda table, n: progress.append(n), batch_size=10)
+    assert progress == [10, 20]
+    assert len(db.get_guests_for_event(event_id)) == 25
+
+def test_import_requires_name_column(db, event_id, tmp_path):
+    path = _write(tmp_path, "Email\nalice@example.com\n")
+    with pytest.raises(ValueError):
+        import_guests_csv(db, event_id, path)
+
+def test_import_guests_csv_file_uses_own_connection(tmp_path):
+    db = EventDatabase(str(tmp_path / "events.db"))
+    user_id = db.create_user("test_user", "password")
+    event_id = db.add_event(user_id, "Conference", "2025-06-01", "09:00", "Hall", "")
+    path = _write(tmp_path, "Name,Email\nAlice,alice@example.com\n")
+    assert import_guests_csv_file(db.db_name, event_id, path)['imported'] == 1
+    assert len(db.get_guests_for_event(event_id)) == 1
+    db.conn.close()
+
+def _seed_account(db):
+    user_id = db.create_user("source_user", "password")
+    first = db.add_event(user_id, "Gala", "2025-06-01", None, "Hall", "Formal, black tie")
+    second = db.add_event(user_id, "Picnic", "2025-07-01", "12:00", None, "Bring food")
+    db.add_task(first, "Book band")
+    db.add_task(second, "Buy bread")
+    db.update_task_status(1, True)
+    db.add_guest(first, "Alice", "alice@example.com")
+    db.add_guest(second, "Bob", None)
+    db.conn.execute('''
+        INSERT INTO archived_events (id, user_id, name, date, time, venue, description, archived_date)
+        VALUES (99, ?, 'Old Party', '2024-01-01', '20:00', 'Club', 'Retro', '2024-02-01 10:00:00')
+    ''', (user_id,))
+    db.conn.commit()
+    return user_id
+
+def _snapshot(db, user_id):
+    events = [e[2:8] for e in db.conn.execute(
+        "SELECT * FROM events WHERE user_id = ? ORDER BY name", (user_id,))]
+    archived = [a[2:8] for a in db.get_archived_events(user_id)]
+    tasks = db.conn.execute('''
+        SELECT e.name, t.description, t.is_completed FROM tasks t JOIN events e ON e.id = t.event_id
+        WHERE e.user_id = ? ORDER BY t.description
+    ''', (user_id,)).fetchall()
+    guests = db.conn.execute('''
+        SELECT e.name, g.name, g.email FROM guests g JOIN events e ON e.id = g.event_id
+        WHERE e.user_id = ? ORDER BY g.name
+    ''', (user_id,)).fetchall()
+    return events, archived, tasks, guests
+
+@pytest.mark.parametrize("export, filename", [
+    (lambda db, user_id, base: db.export_to_json(user_id, base), "export.json"),
+    (lambda db, user_id, base: db.export_to_json(user_id, base, compact=True), "export.json"),
+    (lambda db, user_id, base: db.export_to_ndjson(user_id, base), "export.ndjson"),
+    (lambda db, user_id, base: db.export_to_csv(user_id, base), "export_events.csv"),
+    (lambda db, user_id, base: db.export_to_csv(user_id, base, compress=True), "export_guests.csv.gz"),
+])
+def test_round_trip_into_other_database(db, tmp_path, export, filename):
+    source_user = _seed_account(db)
+    export(db, source_user, str(tmp_path / "export"))
+    target = EventDatabase(":memory:")
+    target.create_user("someone_else", "password")
+    target_user = target.create_user("target_user", "password")
+    existing = target.add_event(target_user, "Existing", "2025-01-01", "09:00", "Office", "")
+    counts = import_export(target, target_user, str(tmp_path / filename))
+    assert counts == {'events': 2, 'archived_events': 1, 'tasks': 2, 'guests': 2}
+    events, archived, tasks, guests = _snapshot(target, target_user)
+    expected_events, expected_archived, expected_tasks, expected_guests = _snapshot(db, source_user)
+    assert [e for e in events if e[0] != "Existing"] == expected_events
+    assert archived == expected_archived
+    assert tasks == expected_tasks
+    assert guests == expected_guests
+    assert target.get_event_by_id(existing)[2] == "Existing"
+    target.conn.close()
+
+def test_import_twice_into_same_account(db, tmp_path):
+    user_id = _seed_account(db)
+    db.export_to_json(user_id, str(tmp_path / "export"))
+    import_export(db, user_id, str(tmp_path / "export.json"))
+    assert len(db.get_all_events(user_id)) == 4
+    assert len(db.get_archived_events(user_id)) == 2
+
+@pytest.mark.parametrize("tasks", [BULK_BATCH_SIZE + 1, 2500])
+def test_import_keeps_task_counters(db, tmp_path, tasks):
+    user_id = db.create_user("test_user", "password")
+    event_id = db.add_event(user_id, "Conference", "2025-06-01", "09:00", "Hall", "")
+    db.add_tasks_bulk(event_id, (f"Task {i}" for i in range(tasks)))
+    db.export_to_json(user_id, str(tmp_path / "export"))
+    target = EventDatabase(":memory:")
+    target_user = target.create_user("target_user", "password")
+    import_export(target, target_user, str(tmp_path / "export.json"))
+    imported = target.get_all_events(target_user)[0][0]
+    assert target.get_task_counts(imported) == (tasks, 0)
+    target.update_task_status(target.get_tasks_for_event(imported)[0][0], True)
+    assert not target.archive_event(imported)
+    target.conn.close()
+
+def test_import_counts_tasks_listed_before_their_event(db, tmp_path):
+    user_id = db.create_user("test_user", "password")
+    path = tmp_path / "tasks_first.ndjson"
+    lines = [{"type": "tasks", "data": {"id": i, "event_id": 1, "description": f"Task {i}",
+                                        "is_completed": i == 0}} for i in range(3)]
+    lines.append({"type": "events", "data": {"id": 1, "user_id": 1, "name": "Late", "date": "2025-06-01",
+                                             "time": None, "venue": None, "description": None,
+                                             "is_archived": False}})
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+    import_records(db, user_id, iter_ndjson_export(str(path)), batch_size=2)
+    event_id = db.get_all_events(user_id)[0][0]
+    assert db.get_task_counts(event_id) == (3, 1)
+
+def test_import_rejects_dangling_references(db, tmp_path):
+    user_id = db.create_user("test_user", "password")
+    path = tmp_path / "broken.ndjson"
+    path.write_text(json.dumps({"type": "tasks", "data": {
+        "id": 1, "event_id": 5, "description": "Orphan", "is_completed": False}}) + "\n")
+    with pytest.raises(sqlite3.IntegrityError):
+        import_export(db, user_id, str(path))
+    assert db.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] == 0
+    assert db.conn.execute("PRAGMA foreign_keys").fetchone()[0] == 0
+
+def test_json_stream_handles_small_chunks():
+    document = json.dumps({"user_id": 12345, "events": [{"id": 1, "name": "A"}, {"id": 2, "name": "B"}],
+                           "tasks": [], "user": {"id": 1}}, indent=4)
+    items = list(JsonStream(io.StringIO(document), chunk_size=3).items())
+    assert items == [("user_id", 12345), ("events", {"id": 1, "name": "A"}),
+                     ("events", {"id": 2, "name": "B"}), ("user", {"id": 1})]
@@ -0,0 +1,53 @@
+import pytest
+from unittest.mock import MagicMock
+from PyQt5.QtCore import Qt
+from event_planner.models import EventTableModel
+
+def _event(event_id):
+    return (event_id, 1, f"Event {event_id}", "2025-06-01", None, "Venue", "Desc", 0)
+
+@pytest.fixture
+def model():
+    return EventTableModel(page_size=2)
+
+def test_load_fetches_first_page_only(model):
+    fetch_page = MagicMock(return_value=([_event(1), _event(2)], "cursor-1"))
+    model.load(fetch_page)
+    fetch_page.assert_called_once_with(page_size=2, cursor=None)
+    assert model.rowCount() == 2
+    assert model.canFetchMore()
+
+def test_fetch_more_appends_next_page(model):
+    fetch_page = MagicMock(side_effect=[
+        ([_event(1), _event(2)], "cursor-1"),
+        ([_event(3)], None),
+    ])
+    model.load(fetch_page)
+    model.fetchMore()
+    fetch_page.assert_called_with(page_size=2, cursor="cursor-1")
+    assert [model.event_id(row) for row in range(model.rowCount())] == [1, 2, 3]
+    assert not model.canFetchMore()
+
+def test_set_page_keeps_fetching_from_cursor(model):
+    fetch_page = MagicMock(return_value=([_event(3)], None))
+    model.set_page(fetch_page, [_event(1), _event(2)], "cursor-1")
+    fetch_page.assert_not_called()
+    assert model.canFetchMore()
+    model.fetchMore()
+    fetch_page.assert_called_once_with(page_size=2, cursor="cursor-1")
+    assert [model.event_id(row) for row in range(model.rowCount())] == [1, 2, 3]
+
+def test_data_maps_columns(model):
+    model.set_rows([_event(7)])
+    assert model.data(model.index(0, 0)) == "Event 7"
+    assert model.data(model.index(0, 2)) == ""
+    assert model.data(model.index(0, 3)) == "Venue"
+    assert model.data(model.index(0, 0), Qt.EditRole) is None
+    assert model.headerData(4, Qt.Horizontal) == "Description"
+
+def test_event_id_out_of_range(model):
+    model.set_rows([_event(7)])
+    assert model.event_id(0) == 7
+    assert model.event_id(1) is None
+    model.clear()
+    assert model.rowCount() == 0
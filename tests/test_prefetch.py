@@ -0,0 +1,56 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from event_planner.prefetch import DetailPrefetcher, prefetch_rows
+
+@pytest.fixture
+def prefetcher():
+    db = MagicMock()
+    db.db_name = "events.db"
+    db.profile = "balanced"
+    db.cache.version = 7
+    db.has_cached_event_detail.side_effect = lambda event_id, user_id: event_id == 2
+    prefetcher = DetailPrefetcher(db, debounce_ms=0)
+    prefetcher.pool = MagicMock()
+    yield prefetcher, db
+
+def test_prefetch_rows_orders_neighbours_first():
+    assert prefetch_rows(5, 4, 6, 100, neighbours=2) == [6, 4, 7, 3]
+    assert prefetch_rows(5, 0, 9, 100, neighbours=1)[:2] == [6, 4]
+    assert prefetch_rows(0, 0, -1, 3) == [1, 2]
+    assert prefetch_rows(99, 98, 99, 100, neighbours=2) == [98, 97]
+
+def test_prefetch_rows_without_selection_uses_visible_rows():
+    assert prefetch_rows(-1, 10, 12, 100) == [10, 11, 12]
+    assert prefetch_rows(-1, -1, -1, 0) == []
+
+def test_submit_skips_cached_details(prefetcher):
+    prefetcher, db = prefetcher
+    with patch('event_planner.prefetch.PrefetchTask') as task:
+        prefetcher.submit(1, [3, 2, None, 4, 3])
+    task.assert_called_once_with("events.db", "balanced", 1, [3, 4], 7)
+    prefetcher.pool.start.assert_called_once_with(task.return_value)
+
+def test_nothing_to_prefetch(prefetcher):
+    prefetcher, db = prefetcher
+    prefetcher.submit(1, [2])
+    prefetcher.pool.start.assert_not_called()
+
+def test_in_memory_database_is_not_prefetched(prefetcher):
+    prefetcher, db = prefetcher
+    db.db_name = ":memory:"
+    prefetcher.submit(1, [3])
+    prefetcher.pool.start.assert_not_called()
+
+def test_new_submit_cancels_active_task(prefetcher):
+    prefetcher, db = prefetcher
+    task = MagicMock()
+    prefetcher.active_task = task
+    with patch('event_planner.prefetch.PrefetchTask'):
+        prefetcher.submit(1, [3])
+    task.cancel.assert_called_once()
+
+def test_loaded_details_go_to_the_query_cache(prefetcher):
+    prefetcher, db = prefetcher
+    detail = {'event': (3,), 'guests': [], 'tasks': [], 'task_counts': (0, 0)}
+    prefetcher._store(7, 1, 3, detail)
+    db.cache_event_detail.assert_called_once_with(3, 1, detail, 7)
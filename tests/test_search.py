@@ -0,0 +1,120 @@
+import sqlite3
+import pytest
+from unittest.mock import MagicMock, patch
+from event_planner.database import EventDatabase
+from event_planner.search import EventSearch, SearchTask, fetch_search_page, refine_events
+
+EVENTS = [
+    (1, 1, "Summer Party", "2025-06-01", "12:00", "Rooftop Bar", "Drinks", 0),
+    (2, 1, "Board Meeting", "2025-06-02", "09:00", "Office", None, 0),
+]
+
+@pytest.fixture
+def search():
+    db = MagicMock()
+    db.db_name = ":memory:"
+    db.search_events_page.return_value = (EVENTS, None)
+    search = EventSearch(db, debounce_ms=0, page_size=50)
+    search.results = []
+    search.results_ready.connect(lambda query, events, cursor: search.results.append((query, events, cursor)))
+    yield search, db
+
+def test_refine_events_matches_any_text_column():
+    assert refine_events(EVENTS, "rooftop") == [EVENTS[0]]
+    assert refine_events(EVENTS, "office") == [EVENTS[1]]
+    assert refine_events(EVENTS, "r") == EVENTS
+
+def test_first_query_hits_database(search):
+    search, db = search
+    search.submit(1, "par")
+    search._start()
+    db.search_events_page.assert_called_once_with(1, "par", page_size=50, cursor=None)
+    assert search.results == [("par", EVENTS, None)]
+
+def test_extended_query_refines_in_memory(search):
+    search, db = search
+    search.submit(1, "r")
+    search._start()
+    search.submit(1, "roof")
+    search._start()
+    db.search_events_page.assert_called_once_with(1, "r", page_size=50, cursor=None)
+    assert search.results[-1] == ("roof", [EVENTS[0]], None)
+
+def test_partial_results_are_not_refined(search):
+    search, db = search
+    db.search_events_page.return_value = (EVENTS, "cursor-1")
+    search.submit(1, "r")
+    search._start()
+    assert search.results[-1] == ("r", EVENTS, "cursor-1")
+    search.submit(1, "roof")
+    search._start()
+    assert db.search_events_page.call_count == 2
+
+def test_empty_query_pages_all_events(search):
+    search, db = search
+    db.get_all_events_page.return_value = (EVENTS, "cursor-1")
+    search.submit(1, "")
+    search._start()
+    db.get_all_events_page.assert_called_once_with(1, page_size=50, cursor=None)
+    db.get_all_events.assert_not_called()
+
+def test_invalidate_forces_database_query(search):
+    search, db = search
+    search.submit(1, "r")
+    search._start()
+    search.invalidate()
+    search.submit(1, "roof")
+    search._start()
+    assert db.search_events_page.call_count == 2
+
+def test_stale_results_are_dropped(search):
+    search, db = search
+    search._deliver(search.generation - 1, "old", EVENTS, None)
+    assert search.results == []
+
+def test_stale_failures_are_dropped(search):
+    search, db = search
+    failures = []
+    search.search_failed.connect(lambda query, message: failures.append((query, message)))
+    search._fail(search.generation - 1, "old", "database is locked")
+    search._fail(search.generation, "new", "database is locked")
+    assert failures == [("new", "database is locked")]
+
+def _search_task(tmp_path):
+    db = EventDatabase(str(tmp_path / "events.db"))
+    user_id = db.create_user("test_user", "password")
+    db.add_events_bulk(user_id, [(f"Party {i}", "2025-06-01", None, "Venue", "Desc") for i in range(50)])
+    db.conn.close()
+    task = SearchTask(db.db_name, db.profile, user_id, "party", 3)
+    task.finished, task.failed = [], []
+    task.signals.finished.connect(lambda *args: task.finished.append(args))
+    task.signals.failed.connect(lambda *args: task.failed.append(args))
+    return task
+
+def test_cancelled_task_drops_interrupted_query(tmp_path):
+    task = _search_task(tmp_path)
+
+    def fetch(db, *args):
+        # Cancel from inside the running query, the way the UI thread would
+        db.conn.set_progress_handler(task.cancel, 1)
+        return fetch_search_page(db, *args)
+    with patch('event_planner.search.fetch_search_page', side_effect=fetch) as fetch_page:
+        task.run()
+    assert fetch_page.called
+    assert task.finished == [] and task.failed == []
+
+def test_task_reports_database_errors(tmp_path):
+    task = _search_task(tmp_path)
+    with patch('event_planner.search.fetch_search_page',
+               side_effect=sqlite3.OperationalError("database is locked")):
+        task.run()
+    assert task.finished == []
+    assert task.failed == [(3, "party", "database is locked")]
+
+def test_cancel_interrupts_active_task(search):
+    search, db = search
+    task = MagicMock()
+    search.active_task = task
+    search.cancel()
+    task.cancel.assert_called_once()
+    assert search.active_task is None